@@ -0,0 +1,51 @@
+"""
+    Накладные расходы аутентификации на один запрос: jwt.decode (base64, HMAC, JSON)
+    против попадания в кэш проверенных токенов token_cache.
+
+    python -m benchmarks.bench_auth --repeat 100000 --tokens 1000
+"""
+import argparse
+import asyncio
+import time
+
+from jose import jwt
+
+from benchmarks.common import dump
+from src.services.auth_services import auth_service
+from src.services.cache_services import token_cache
+
+
+def per_call(fn, tokens: list[str], repeat: int) -> float:
+    started = time.perf_counter()
+    for i in range(repeat):
+        fn(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=100_000, help='количество проверок')
+    parser.add_argument('--tokens', type=int, default=1000, help='количество различных токенов (клиентов)')
+    args = parser.parse_args()
+
+    tokens = [await auth_service.create_access_token({'sub': f'user{i}@bench.com'}) for i in range(args.tokens)]
+
+    def uncached(token):
+        return jwt.decode(token, auth_service.SECRET_KEY, algorithms=[auth_service.ALGORITHM])
+
+    token_cache.clear()
+    for token in tokens:
+        auth_service.decode_access_token(token)
+    report = {
+        'tokens': args.tokens,
+        'repeat': args.repeat,
+        'jwt_decode_us': per_call(uncached, tokens, args.repeat),
+        'token_cache_hit_us': per_call(auth_service.decode_access_token, tokens, args.repeat),
+        'token_cache': token_cache.stats(),
+    }
+    report['speedup'] = report['jwt_decode_us'] / report['token_cache_hit_us']
+    dump(report)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+    Сравнение прежнего запроса upcoming_birthday (extract по месяцу и дню) с индексным запросом по birthday_doy.
+
+    python -m benchmarks.bench_birthdays --rows 1000000 --users 1000
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, or_, and_, extract
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import base_parser, make_engine, ensure_data, measure, summarize, dump
+from src.contacts.models import Contact, User
+from src.repository import functiondb
+
+
+async def legacy_upcoming_birthday(db):
+    today = datetime.today().date()
+    week_from_now = today + timedelta(days=3)
+    stmt = select(Contact).filter(
+        or_(
+            and_(extract('month', Contact.birthday) == today.month, extract('day', Contact.birthday) >= today.day),
+            and_(extract('month', Contact.birthday) == week_from_now.month,
+                 extract('day', Contact.birthday) <= week_from_now.day),
+            and_(extract('month', Contact.birthday) == (today.month + 1) % 12,
+                 extract('day', Contact.birthday) <= week_from_now.day)
+        )
+    )
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+async def main(args):
+    engine = make_engine(args.url)
+    await ensure_data(engine, args)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    rnd = random.Random(1)
+    report = {'rows': args.rows, 'users': args.users, 'days': args.days}
+    async with session_maker() as session:
+        report['legacy'] = summarize(await measure(lambda: legacy_upcoming_birthday(session), args.legacy_repeat))
+        session.expunge_all()
+
+        async def indexed():
+            user = User(id=rnd.randrange(1, args.users + 1))
+            result = await functiondb.upcoming_birthday(session, user, args.days)
+            session.expunge_all()
+            return result
+
+        report['indexed'] = summarize(await measure(indexed, args.repeat))
+    report['speedup_p50'] = report['legacy']['p50_ms'] / report['indexed']['p50_ms']
+    await engine.dispose()
+    dump(report)
+
+
+if __name__ == '__main__':
+    parser = base_parser('upcoming_birthday benchmark')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--legacy-repeat', type=int, default=5)
+    parser.set_defaults(rows=1_000_000)
+    asyncio.run(main(parser.parse_args()))
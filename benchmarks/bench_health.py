@@ -0,0 +1,67 @@
+"""
+    Стоимость проб готовности: кэшированная readiness-проба против прежней проверки,
+    которая на каждый вызов брала соединение из пула и выполняла SELECT 1.
+
+    Измеряются:
+    - readiness_call: HealthChecker.readiness() без HTTP;
+    - ready_endpoint: GET /api/health/ready приложения через ASGITransport (без сети);
+    - select_1_per_probe: соединение из пула и SELECT 1, как в прежнем /api/healthchecker;
+    - background_check: одна фоновая проверка (база данных, Redis, пул), выполняемая раз в HEALTH_CHECK_INTERVAL.
+
+    python -m benchmarks.bench_health --url sqlite+aiosqlite:///./bench.db --repeat 2000
+"""
+import argparse
+import asyncio
+import time
+
+import fakeredis
+import httpx
+from sqlalchemy import text
+
+from benchmarks.common import DEFAULT_URL, dump, make_engine, summarize
+
+
+async def timed(call, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=DEFAULT_URL, help='URL базы данных')
+    parser.add_argument('--repeat', type=int, default=2000, help='количество измерений')
+    args = parser.parse_args()
+
+    from main import app
+    from src.services.health_services import health_checker
+
+    engine = make_engine(args.url)
+    health_checker.init(lambda: engine, fakeredis.FakeAsyncRedis())
+    await health_checker.check()
+
+    async def readiness_call():
+        health_checker.readiness()
+
+    async def select_1():
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    report = {'url': args.url, 'repeat': args.repeat}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def ready_endpoint():
+            (await client.get('/api/health/ready')).raise_for_status()
+
+        for name, call in [('readiness_call', readiness_call), ('ready_endpoint', ready_endpoint),
+                           ('select_1_per_probe', select_1), ('background_check', health_checker.check)]:
+            await timed(call, min(args.repeat, 50))
+            report[name] = await timed(call, args.repeat)
+    await engine.dispose()
+    dump(report)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+    Холодный старт: время импорта приложения и время до первого ответа в новом интерпретаторе.
+
+    Каждое измерение - отдельный процесс python, поэтому кэш модулей не переиспользуется
+    (байткод .pyc при этом уже скомпилирован, как у воркера после первого запуска). В каждом
+    процессе измеряются:
+    - import_ms: import main;
+    - first_response_ms: импорт, запуск lifespan и первый ответ GET / через ASGITransport;
+    - modules: количество загруженных модулей;
+    - engines: количество созданных AsyncEngine после импорта;
+    - heavy: какие из тяжелых зависимостей (asyncpg, jinja2, cloudinary, ...) загружены импортом.
+
+    С --baseline-ref то же измерение выполняется во временном git worktree указанной ревизии,
+    и в отчет попадает ускорение по медианам. --importtime добавляет самые дорогие модули
+    по данным python -X importtime.
+
+    python -m benchmarks.bench_import --runs 20
+    python -m benchmarks.bench_import --runs 20 --baseline-ref HEAD~1 --importtime 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import dump, summarize
+
+HEAVY_MODULES = ('asyncpg', 'jinja2', 'cloudinary', 'aiosmtplib', 'redis', 'orjson')
+
+PROBE = '''
+import gc, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from sqlalchemy.ext.asyncio import AsyncEngine
+engines = sum(isinstance(obj, AsyncEngine) for obj in gc.get_objects())
+modules = len(sys.modules)
+heavy = [name for name in HEAVY if name in sys.modules]
+
+import asyncio, httpx
+
+async def first_response():
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://bench') as client:
+            response = await client.get('/')
+        responded = time.perf_counter()
+    return response.status_code, responded
+
+status, responded = asyncio.run(first_response())
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_response_ms': (responded - started) * 1000,
+                  'modules': modules, 'engines': engines, 'heavy': heavy, 'status': status}))
+'''
+
+
+def probe(cwd: str) -> dict:
+    """Запускает измерение в новом процессе python в каталоге cwd."""
+    env = {**os.environ, 'PYTHONPATH': cwd}
+    code = f'HEAVY = {HEAVY_MODULES!r}\n{PROBE}'
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def importtime(cwd: str, top: int) -> list[dict]:
+    """
+        Возвращает самые дорогие модули по накопленному времени импорта (python -X importtime).
+
+        Parameters:
+        - cwd: Каталог приложения.
+        - top: Количество модулей.
+
+        Returns:
+        - list[dict]: Имя модуля, собственное и накопленное время в миллисекундах.
+        """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=cwd,
+                            env={**os.environ, 'PYTHONPATH': cwd}, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append({'module': name.strip(), 'self_ms': int(own) / 1000, 'cumulative_ms': int(cumulative) / 1000})
+    rows = [row for row in rows if row['module'] != 'main']
+    return sorted(rows, key=lambda row: row['cumulative_ms'], reverse=True)[:top]
+
+
+def report_for(samples: list[dict]) -> dict:
+    return {'import': summarize([sample['import_ms'] / 1000 for sample in samples]),
+            'first_response': summarize([sample['first_response_ms'] / 1000 for sample in samples]),
+            'modules': samples[-1]['modules'], 'engines': samples[-1]['engines'], 'heavy': samples[-1]['heavy']}
+
+
+def measure(variants: dict[str, str], runs: int, top: int) -> dict:
+    """
+        Измеряет варианты поочередно (по одному процессу каждого варианта за круг),
+        чтобы фоновая нагрузка одинаково влияла на все варианты.
+
+        Parameters:
+        - variants: Имя варианта и каталог приложения.
+        - runs: Количество процессов на вариант.
+        - top: Количество самых дорогих модулей в отчете (0 - без -X importtime).
+
+        Returns:
+        - dict: Отчет по каждому варианту.
+        """
+    for cwd in variants.values():
+        probe(cwd)
+    samples = {name: [] for name in variants}
+    for _ in range(runs):
+        for name, cwd in variants.items():
+            samples[name].append(probe(cwd))
+    report = {name: report_for(samples[name]) for name in variants}
+    if top:
+        for name, cwd in variants.items():
+            report[name]['importtime'] = importtime(cwd, top)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='количество процессов на вариант')
+    parser.add_argument('--baseline-ref', default=None, help='git-ревизия для сравнения (например, HEAD~1)')
+    parser.add_argument('--importtime', type=int, default=0, help='показать N самых дорогих модулей')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if not args.baseline_ref:
+        dump({'runs': args.runs, **measure({'current': root}, args.runs, args.importtime)})
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, 'baseline')
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, args.baseline_ref], cwd=root, check=True,
+                       capture_output=True)
+        try:
+            report = measure({'current': root, 'baseline': worktree}, args.runs, args.importtime)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=root, check=True,
+                           capture_output=True)
+    report['speedup'] = {key: report['baseline'][key]['p50_ms'] / report['current'][key]['p50_ms']
+                         for key in ('import', 'first_response')}
+    dump({'runs': args.runs, 'baseline_ref': args.baseline_ref, **report})
+
+
+if __name__ == '__main__':
+    main()
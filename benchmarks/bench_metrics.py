@@ -0,0 +1,135 @@
+"""
+    Накладные расходы метрик: один и тот же маршрут с SQL-запросами без инструментирования
+    и с MetricsMiddleware и обработчиками before/after_cursor_execute.
+
+    Запросы выполняются через ASGITransport (без сети) пачками поочередно для обоих вариантов,
+    чтобы прогрев и фоновая нагрузка не искажали разницу. Время запроса к aiosqlite сильно
+    колеблется из-за передачи в поток драйвера, поэтому отдельно измеряются стоимость самого
+    middleware на пустом ASGI-приложении и пары обработчиков before/after_cursor_execute.
+
+    python -m benchmarks.bench_metrics --requests 5000 --queries 3
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.common import dump, summarize
+from src.db import connectdb
+from src.db.connectdb import instrument_queries
+from src.services import metrics_services
+
+
+def make_app(engine, queries: int, instrumented: bool):
+    app = FastAPI()
+
+    @app.get('/contacts/{contact_id}')
+    async def contact(contact_id: int):
+        async with engine.connect() as conn:
+            for _ in range(queries):
+                await conn.execute(text('SELECT 1'))
+        return {'id': contact_id}
+
+    return metrics_services.MetricsMiddleware(app) if instrumented else app
+
+
+async def run_requests(engines: dict, queries: int, requests: int, chunk: int = 500) -> dict:
+    clients = {name: AsyncClient(transport=ASGITransport(app=make_app(engine, queries, name == 'instrumented')),
+                                 base_url='http://bench') for name, engine in engines.items()}
+    samples = {name: [] for name in clients}
+    try:
+        for client in clients.values():
+            for i in range(100):
+                await client.get(f'/contacts/{i}')
+        for offset in range(0, requests, chunk):
+            for name, client in clients.items():
+                for i in range(offset, min(requests, offset + chunk)):
+                    started = time.perf_counter()
+                    await client.get(f'/contacts/{i}')
+                    samples[name].append(time.perf_counter() - started)
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+async def middleware_only(calls: int) -> dict:
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        pass
+
+    result = {}
+    for name, handler in (('plain', app), ('instrumented', metrics_services.MetricsMiddleware(app))):
+        started = time.perf_counter()
+        for _ in range(calls):
+            await handler({'type': 'http', 'path': '/contacts/1', 'method': 'GET'}, receive, send)
+        result[f'{name}_us'] = (time.perf_counter() - started) / calls * 1_000_000
+    result['overhead_us'] = result['instrumented_us'] - result['plain_us']
+    return result
+
+
+def query_hooks_only(calls: int) -> float:
+    conn = SimpleNamespace(info={})
+    started = time.perf_counter()
+    for _ in range(calls):
+        connectdb._before_cursor_execute(conn, None, '', None, None, False)
+        connectdb._after_cursor_execute(conn, None, '', None, None, False)
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+async def run_queries(engine, queries: int) -> float:
+    async with engine.connect() as conn:
+        started = time.perf_counter()
+        for _ in range(queries):
+            await conn.execute(text('SELECT 1'))
+    return (time.perf_counter() - started) / queries * 1_000_000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000, help='количество HTTP-запросов')
+    parser.add_argument('--queries', type=int, default=3, help='количество SQL-запросов на HTTP-запрос')
+    parser.add_argument('--url', default='sqlite+aiosqlite://', help='URL базы данных')
+    args = parser.parse_args()
+
+    plain = create_async_engine(args.url)
+    instrumented = create_async_engine(args.url)
+    instrument_queries(instrumented)
+    try:
+        report = {
+            'requests': args.requests,
+            'queries_per_request': args.queries,
+            **await run_requests({'plain': plain, 'instrumented': instrumented}, args.queries, args.requests),
+            'middleware_only': await middleware_only(args.requests * 10),
+            'query_hooks_us': query_hooks_only(args.requests * 10),
+            'sql_us_plain': await run_queries(plain, args.requests),
+            'sql_us_instrumented': await run_queries(instrumented, args.requests),
+        }
+    finally:
+        await plain.dispose()
+        await instrumented.dispose()
+    report['overhead_us_per_request'] = (report['instrumented']['mean_ms'] - report['plain']['mean_ms']) * 1000
+    report['overhead_percent'] = report['overhead_us_per_request'] / (report['plain']['mean_ms'] * 1000) * 100
+    report['render_ms'] = timed_render()
+    dump(report)
+
+
+def timed_render() -> float:
+    started = time.perf_counter()
+    metrics_services.registry.render()
+    return (time.perf_counter() - started) * 1000
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
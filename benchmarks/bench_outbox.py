@@ -0,0 +1,108 @@
+"""
+    Пропускная способность отправки писем: новое SMTP-соединение на каждое письмо (как FastMail
+    в BackgroundTask) против воркера outbox с переиспользуемыми соединениями.
+    SMTP-сервер - локальный aiosmtpd с искусственной задержкой установки соединения.
+
+    python -m benchmarks.bench_outbox --messages 500 --connections 1 4 --connect-delay 0.02
+"""
+import argparse
+import asyncio
+import time
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP as SMTPServer
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import DEFAULT_URL, make_engine, reset_schema, dump
+from src.repository import functionoutbox
+from src.services.email_services import build_message
+from src.services.outbox_worker import OutboxWorker, SMTPConnection
+
+TEMPLATE_BODY = {'host': 'http://localhost:8000/', 'username': 'bench', 'token': 'x' * 150}
+
+
+class SinkHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 OK'
+
+
+class SlowHandshakeController(Controller):
+    """Сервер, который отвечает на подключение с задержкой (имитация TLS-рукопожатия и сети)."""
+
+    def __init__(self, handler, connect_delay: float, **kwargs):
+        super().__init__(handler, **kwargs)
+        self.connect_delay = connect_delay
+
+    def factory(self):
+        server = SMTPServer(self.handler, **self.SMTP_kwargs)
+        delay = self.connect_delay
+        original = server._handle_client
+
+        async def handle_client():
+            await asyncio.sleep(delay)
+            await original()
+
+        server._handle_client = handle_client
+        return server
+
+
+async def per_message(controller, messages: int) -> float:
+    started = time.perf_counter()
+    for i in range(messages):
+        message = build_message(f'user{i}@bench.com', 'Confirm your email ', 'verify_email.html', TEMPLATE_BODY)
+        await aiosmtplib.send(message, hostname=controller.hostname, port=controller.port)
+    return time.perf_counter() - started
+
+
+async def outbox(controller, session_maker, messages: int, connections: int, batch_size: int) -> dict:
+    async with session_maker() as db:
+        for i in range(messages):
+            await functionoutbox.enqueue_email(f'user{i}@bench.com', 'Confirm your email ', 'verify_email.html',
+                                               TEMPLATE_BODY, db, commit=False)
+        await db.commit()
+    worker = OutboxWorker(session_maker, [SMTPConnection(controller.hostname, controller.port)
+                                          for _ in range(connections)], batch_size=batch_size)
+    started = time.perf_counter()
+    while await worker.run_once():
+        pass
+    elapsed = time.perf_counter() - started
+    await worker.close()
+    return {**worker.stats(), 'seconds': elapsed, 'messages_per_second': messages / elapsed}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=DEFAULT_URL, help='URL базы данных для outbox')
+    parser.add_argument('--messages', type=int, default=500, help='количество писем')
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 4], help='количество SMTP-соединений')
+    parser.add_argument('--batch-size', type=int, default=100, help='размер пачки воркера')
+    parser.add_argument('--connect-delay', type=float, default=0.02, help='задержка подключения к SMTP в секундах')
+    args = parser.parse_args()
+
+    handler = SinkHandler()
+    controller = SlowHandshakeController(handler, args.connect_delay, hostname='127.0.0.1', port=8025)
+    controller.start()
+    engine = make_engine(args.url)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        await reset_schema(engine)
+        elapsed = await per_message(controller, args.messages)
+        report = {'messages': args.messages, 'connect_delay': args.connect_delay,
+                  'per_message_connection': {'seconds': elapsed, 'messages_per_second': args.messages / elapsed}}
+        for connections in args.connections:
+            report[f'outbox_{connections}_connections'] = await outbox(controller, session_maker, args.messages,
+                                                                       connections, args.batch_size)
+        report['received'] = handler.received
+        dump(report)
+    finally:
+        controller.stop()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
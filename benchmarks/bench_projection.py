@@ -0,0 +1,80 @@
+"""
+    Сравнение ORM-пути списка контактов (Contact + JOIN users + валидация list[CreateContact])
+    с проекцией колонок и прямой сериализацией на странице из 100 контактов.
+
+    python -m benchmarks.bench_projection --rows 100000 --users 100
+"""
+import asyncio
+import random
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import base_parser, make_engine, ensure_data, summarize, dump
+from src.contacts.models import User
+from src.repository import functiondb
+from src.schemas.checkschemas import CreateContact
+from src.services.serializers import contact_rows_to_dicts
+
+contact_list = TypeAdapter(list[CreateContact])
+
+
+async def orm_page(session, user, limit):
+    contacts = await functiondb.get_contacts(limit, 0, session, user)
+    # То же, что делает FastAPI с response_model: валидация, jsonable_encoder и JSONResponse
+    body = JSONResponse(jsonable_encoder(contact_list.validate_python(contacts, from_attributes=True))).body
+    session.expunge_all()
+    return body
+
+
+async def projection_page(session, user, limit):
+    rows = await functiondb.get_contacts_rows(limit, 0, session, user)
+    return JSONResponse(contact_rows_to_dicts(rows, user)).body
+
+
+async def run(fn, session_maker, users, args):
+    rnd = random.Random(7)
+    async with session_maker() as session:
+        loaded = [await session.get(User, user_id) for user_id in range(1, users + 1)]
+        pages = [rnd.choice(loaded) for _ in range(args.repeat)]
+        for user in pages[:3]:
+            await fn(session, user, args.limit)
+        samples = []
+        for user in pages:
+            started = time.perf_counter()
+            await fn(session, user, args.limit)
+            samples.append(time.perf_counter() - started)
+        peaks = []
+        for user in pages[:args.memory_repeat]:
+            tracemalloc.start()
+            await fn(session, user, args.limit)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    report = summarize(samples)
+    report['peak_alloc_kib'] = sum(peaks) / len(peaks) / 1024
+    return report
+
+
+async def main(args):
+    engine = make_engine(args.url)
+    await ensure_data(engine, args)
+    session_maker = async_sessionmaker(bind=engine)
+    users = min(args.users, 50)
+    report = {'rows': args.rows, 'page': args.limit,
+              'orm': await run(orm_page, session_maker, users, args),
+              'projection': await run(projection_page, session_maker, users, args)}
+    report['speedup_p50'] = report['orm']['p50_ms'] / report['projection']['p50_ms']
+    await engine.dispose()
+    dump(report)
+
+
+if __name__ == '__main__':
+    parser = base_parser('contact list projection benchmark')
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--memory-repeat', type=int, default=10)
+    parser.set_defaults(rows=100_000, users=100)
+    asyncio.run(main(parser.parse_args()))
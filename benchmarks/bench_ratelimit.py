@@ -0,0 +1,108 @@
+"""
+    Накладные расходы лимитера на один запрос и количество обращений к Redis:
+    fastapi-limiter (EVALSHA на каждый запрос) против RateLimitBackend в режимах 'redis' и 'local'.
+
+    Сценарии: 'normal' - много пользователей в пределах лимита, 'abusive' - один клиент
+    многократно превышает лимит. Без --redis-url используется fakeredis (без сетевой задержки),
+    поэтому для реальных цифр укажите настоящий Redis.
+
+    fastapi-limiter нужен только этому бенчмарку и устанавливается группой bench: poetry install --with bench
+
+    python -m benchmarks.bench_ratelimit --requests 20000 --redis-url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import time
+
+import fakeredis
+import redis.asyncio as redis
+from fastapi_limiter import FastAPILimiter
+from fastapi_limiter.depends import RateLimiter as LegacyRateLimiter
+
+from benchmarks.common import dump
+from src.services.ratelimit_services import RateLimitBackend
+
+
+class CountingRedis:
+    """Обертка клиента, которая считает вызовы Lua-скриптов (round trips)."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def evalsha(self, *args, **kwargs):
+        self.calls += 1
+        return await self.client.evalsha(*args, **kwargs)
+
+    def register_script(self, script):
+        registered = self.client.register_script(script)
+        counter = self
+
+        async def call(keys=None, args=None):
+            counter.calls += 1
+            return await registered(keys=keys, args=args)
+
+        return call
+
+
+def keys_for(scenario: str, requests: int) -> list[str]:
+    if scenario == 'abusive':
+        return ['user:abuser@bench.com'] * requests
+    return [f'user:user{i % 5000}@bench.com' for i in range(requests)]
+
+
+async def run_legacy(client: CountingRedis, keys: list[str], times: int, period_ms: int) -> dict:
+    await FastAPILimiter.init(client)
+    limiter = LegacyRateLimiter(times=times, milliseconds=period_ms)
+    client.calls = 0
+    started, denied = time.perf_counter(), 0
+    for key in keys:
+        denied += await limiter._check(f'legacy:{key}') != 0
+    return report(started, keys, denied, client.calls)
+
+
+async def run_backend(mode: str, client: CountingRedis, keys: list[str], times: int, period_ms: int) -> dict:
+    backend = RateLimitBackend(mode, max_keys=100_000, retry_after=5)
+    backend.init(client)
+    client.calls = 0
+    started, denied = time.perf_counter(), 0
+    for key in keys:
+        denied += await backend.hit(f'{mode}:{key}', times, period_ms) != 0
+    return report(started, keys, denied, client.calls)
+
+
+def report(started: float, keys: list[str], denied: int, calls: int) -> dict:
+    elapsed = time.perf_counter() - started
+    return {'us_per_request': elapsed / len(keys) * 1_000_000, 'denied': denied,
+            'redis_round_trips': calls, 'round_trips_per_request': calls / len(keys)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=20_000, help='количество запросов в сценарии')
+    parser.add_argument('--times', type=int, default=5, help='лимит запросов за период')
+    parser.add_argument('--period-ms', type=int, default=10_000, help='период лимита в миллисекундах')
+    parser.add_argument('--redis-url', default=None, help='URL настоящего Redis (по умолчанию fakeredis)')
+    args = parser.parse_args()
+
+    raw = redis.from_url(args.redis_url) if args.redis_url else fakeredis.FakeAsyncRedis()
+    client = CountingRedis(raw)
+    result = {'redis': args.redis_url or 'fakeredis', 'requests': args.requests, 'times': args.times,
+              'period_ms': args.period_ms}
+    for scenario in ('normal', 'abusive'):
+        await raw.flushdb()
+        keys = keys_for(scenario, args.requests)
+        result[scenario] = {
+            'fastapi_limiter': await run_legacy(client, keys, args.times, args.period_ms),
+            'redis_sliding_window': await run_backend('redis', client, keys, args.times, args.period_ms),
+            'local_token_bucket': await run_backend('local', client, keys, args.times, args.period_ms),
+        }
+    await raw.aclose()
+    dump(result)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
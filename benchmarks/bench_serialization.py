@@ -0,0 +1,85 @@
+"""
+    Время сериализации и размер страницы из 100 контактов (CreateContact с вложенным UserResponse)
+    для разных путей ответа:
+
+    - response_model: валидация, jsonable_encoder и JSONResponse (json из стандартной библиотеки);
+    - response_model_orjson: то же с ORJSONResponse (default_response_class при JSON_FAST_PATH);
+    - type_adapter: TypeAdapter схемы ContactOut, validate_python и dump_json прямо в байты (model_response);
+    - projection_json / projection_orjson: словари contact_rows_to_dicts и dumps (путь conditional_json).
+
+    python -m benchmarks.bench_serialization --page 100 --repeat 2000
+"""
+import argparse
+import json
+import time
+from datetime import date
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from benchmarks.common import dump
+from src.contacts.models import Contact, User
+from src.schemas.checkschemas import CreateContact
+from src.services.serializers import contact_list, contact_rows_to_dicts
+
+response_model_list = TypeAdapter(list[CreateContact])
+
+
+def make_page(size: int) -> tuple[list[Contact], list[dict], User]:
+    owner = User(id=1, username='bench', email='bench@example.com')
+    contacts = [Contact(id=i, name=f'Name{i}', surname='Surname', phone=str(1_000_000_000 + i),
+                        email=f'contact{i}@mail.com', birthday=date(1990, i % 12 + 1, i % 28 + 1),
+                        information='x' * 40, user=owner) for i in range(1, size + 1)]
+    rows = [{column: getattr(contact, column) for column in
+             ('id', 'name', 'surname', 'phone', 'email', 'birthday', 'information')} for contact in contacts]
+    return contacts, rows, owner
+
+
+def timed(fn, repeat: int) -> dict:
+    body = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return {'us_per_page': (time.perf_counter() - started) / repeat * 1_000_000, 'bytes': len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page', type=int, default=100, help='количество контактов на странице')
+    parser.add_argument('--repeat', type=int, default=2000, help='количество сериализаций')
+    args = parser.parse_args()
+
+    contacts, rows, owner = make_page(args.page)
+
+    def response_model(response_class):
+        return lambda: response_class(jsonable_encoder(
+            response_model_list.validate_python(contacts, from_attributes=True))).body
+
+    def type_adapter():
+        return contact_list.dump_json(contact_list.validate_python(contacts, from_attributes=True))
+
+    def projection_json():
+        return json.dumps(contact_rows_to_dicts(rows, owner), ensure_ascii=False, allow_nan=False,
+                          separators=(',', ':')).encode('utf-8')
+
+    def projection_orjson():
+        return orjson.dumps(contact_rows_to_dicts(rows, owner))
+
+    report = {
+        'page': args.page,
+        'response_model': timed(response_model(JSONResponse), args.repeat),
+        'response_model_orjson': timed(response_model(ORJSONResponse), args.repeat),
+        'type_adapter': timed(type_adapter, args.repeat),
+        'projection_json': timed(projection_json, args.repeat),
+        'projection_orjson': timed(projection_orjson, args.repeat),
+    }
+    baseline = report['response_model']['us_per_page']
+    report['speedup'] = {name: baseline / report[name]['us_per_page'] for name in
+                         ('response_model_orjson', 'type_adapter', 'projection_json', 'projection_orjson')}
+    dump(report)
+
+
+if __name__ == '__main__':
+    main()
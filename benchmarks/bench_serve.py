@@ -0,0 +1,165 @@
+"""
+    Пропускная способность на ядро: serve.py с разным количеством воркеров, циклом событий и парсером HTTP.
+
+    Для каждого сочетания --workers и --stack запускается python serve.py на базе --url, и в течение
+    --duration секунд на него по localhost идут запросы --paths (по кругу) из --clients процессов
+    с --concurrency соединениями keep-alive в сумме. Для каждого запуска измеряются:
+    - rps и rps_per_worker - ответы 2xx в секунду всего и на один воркер;
+    - latency - p50/p95/p99 задержки ответа;
+    - errors - ответы не 2xx и ошибки соединения.
+
+    Генератор нагрузки работает на той же машине: для измерения на ядро ограничьте сервер ядрами
+    (taskset -c 0-3 или docker --cpus) и оставьте генератору свободные ядра, иначе при
+    workers >= CPU сервер и клиенты делят процессор и rps_per_worker занижается.
+
+    Запросы к /contacts/ идут с access-токеном пользователя user1@bench.com из заполненной базы;
+    сервер запускается с RATE_LIMIT_ENABLED=false и HEALTH_REDIS_REQUIRED=false, Redis не нужен.
+
+    python -m benchmarks.bench_serve --rows 10000 --workers 1 2 4 --stack uvloop/httptools asyncio/h11
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import base_parser, dump, ensure_data, make_engine, summarize
+
+
+async def _load(base_url: str, paths: list[str], headers: dict, connections: int, duration: float):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        async def connection(offset: int):
+            nonlocal errors
+            index = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[index % len(paths)])
+                    ok = response.is_success
+                except httpx.HTTPError:
+                    ok = False
+                index += 1
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(connection(offset) for offset in range(connections)))
+    return latencies, errors
+
+
+def load_client(task: tuple) -> tuple[list[float], int]:
+    """Процесс генератора нагрузки: возвращает задержки успешных ответов и количество ошибок."""
+    return asyncio.run(_load(*task))
+
+
+def run_load(base_url: str, paths: list[str], headers: dict, concurrency: int, clients: int,
+             duration: float) -> dict:
+    """
+        Создает нагрузку из нескольких процессов и собирает статистику.
+
+        Parameters:
+        - base_url: Адрес сервера.
+        - paths: Пути запросов (по кругу).
+        - headers: Заголовки запросов.
+        - concurrency: Общее количество соединений.
+        - clients: Количество процессов генератора нагрузки.
+        - duration: Длительность нагрузки в секундах.
+
+        Returns:
+        - dict: rps, количество ошибок и статистика задержек.
+        """
+    tasks = [(base_url, paths, headers, max(1, concurrency // clients), duration) for _ in range(clients)]
+    with multiprocessing.get_context('spawn').Pool(clients) as pool:
+        results = pool.map(load_client, tasks)
+    latencies = [latency for result in results for latency in result[0]]
+    errors = sum(result[1] for result in results)
+    return {'rps': len(latencies) / duration, 'errors': errors, 'latency': summarize(latencies or [0.0])}
+
+
+def start_server(root: str, url: str, port: int, workers: int, loop: str, http: str) -> subprocess.Popen:
+    """Запускает serve.py и ждет ответа liveness-пробы."""
+    env = {**os.environ, 'DB_URL': url, 'RATE_LIMIT_ENABLED': 'false', 'HEALTH_REDIS_REQUIRED': 'false',
+           'SERVER_DRAIN_SECONDS': '0', 'PYTHONPATH': root}
+    process = subprocess.Popen([sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', str(port),
+                                '--workers', str(workers), '--loop', loop, '--http', http],
+                               cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'serve.py exited with code {process.returncode}')
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/api/health/live', timeout=1).is_success:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('serve.py did not start in 120 seconds')
+
+
+def stop_server(process: subprocess.Popen) -> float:
+    """Останавливает сервер по SIGTERM и возвращает время остановки в секундах."""
+    started = time.monotonic()
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    return time.monotonic() - started
+
+
+async def prepare(args) -> dict:
+    from src.services.auth_services import auth_service
+
+    engine = make_engine(args.url)
+    await ensure_data(engine, args)
+    await engine.dispose()
+    token = await auth_service.create_access_token({'sub': 'user1@bench.com'}, expires_delta=24 * 3600)
+    return {'Authorization': f'Bearer {token}'}
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.set_defaults(rows=10_000, users=100)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2], help='количество воркеров сервера')
+    parser.add_argument('--stack', nargs='+', default=['uvloop/httptools', 'asyncio/h11'],
+                        help='цикл событий/парсер HTTP')
+    parser.add_argument('--paths', nargs='+', default=['/', '/contacts/?limit=20'], help='пути запросов')
+    parser.add_argument('--concurrency', type=int, default=64, help='общее количество соединений')
+    parser.add_argument('--clients', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='процессы генератора нагрузки')
+    parser.add_argument('--duration', type=float, default=10.0, help='длительность измерения в секундах')
+    parser.add_argument('--warmup', type=float, default=2.0, help='прогрев перед измерением в секундах')
+    parser.add_argument('--port', type=int, default=8799, help='порт сервера')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    headers = asyncio.run(prepare(args))
+    base_url = f'http://127.0.0.1:{args.port}'
+    report = {'url': args.url, 'cpus': os.cpu_count(), 'paths': args.paths, 'concurrency': args.concurrency,
+              'clients': args.clients, 'duration': args.duration, 'runs': []}
+    for stack in args.stack:
+        loop, http = stack.split('/')
+        for workers in args.workers:
+            process = start_server(root, args.url, args.port, workers, loop, http)
+            try:
+                run_load(base_url, args.paths, headers, args.concurrency, args.clients, args.warmup)
+                result = run_load(base_url, args.paths, headers, args.concurrency, args.clients, args.duration)
+            finally:
+                shutdown_seconds = stop_server(process)
+            report['runs'].append({'stack': stack, 'workers': workers, 'rps_per_worker': result['rps'] / workers,
+                                   'shutdown_seconds': shutdown_seconds, **result})
+    dump(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+    Количество обращений к базе и задержка изменения одного контакта:
+    прежние update_contact/delete_contact (SELECT, изменение ORM-объекта, COMMIT, refresh)
+    против patch_contact/delete_contact с UPDATE/DELETE ... RETURNING.
+
+    Обращением считается каждый SQL-запрос и каждый COMMIT. На SQLite задержку определяет
+    синхронизация файла при COMMIT, поэтому разница в обращениях заметна на PostgreSQL (--url).
+
+    python -m benchmarks.bench_updates --rows 100000 --users 1000 --repeat 500
+"""
+import asyncio
+import random
+import time
+from datetime import date
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import base_parser, make_engine, ensure_data, summarize, dump
+from src.contacts.models import Contact, User
+from src.repository import functiondb
+from src.schemas.checkschemas import CreateContactSchema
+
+
+async def legacy_update(contact_id, body, db, user):
+    contact = (await db.execute(select(Contact).filter_by(id=contact_id, user=user))).scalar_one_or_none()
+    if contact:
+        contact.name = body.name
+        contact.surname = body.surname
+        contact.phone = body.phone
+        contact.email = body.email
+        contact.birthday = body.birthday
+        await functiondb.bump_contacts_version(db, user.id)
+        await db.commit()
+        await db.refresh(contact)
+    return contact
+
+
+async def legacy_delete(contact_id, db, user):
+    contact = (await db.execute(select(Contact).filter_by(id=contact_id))).scalar_one_or_none()
+    if contact:
+        await db.delete(contact)
+        await functiondb.bump_contacts_version(db, contact.user_id)
+        await db.commit()
+    return contact
+
+
+class RoundTrips:
+    """Считает SQL-запросы и COMMIT на движке."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, 'before_cursor_execute', self.statement)
+        event.listen(engine.sync_engine, 'commit', self.commit)
+
+    def statement(self, *args):
+        self.count += 1
+
+    def commit(self, conn):
+        self.count += 1
+
+
+async def run(name, session_maker, targets, round_trips, repeat):
+    body = CreateContactSchema(name='Bench', surname='Update', phone='123', email='bench@mail.com',
+                               birthday=date(1990, 6, 15), information='')
+    samples, trips = [], []
+    async with session_maker() as session:
+        for i in range(repeat):
+            user, contact_id = targets[i % len(targets)]
+            if name.endswith('delete'):
+                contact = Contact(name='Bench', surname='Delete', phone='1', email='d@mail.com',
+                                  birthday=date(1990, 1, 1), information='', user_id=user.id)
+                session.add(contact)
+                await session.commit()
+                contact_id = contact.id
+            session.expunge_all()
+            before = round_trips.count
+            started = time.perf_counter()
+            if name == 'legacy_update':
+                await legacy_update(contact_id, body, session, user)
+            elif name == 'returning_update':
+                await functiondb.update_contact(contact_id, body, session, user)
+            elif name == 'returning_patch':
+                await functiondb.patch_contact(contact_id, {'phone': str(i)}, session, user)
+            elif name == 'legacy_delete':
+                await legacy_delete(contact_id, session, user)
+            else:
+                await functiondb.delete_contact(contact_id, session, user)
+            samples.append(time.perf_counter() - started)
+            trips.append(round_trips.count - before)
+    return {**summarize(samples), 'round_trips': sum(trips) / len(trips)}
+
+
+async def main(args):
+    engine = make_engine(args.url)
+    await ensure_data(engine, args)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    rnd = random.Random(3)
+    async with session_maker() as session:
+        pairs = (await session.execute(select(Contact.id, Contact.user_id).where(
+            Contact.id.in_(rnd.sample(range(1, args.rows + 1), min(args.rows, 500)))))).all()
+        users = {user.id: user for user in (await session.execute(select(User))).scalars()}
+    targets = [(users[user_id], contact_id) for contact_id, user_id in pairs]
+    round_trips = RoundTrips(engine)
+    report = {'rows': args.rows}
+    for name in ('legacy_update', 'returning_update', 'returning_patch', 'legacy_delete', 'returning_delete'):
+        report[name] = await run(name, session_maker, targets, round_trips, args.repeat)
+    report['update_speedup_p50'] = report['legacy_update']['p50_ms'] / report['returning_update']['p50_ms']
+    report['delete_speedup_p50'] = report['legacy_delete']['p50_ms'] / report['returning_delete']['p50_ms']
+    await engine.dispose()
+    dump(report)
+
+
+if __name__ == '__main__':
+    parser = base_parser('single contact update/delete round trips')
+    parser.set_defaults(rows=100_000, repeat=500)
+    asyncio.run(main(parser.parse_args()))
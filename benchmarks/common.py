@@ -0,0 +1,155 @@
+"""
+    Общие средства для бенчмарков: создание схемы, генерация данных и статистика задержек.
+
+    Бенчмарки запускаются как модули, например:
+    python -m benchmarks.bench_birthdays --url sqlite+aiosqlite:///./bench.db --rows 1000000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from src.contacts.models import Base, Contact, User, birthday_day_of_year
+
+DEFAULT_URL = 'sqlite+aiosqlite:///./bench.db'
+
+FIRST_NAMES = ['Anna', 'Bob', 'Carl', 'Dina', 'Egor', 'Fedor', 'Galina', 'Igor', 'Jack', 'Kira', 'Lev', 'Maria',
+               'Nina', 'Oleg', 'Petr', 'Roman', 'Sofia', 'Taras', 'Ulyana', 'Vadym']
+LAST_NAMES = ['Ivanenko', 'Petrenko', 'Shevchenko', 'Bondar', 'Tkachenko', 'Kovalenko', 'Boyko', 'Kravets',
+              'Oliynyk', 'Marchenko', 'Moroz', 'Lysenko', 'Rudenko', 'Savchenko', 'Melnyk', 'Koval']
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    """
+        Создает парсер аргументов с общими параметрами бенчмарков.
+
+        Parameters:
+        - description: Описание бенчмарка.
+
+        Returns:
+        - argparse.ArgumentParser: Парсер с параметрами --url, --rows, --users, --repeat и --reuse.
+        """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--url', default=DEFAULT_URL, help='URL базы данных для бенчмарка')
+    parser.add_argument('--rows', type=int, default=100_000, help='количество контактов')
+    parser.add_argument('--users', type=int, default=1000, help='количество пользователей')
+    parser.add_argument('--repeat', type=int, default=50, help='количество измерений')
+    parser.add_argument('--reuse', action='store_true', help='не пересоздавать данные, если они уже есть')
+    return parser
+
+
+def make_engine(url: str) -> AsyncEngine:
+    """Создает движок для бенчмарка."""
+    return create_async_engine(url)
+
+
+async def reset_schema(engine: AsyncEngine):
+    """Пересоздает все таблицы приложения."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def count_contacts(engine: AsyncEngine) -> int:
+    """Возвращает количество контактов или 0, если таблиц еще нет."""
+    try:
+        async with engine.connect() as conn:
+            return await conn.scalar(select(func.count()).select_from(Contact))
+    except Exception:
+        return 0
+
+
+async def seed(engine: AsyncEngine, users: int, rows: int, batch_size: int = 10_000, seed_value: int = 42,
+               password: str = 'x'):
+    """
+        Заполняет базу пользователями и равномерно распределенными между ними контактами.
+
+        Parameters:
+        - engine: Движок базы данных.
+        - users: Количество пользователей.
+        - rows: Количество контактов.
+        - batch_size: Количество строк в одном INSERT.
+        - seed_value: Начальное значение генератора случайных чисел.
+        - password: Хэш пароля, общий для всех пользователей.
+        """
+    rnd = random.Random(seed_value)
+    await reset_schema(engine)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [{'id': i, 'username': f'user{i}', 'email': f'user{i}@bench.com',
+                                           'password': password, 'confirmed': True} for i in range(1, users + 1)])
+    first_day = date(1950, 1, 1)
+    for start in range(0, rows, batch_size):
+        batch = []
+        for _ in range(min(batch_size, rows - start)):
+            name, surname = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            birthday = first_day + timedelta(days=rnd.randrange(20000))
+            batch.append({'name': name, 'surname': surname, 'phone': str(rnd.randrange(10 ** 9, 10 ** 10)),
+                          'email': f'{name}.{surname}{rnd.randrange(1000)}@mail.com'.lower(),
+                          'birthday': birthday, 'birthday_doy': birthday_day_of_year(birthday),
+                          'information': '', 'user_id': rnd.randrange(1, users + 1)})
+        async with engine.begin() as conn:
+            await conn.execute(insert(Contact), batch)
+
+
+async def ensure_data(engine: AsyncEngine, args):
+    """Создает данные, если их нет или если не указан флаг --reuse."""
+    if args.reuse and await count_contacts(engine) == args.rows:
+        return
+    await seed(engine, args.users, args.rows)
+
+
+def summarize(samples: list[float]) -> dict:
+    """
+        Считает статистику задержек.
+
+        Parameters:
+        - samples: Длительности в секундах.
+
+        Returns:
+        - dict: Количество измерений, среднее, p50, p95, p99 и максимум в миллисекундах.
+        """
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+async def measure(fn, repeat: int, warmup: int = 3) -> list[float]:
+    """
+        Многократно выполняет корутинную функцию и возвращает длительности вызовов.
+
+        Parameters:
+        - fn: Функция без аргументов, возвращающая корутину.
+        - repeat: Количество измерений.
+        - warmup: Количество прогревочных вызовов, которые не учитываются.
+
+        Returns:
+        - list[float]: Длительности в секундах.
+        """
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def dump(report: dict):
+    """Печатает отчет в формате JSON."""
+    print(json.dumps(report, indent=2, default=str))
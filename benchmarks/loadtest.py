@@ -0,0 +1,269 @@
+"""
+    Нагрузочное тестирование API: сценарии входа, списка контактов, поиска, дней рождения
+    и создания/изменения/удаления контакта при заданной конкурентности.
+
+    По умолчанию приложение запускается в процессе (httpx ASGITransport, без сети) на базе --url,
+    которая предварительно заполняется пользователями и контактами. С --base-url запросы идут
+    на запущенный сервер; тогда --url должен указывать на ту же базу, что и DB_URL сервера,
+    а сервер должен быть запущен с RATE_LIMIT_ENABLED=false.
+
+    Сессии refresh-токенов при входе хранятся в Redis из настроек (REDIS_DOMAIN/REDIS_PORT);
+    с --fake-redis в процессе используется fakeredis.
+
+    Результат - JSON с пропускной способностью и p50/p95/p99 для каждого сценария и уровня
+    конкурентности. Режим compare сравнивает результат с сохраненным эталоном и завершается
+    с кодом 1 при регрессии.
+
+    python -m benchmarks.loadtest run --rows 20000 --concurrency 1 8 32 --output current.json
+    python -m benchmarks.loadtest compare baseline.json current.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import date
+
+import httpx
+
+from benchmarks.common import DEFAULT_URL, FIRST_NAMES, dump, make_engine, seed, summarize
+from src.conf.dburl import config
+
+SCENARIOS = ('login', 'list', 'search', 'birthdays', 'crud')
+PASSWORD = 'loadtest-password'
+
+
+class VirtualUser:
+    """
+        Клиент нагрузочного теста: пользователь из заполненной базы с access-токеном.
+
+        Attributes:
+        - email (str): Email пользователя.
+        - headers (dict): Заголовок Authorization с access-токеном.
+        - rnd (random.Random): Генератор случайных чисел пользователя.
+        """
+
+    def __init__(self, client: httpx.AsyncClient, email: str, rnd: random.Random):
+        self.client = client
+        self.email = email
+        self.rnd = rnd
+        self.headers = {}
+
+    async def login(self):
+        response = await self.client.post('/auth/login', data={'username': self.email, 'password': PASSWORD})
+        response.raise_for_status()
+        self.headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+    async def list(self):
+        response = await self.client.get('/contacts/', params={'limit': 20, 'offset': self.rnd.randrange(0, 40)},
+                                         headers=self.headers)
+        response.raise_for_status()
+
+    async def search(self):
+        response = await self.client.get('/contacts/search/', params={'q': self.rnd.choice(FIRST_NAMES)[:3]},
+                                         headers=self.headers)
+        response.raise_for_status()
+
+    async def birthdays(self):
+        response = await self.client.get('/contacts/birthdays/', params={'days': 30}, headers=self.headers)
+        response.raise_for_status()
+
+    async def crud(self):
+        body = {'name': 'Load', 'surname': 'Test', 'phone': str(self.rnd.randrange(10 ** 9, 10 ** 10)),
+                'email': 'load@test.com', 'birthday': date(1990, 1, 1).isoformat(), 'information': ''}
+        response = await self.client.post('/contacts/', json=body, headers=self.headers)
+        response.raise_for_status()
+        contact_id = response.json()['id']
+        response = await self.client.put(f'/contacts/{contact_id}', json={**body, 'information': 'updated'},
+                                         headers=self.headers)
+        response.raise_for_status()
+        response = await self.client.delete(f'/contacts/{contact_id}', headers=self.headers)
+        response.raise_for_status()
+
+
+async def run_scenario(users: list[VirtualUser], scenario: str, concurrency: int, requests: int) -> dict:
+    """
+        Выполняет сценарий requests раз силами concurrency одновременных клиентов.
+
+        Parameters:
+        - users: Клиенты с токенами.
+        - scenario: Имя сценария (метод VirtualUser).
+        - concurrency: Количество одновременных клиентов.
+        - requests: Общее количество выполнений сценария.
+
+        Returns:
+        - dict: Количество выполнений и ошибок, длительность, пропускная способность и задержки.
+        """
+    samples, errors = [], 0
+    remaining = requests
+
+    async def worker(user: VirtualUser):
+        nonlocal remaining, errors
+        operation = getattr(user, scenario)
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                await operation()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(users[i % len(users)]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    result = {'requests': requests, 'errors': errors, 'seconds': elapsed, 'throughput_rps': len(samples) / elapsed}
+    if samples:
+        result.update(summarize(samples))
+    return result
+
+
+def in_process_client(url: str, fake_redis: bool = False) -> httpx.AsyncClient:
+    """
+        Создает клиент, который вызывает приложение в текущем процессе на базе url без лимитов запросов.
+
+        Parameters:
+        - url: URL базы данных.
+        - fake_redis: Хранить сессии refresh-токенов в fakeredis вместо Redis из настроек.
+
+        Returns:
+        - httpx.AsyncClient: Клиент с ASGITransport.
+        """
+    from main import app
+    from src.db.connectdb import ManageSession, get_db, get_read_db
+    from src.services.session_services import session_store
+
+    config.RATE_LIMIT_ENABLED = False
+    manager = ManageSession(url)
+    if fake_redis:
+        import fakeredis
+
+        session_store.init(fakeredis.FakeAsyncRedis())
+    else:
+        import redis.asyncio as redis
+
+        session_store.init(redis.Redis(host=config.REDIS_DOMAIN, port=config.REDIS_PORT,
+                                       password=config.REDIS_PASSWORD))
+
+    async def override_get_db():
+        async with manager.session() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=60)
+
+
+async def run(args) -> dict:
+    if not args.reuse:
+        from src.services.auth_services import auth_service
+
+        engine = make_engine(args.url)
+        await seed(engine, args.users, args.rows, password=auth_service.get_password_hash(PASSWORD))
+        await engine.dispose()
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = in_process_client(args.url, args.fake_redis)
+    rnd = random.Random(args.seed)
+    users = [VirtualUser(client, f'user{i}@bench.com', random.Random(rnd.random()))
+             for i in range(1, min(args.users, max(args.concurrency)) + 1)]
+    report = {'config': {'url': args.url, 'base_url': args.base_url or 'in-process', 'users': args.users,
+                         'rows': args.rows, 'requests': args.requests, 'concurrency': args.concurrency},
+              'results': {}}
+    try:
+        for user in users:
+            await user.login()
+        for scenario in args.scenarios:
+            report['results'][scenario] = {}
+            for concurrency in args.concurrency:
+                await run_scenario(users, scenario, concurrency, min(args.requests, args.warmup))
+                report['results'][scenario][str(concurrency)] = await run_scenario(users, scenario, concurrency,
+                                                                                   args.requests)
+    finally:
+        await client.aclose()
+    return report
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """
+        Сравнивает два отчета и возвращает регрессии.
+
+        Регрессия - падение пропускной способности или рост p95/p99 больше чем на threshold
+        (доля от эталона), а также появление ошибок.
+
+        Parameters:
+        - baseline: Эталонный отчет.
+        - current: Текущий отчет.
+        - threshold: Допустимое ухудшение, например 0.1 - 10%.
+
+        Returns:
+        - list[dict]: Регрессии: сценарий, конкурентность, метрика, эталон, текущее значение и изменение.
+        """
+    regressions = []
+    for scenario, levels in current['results'].items():
+        for concurrency, result in levels.items():
+            base = baseline['results'].get(scenario, {}).get(concurrency)
+            if base is None:
+                continue
+            checks = [('throughput_rps', -1), ('p95_ms', 1), ('p99_ms', 1)]
+            for metric, direction in checks:
+                if not base.get(metric) or metric not in result:
+                    continue
+                change = (result[metric] - base[metric]) / base[metric]
+                if change * direction > threshold:
+                    regressions.append({'scenario': scenario, 'concurrency': int(concurrency), 'metric': metric,
+                                        'baseline': base[metric], 'current': result[metric], 'change': change})
+            if result['errors'] > base['errors']:
+                regressions.append({'scenario': scenario, 'concurrency': int(concurrency), 'metric': 'errors',
+                                    'baseline': base['errors'], 'current': result['errors'],
+                                    'change': result['errors'] - base['errors']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='запустить сценарии')
+    run_parser.add_argument('--url', default=DEFAULT_URL, help='URL базы данных')
+    run_parser.add_argument('--base-url', default=None, help='адрес запущенного сервера (по умолчанию в процессе)')
+    run_parser.add_argument('--users', type=int, default=100, help='количество пользователей')
+    run_parser.add_argument('--rows', type=int, default=10_000, help='количество контактов')
+    run_parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    run_parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                            help='уровни конкурентности')
+    run_parser.add_argument('--requests', type=int, default=500, help='выполнений сценария на уровень')
+    run_parser.add_argument('--warmup', type=int, default=50, help='прогревочных выполнений на уровень')
+    run_parser.add_argument('--seed', type=int, default=42, help='начальное значение генератора')
+    run_parser.add_argument('--reuse', action='store_true', help='не заполнять базу заново')
+    run_parser.add_argument('--fake-redis', action='store_true', help='хранить сессии в fakeredis (в процессе)')
+    run_parser.add_argument('--output', default=None, help='файл для JSON-отчета')
+
+    compare_parser = commands.add_parser('compare', help='сравнить отчет с эталоном')
+    compare_parser.add_argument('baseline', help='эталонный JSON-отчет')
+    compare_parser.add_argument('current', help='текущий JSON-отчет')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='допустимое ухудшение (доля)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        report = asyncio.run(run(args))
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(report, file, indent=2)
+        dump(report)
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    regressions = compare(baseline, current, args.threshold)
+    dump({'threshold': args.threshold, 'regressions': regressions})
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,101 @@
+from contextlib import asynccontextmanager
+
 import redis.asyncio as redis
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
-from src.routes import myrouts, users
-from src.db.connectdb import get_db
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from src.routes import myrouts, users, stats
+from src.db.connectdb import session_manage
 from src.routes import auth
 from src.conf.dburl import config
-from fastapi_limiter import FastAPILimiter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from src.services.hash_services import password_hasher
+from src.services.ratelimit_services import rate_limit_backend
+from src.services.etag_services import response_cache
+from src.services.cache_services import user_cache, user_cache_sync, token_cache
+from src.services.session_services import session_store
+from src.services.health_services import health_checker
+from src.services.server_services import install_drain_handler
+from src.services import metrics_services
+from src.services.serializers import default_response_class
+from src.services.storage_services import MULTIPART_OVERHEAD, UploadLimitMiddleware
 
 origins = ["*"]
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+        Запуск и остановка приложения (lifespan).
+
+        При запуске создает клиент Redis и подключает его к лимитеру запросов, кэшу ответов, хранилищу
+        сессий refresh-токенов, маршрутизатору реплик (read-your-writes между воркерами) и инвалидации
+        кэша пользователей между воркерами (пока подписка не установлена, кэш не используется). Соединение
+        устанавливается при первом обращении, поэтому недоступный Redis не мешает запуску: лимитер
+        переходит на локальные token bucket, вход и обновление токенов отвечают 503, а чтения идут
+        в основную базу. Запускает фоновые проверки базы данных, Redis и пула соединений для
+        readiness-пробы и, если задан SERVER_DRAIN_SECONDS, откладывает остановку по SIGTERM
+        (см. server_services.install_drain_handler).
+
+        При остановке (после завершения начатых запросов) останавливает фоновые проверки, подписку
+        на инвалидацию кэша и пул хэширования паролей, закрывает клиент Redis и соединения с базой данных.
+
+        Parameters:
+        - app: Приложение FastAPI.
+        """
+    r = redis.Redis(host=config.REDIS_DOMAIN, port=config.REDIS_PORT, db=0, password=config.REDIS_PASSWORD,
+                    socket_timeout=config.REDIS_SOCKET_TIMEOUT, socket_connect_timeout=config.REDIS_SOCKET_TIMEOUT)
+    app.state.redis = r
+    rate_limit_backend.init(r)
+    response_cache.init(r)
+    session_store.init(r)
+    session_manage.init_redis(r)
+    user_cache_sync.init(r)
+    user_cache_sync.start()
+    health_checker.init(lambda: session_manage.engine, r, session_manage.pool_stats)
+    health_checker.start()
+    install_drain_handler(config.SERVER_DRAIN_SECONDS, health_checker.drain)
+    try:
+        yield
+    finally:
+        await health_checker.stop()
+        await user_cache_sync.stop()
+        password_hasher.shutdown()
+        await r.aclose()
+        await session_manage.dispose()
+
+
+app = FastAPI(default_response_class=default_response_class(), lifespan=lifespan)
 app.include_router(auth.routs)
 app.include_router(users.router, prefix='/api')
 app.include_router(myrouts.routs)
+app.include_router(stats.router)
+if config.AVATAR_STORAGE == 'local':
+    app.mount(config.AVATAR_BASE_URL, StaticFiles(directory=config.AVATAR_LOCAL_DIR, check_dir=False),
+              name='avatars')
+app.add_middleware(UploadLimitMiddleware, limits={'/api/avatar': config.AVATAR_MAX_BYTES + MULTIPART_OVERHEAD})
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"],
                    allow_headers=["*"])
+app.add_middleware(metrics_services.MetricsMiddleware, enabled=lambda: config.METRICS_ENABLED,
+                   exclude=('/metrics', '/api/health/live', '/api/health/ready', '/api/healthchecker'))
 
-
-@app.on_event('startup')
-async def startup():
-    """
-        Выполняет операции при запуске приложения.
-
-        Устанавливает соединение с Redis и инициализирует FastAPILimiter.
-
-        Raises:
-        - Exception: Если не удается установить соединение с Redis или инициализировать FastAPILimiter.
-        """
-    r = await redis.Redis(host=config.REDIS_DOMAIN, port=config.REDIS_PORT, db=0, password=config.REDIS_PASSWORD)
-    await FastAPILimiter.init(r)
+metrics_services.expose_stats('db_pool', 'Connection pool', session_manage.pool_stats,
+                              gauges=('checked_out', 'overflow'),
+                              counters=('checkouts', 'wait_seconds_sum', 'timeouts', 'connect_failures'))
+metrics_services.expose_stats('db_replicas', 'Read replicas', session_manage.replica_stats,
+                              gauges=('sticky_keys',), counters=('replica_reads', 'primary_reads', 'redis_errors'))
+metrics_services.expose_stats('password_hash', 'Password hashing pool', password_hasher.stats,
+                              gauges=('in_flight', 'queue_depth'), counters=('completed', 'rejected'))
+metrics_services.expose_stats('user_cache', 'User cache', user_cache.stats,
+                              gauges=('size',), counters=('hits', 'misses'))
+metrics_services.expose_stats('token_cache', 'Token cache', token_cache.stats,
+                              gauges=('size',), counters=('hits', 'misses'))
+metrics_services.expose_stats('response_cache', 'Response cache', response_cache.stats,
+                              counters=('hits', 'misses', 'errors'))
+metrics_services.expose_stats('health', 'Readiness checks', health_checker.stats,
+                              gauges=('ready', 'draining', 'age_seconds'), counters=('checks',))
+metrics_services.expose_stats('refresh_sessions', 'Refresh token sessions', session_store.stats,
+                              counters=('created', 'rotated', 'reuse_detected', 'revoked'))
 
 
 @app.get('/')
@@ -44,23 +109,59 @@ def index():
     return {'message': 'Todo Application'}
 
 
-@app.get('/api/healthchecker')
-async def healthchecker(db: AsyncSession = Depends(get_db)):
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False,
+         dependencies=[Depends(stats.metrics_access)])
+def metrics():
+    """
+        Возвращает метрики приложения в текстовом формате Prometheus.
+
+        Доступен только при METRICS_ENABLED=true; если задан METRICS_TOKEN, требуется заголовок
+        Authorization: Bearer <METRICS_TOKEN>.
+
+        Returns:
+        - PlainTextResponse: Метрики HTTP-запросов, SQL-запросов, пула соединений, кэшей и хэширования.
+        """
+    return PlainTextResponse(metrics_services.registry.render(), media_type='text/plain; version=0.0.4')
+
+
+@app.get('/api/health/live')
+async def liveness():
+    """
+        Liveness-проба: процесс запущен и цикл событий отвечает. Зависимости не проверяются.
+
+        Returns:
+        - dict: {'status': 'alive'}.
+        """
+    return {'status': 'alive'}
+
+
+@app.get('/api/health/ready')
+async def readiness():
     """
-       Проверяет доступность базы данных.
+        Readiness-проба из кэшированного результата фоновой проверки (см. health_services).
 
-       Parameters:
-       - db (AsyncSession, optional): Сессия базы данных. По умолчанию получается с помощью функции get_db.
+        Проба не берет соединение из пула и не обращается к Redis.
+
+        Returns:
+        - JSONResponse: 200, если база данных и Redis доступны, а пул не переполнен; иначе 503.
+          Тело содержит результаты проверок и возраст результата.
+        """
+    ready, body = health_checker.readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get('/api/healthchecker')
+async def healthchecker():
+    """
+       Проверяет доступность базы данных по результату последней фоновой проверки.
 
        Returns:
        - dict: Словарь с сообщением о доступности базы данных.
+
+       Raises:
+       - HTTPException: 500, если последняя проверка базы данных не прошла или проверок еще не было.
        """
-    try:
-        result = await db.execute(text('SELECT 1'))
-        result = result.fetchone()
-        if result is None:
-            raise HTTPException(status_code=500, detail='Error connecting to DB')
-        return {'message': 'Welcome to fastAPI'}
-    except Exception as e:
-        print(e)
+    _, body = health_checker.readiness()
+    if not body.get('checks', {}).get('database', {}).get('ok'):
         raise HTTPException(status_code=500, detail='Error connecting to DB')
+    return {'message': 'Welcome to fastAPI'}
@@ -0,0 +1,60 @@
+"""
+    Запуск приложения в production: несколько процессов-воркеров uvicorn на общем сокете.
+
+    - количество воркеров по умолчанию равно количеству доступных CPU с учетом квоты cgroup
+      (SERVER_WORKERS=0), каждый воркер - отдельный процесс со своим циклом событий и пулом соединений;
+    - uvloop и httptools используются, если они установлены (uvicorn[standard]);
+    - по SIGTERM экземпляр выводится из балансировки на SERVER_DRAIN_SECONDS (readiness-проба отвечает 503),
+      затем перестает принимать соединения и до SERVER_GRACEFUL_TIMEOUT секунд ждет завершения начатых
+      запросов; после этого lifespan закрывает клиент Redis и соединения с базой данных.
+
+    Параметры командной строки переопределяют настройки SERVER_*:
+
+    python serve.py
+    python serve.py --workers 4 --port 8080
+    python serve.py --reload  # разработка: один процесс с перезапуском при изменении файлов
+"""
+import argparse
+import logging
+
+import uvicorn
+
+from src.conf.dburl import config
+from src.services.server_services import available_cpus, pick_implementation, worker_count
+
+logger = logging.getLogger('uvicorn.error')
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Разбирает параметры командной строки; значения по умолчанию берутся из настроек SERVER_*."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=config.SERVER_HOST, help='адрес для входящих соединений')
+    parser.add_argument('--port', type=int, default=config.SERVER_PORT, help='порт')
+    parser.add_argument('--workers', type=int, default=config.SERVER_WORKERS,
+                        help='количество процессов (0 - по количеству CPU)')
+    parser.add_argument('--loop', choices=['auto', 'uvloop', 'asyncio'], default=config.SERVER_LOOP,
+                        help='цикл событий')
+    parser.add_argument('--http', choices=['auto', 'httptools', 'h11'], default=config.SERVER_HTTP,
+                        help='парсер HTTP')
+    parser.add_argument('--graceful-timeout', type=float, default=config.SERVER_GRACEFUL_TIMEOUT,
+                        help='ожидание начатых запросов после SIGTERM в секундах')
+    parser.add_argument('--access-log', action='store_true', help='писать журнал запросов uvicorn')
+    parser.add_argument('--reload', action='store_true', help='перезапуск при изменении файлов (только разработка)')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    workers = 1 if args.reload else worker_count(args.workers)
+    loop = pick_implementation(args.loop, 'uvloop', 'asyncio')
+    http = pick_implementation(args.http, 'httptools', 'h11')
+    logging.basicConfig(level=logging.INFO)
+    logger.info('starting %d worker(s) on %s:%d (cpus=%d, loop=%s, http=%s)', workers, args.host, args.port,
+                available_cpus(), loop, http)
+    uvicorn.run('main:app', host=args.host, port=args.port, workers=workers, loop=loop, http=http,
+                lifespan='on', timeout_graceful_shutdown=args.graceful_timeout, access_log=args.access_log,
+                reload=args.reload, proxy_headers=True)
+
+
+if __name__ == '__main__':
+    main()
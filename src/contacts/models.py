@@ -1,35 +1,100 @@
-from datetime import date
+from datetime import date, datetime
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy import String, Date, Column, create_engine, Integer, DateTime, func, ForeignKey, Boolean
-from src.conf.dburl import config
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
-import asyncio
-
-engine = create_async_engine(config.DB_URL)
-DBSession = async_sessionmaker(bind=engine)
-session = DBSession()
+from sqlalchemy.orm import declarative_base, relationship, validates
+from sqlalchemy import String, Date, Column, Integer, SmallInteger, DateTime, func, ForeignKey, Boolean, \
+    Index, DDL, event, Text
+
 Base = declarative_base()
 
 
+def birthday_day_of_year(birthday: date) -> int:
+    """
+        Возвращает номер дня рождения в году, нормализованный по високосному году.
+
+        29 февраля всегда имеет номер 60, а 1 марта - 61, поэтому номер не зависит от года рождения.
+
+        Parameters:
+        - birthday (date): Дата рождения.
+
+        Returns:
+        - int: Номер дня от 1 до 366.
+        """
+    return date(2000, birthday.month, birthday.day).timetuple().tm_yday
+
+
 class Contact(Base):
     """
        Модель для хранения контактов пользователей.
        """
     __tablename__ = 'contacts'
+    __table_args__ = (
+        # Индекс для keyset-пагинации: WHERE user_id = :uid AND id > :after ORDER BY id
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        # Индекс для поиска ближайших дней рождения диапазоном по birthday_doy
+        Index('ix_contacts_user_id_birthday_doy', 'user_id', 'birthday_doy'),
+        # Триграммные индексы для поиска подстроки (ILIKE '%q%') в PostgreSQL
+        Index('ix_contacts_name_trgm', 'name', postgresql_using='gin',
+              postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_contacts_surname_trgm', 'surname', postgresql_using='gin',
+              postgresql_ops={'surname': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_contacts_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        # Покрывающий индекс для поиска подстроки среди контактов одного пользователя в SQLite
+        Index('ix_contacts_user_id_search', 'user_id', 'name', 'surname', 'email').ddl_if(dialect='sqlite'),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(30))
     surname: Mapped[str] = mapped_column(String(30))
     phone: Mapped[str] = mapped_column(String(30))
     email: Mapped[str] = mapped_column(String(30))
     birthday = Column(Date, nullable=False)
+    birthday_doy: Mapped[int] = mapped_column(SmallInteger, nullable=True)
     information: Mapped[str] = mapped_column(String(250))
     created_at: Mapped[date] = mapped_column('created_at', DateTime, default=func.now(), nullable=True)
     update_at: Mapped[date] = mapped_column('update_at', DateTime, default=func.now(), onupdate=func.now())
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=True)
     user: Mapped['User'] = relationship('User',backref='contacts',lazy='joined')
 
+    @validates('birthday')
+    def validate_birthday(self, key, value):
+        """Синхронизирует birthday_doy при каждом изменении birthday."""
+        birthday = date.fromisoformat(value) if isinstance(value, str) else value
+        self.birthday_doy = birthday_day_of_year(birthday) if birthday is not None else None
+        return value
+
+
+# PostgreSQL: расширение pg_trgm для триграммных GIN-индексов.
+event.listen(Contact.__table__, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+# SQLite: теневая FTS5-таблица с триграммным токенизатором, синхронизируемая триггерами.
+# Столбец owner хранит токен владельца '#<user_id>#': условие на него входит в MATCH, поэтому
+# FTS5 пересекает списки документов внутри индекса и не перебирает совпадения других пользователей.
+CONTACTS_FTS_OWNER = "'#' || {row}.user_id || '#'"
+CONTACTS_FTS_DDL = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+        "name, surname, email, owner, content='', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+        "INSERT INTO contacts_fts(rowid, name, surname, email, owner) "
+        f"VALUES (new.id, new.name, new.surname, new.email, {CONTACTS_FTS_OWNER.format(row='new')}); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+        "INSERT INTO contacts_fts(contacts_fts, rowid, name, surname, email, owner) "
+        f"VALUES ('delete', old.id, old.name, old.surname, old.email, {CONTACTS_FTS_OWNER.format(row='old')}); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF name, surname, email, user_id ON contacts BEGIN "
+        "INSERT INTO contacts_fts(contacts_fts, rowid, name, surname, email, owner) "
+        f"VALUES ('delete', old.id, old.name, old.surname, old.email, {CONTACTS_FTS_OWNER.format(row='old')}); "
+        "INSERT INTO contacts_fts(rowid, name, surname, email, owner) "
+        f"VALUES (new.id, new.name, new.surname, new.email, {CONTACTS_FTS_OWNER.format(row='new')}); "
+        "END",
+)
+for statement in CONTACTS_FTS_DDL:
+    event.listen(Contact.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Contact.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS contacts_fts').execute_if(dialect='sqlite'))
+
 
 class User(Base):
     """
@@ -45,13 +110,54 @@ class User(Base):
     updated_at: Mapped[date] = mapped_column('updated_at', DateTime, default=func.now(), onupdate=func.now())
     avatar: Mapped[str] = mapped_column(String(255), nullable=True)
     confirmed:Mapped[bool]=mapped_column(Boolean,default=False)
+    # Версия адресной книги: увеличивается при каждом изменении контактов пользователя (используется в ETag)
+    contacts_version: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+
+
+class EmailOutbox(Base):
+    """
+        Исходящее письмо, ожидающее отправки фоновым воркером (паттерн outbox).
+
+        Письмо записывается в той же транзакции, что и изменение данных, поэтому не теряется
+        при перезапуске веб-процесса. next_attempt_at служит и временем следующей попытки,
+        и сроком аренды письма воркером: письмо в статусе 'sending' с истекшим сроком
+        снова становится доступным для отправки.
+        """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # Индекс для выборки очередной пачки: WHERE status IN (...) AND next_attempt_at <= now ORDER BY id
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    recipient: Mapped[str] = mapped_column(String(150))
+    subject: Mapped[str] = mapped_column(String(255))
+    template_name: Mapped[str] = mapped_column(String(100))
+    # Переменные шаблона; очищаются, когда письмо отправлено или окончательно не доставлено
+    template_body: Mapped[str] = mapped_column(Text, nullable=True)
+    status: Mapped[str] = mapped_column(String(10), default='pending')
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[date] = mapped_column(DateTime, default=datetime.utcnow)
+    last_error: Mapped[str] = mapped_column(String(500), nullable=True)
+    created_at: Mapped[date] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[date] = mapped_column(DateTime, nullable=True)
 
 
 
 
 async def create_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.conf.dburl import config
+    from src.db.upgrade import upgrade_schema
+
+    # Движок создается только для этого сценария, а не при импорте моделей
+    engine = create_async_engine(config.DB_URL)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # Существующие таблицы: новые столбцы, индексы и заполнение данных
+            await conn.run_sync(upgrade_schema)
+    finally:
+        await engine.dispose()
 
 
 # Запуск сценария асинхронного создания таблиц
@@ -61,4 +167,6 @@ async def main():
 
 # Запуск асинхронного сценария
 if __name__ == '__main__':
+    import asyncio
+
     asyncio.run(main())
@@ -1,23 +1,433 @@
+import bisect
 import contextlib
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
 
+from redis.exceptions import RedisError
+from sqlalchemy import event, exc, make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import await_only
 
 from src.conf.dburl import config
+from src.services import metrics_services
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+        Метрики пула соединений: время ожидания соединения, таймауты и ошибки подключения.
+
+        Attributes:
+        - buckets (tuple[float, ...]): Верхние границы корзин гистограммы ожидания в секундах.
+        - wait_counts (list[int]): Количество ожиданий в каждой корзине (последняя - +Inf).
+        - wait_sum (float): Суммарное время ожидания в секундах.
+        - checkouts (int): Количество выданных соединений.
+        - timeouts (int): Количество превышений pool_timeout.
+        - connect_failures (int): Количество ошибок при установке соединения.
+        """
+    buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.wait_counts = [0] * (len(self.buckets) + 1)
+        self.wait_sum = 0.0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connect_failures = 0
+
+    def observe_wait(self, seconds: float):
+        """Учитывает время ожидания соединения."""
+        self.wait_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.wait_sum += seconds
+        self.checkouts += 1
+
+    def histogram(self) -> dict:
+        """
+                Возвращает кумулятивную гистограмму ожидания.
+
+                Returns:
+                - dict: Количество ожиданий не дольше каждой границы (в секундах), включая '+Inf'.
+                """
+        result, total = {}, 0
+        for bound, count in zip([*map(str, self.buckets), '+Inf'], self.wait_counts):
+            total += count
+            result[bound] = total
+        return result
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+        Пул соединений, который измеряет время получения соединения и считает ошибки.
+        """
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.timeouts += 1
+            raise
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.connect_failures += 1
+            raise
+        if self.metrics is not None:
+            self.metrics.observe_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def engine_options(url: str) -> dict:
+    """
+        Собирает параметры create_async_engine из настроек пула.
+
+        Для SQLite параметры пула не передаются: у него собственная стратегия пула.
+
+        Parameters:
+        - url: URL для подключения к базе данных.
+
+        Returns:
+        - dict: Именованные аргументы для create_async_engine.
+        """
+    dialect = make_url(url).get_backend_name()
+    if dialect == 'sqlite':
+        return {}
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+        'pool_recycle': config.DB_POOL_RECYCLE,
+        'pool_pre_ping': config.DB_POOL_PRE_PING,
+    }
+    if make_url(url).get_driver_name() == 'asyncpg':
+        options['connect_args'] = {'prepared_statement_cache_size': config.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics_services.record_query(time.perf_counter() - conn.info['query_started'].pop())
+
+
+def _handle_error(context):
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        metrics_services.record_query(time.perf_counter() - started.pop())
+
+
+def instrument_queries(engine: AsyncEngine):
+    """
+        Подключает обработчики before/after_cursor_execute, которые считают SQL-запросы и их длительность
+        (общие метрики и метрики текущего HTTP-запроса, см. metrics_services.record_query).
+
+        Parameters:
+        - engine: Движок базы данных.
+        """
+    event.listen(engine.sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine.sync_engine, 'handle_error', _handle_error)
+
+
+# Ключ пользователя текущего запроса (устанавливается в auth_service.get_current_user):
+# по нему запоминаются записи пользователя и выбирается база для его чтений.
+current_user_key: ContextVar[object | None] = ContextVar('current_user_key', default=None)
+
+
+class ReplicaRouter:
+    """
+        Выбор реплики для чтения и прилипание к основной базе после записи (read-your-writes).
+
+        После commit в основной базе ключ пользователя запоминается на sticky_seconds; пока срок
+        не истек, его чтения идут в основную базу, чтобы пользователь видел свои изменения
+        независимо от отставания реплик.
+
+        Записи хранятся в Redis (ключ с TTL, см. init), поэтому запись, обработанная одним воркером
+        serve.py, видна остальным. Память процесса служит кэшем собственных записей воркера и
+        хранилищем, пока Redis не подключен. Если Redis недоступен, все чтения в течение redis_retry
+        секунд идут в основную базу: без данных о записях реплике доверять нельзя.
+
+        Методы mark_write и is_sticky синхронные (вызываются из get_bind и after_commit) и обращаются
+        к Redis через await_only, то есть только внутри greenlet асинхронной сессии.
+
+        Attributes:
+        - engines (list[AsyncEngine]): Движки реплик.
+        - strategy (str): 'round_robin' или 'least_connections' (реплика с наименьшим числом открытых сессий).
+        - sticky_seconds (float): Длительность прилипания к основной базе после записи.
+        - in_use (list[int]): Количество открытых сессий чтения на каждой реплике.
+        - reads (list[int]): Количество сессий чтения, выданных каждой реплике.
+        - primary_reads (int): Количество сессий чтения, направленных в основную базу после записи.
+        - redis_errors (int): Количество ошибок обращения к Redis.
+        """
+
+    def __init__(self, engines: list[AsyncEngine], strategy: str = 'round_robin', sticky_seconds: float = 5.0,
+                 max_keys: int = 100000, redis_retry: float = 5.0, prefix: str = 'rw'):
+        self.engines = engines
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.max_keys = max_keys
+        self.redis_retry = redis_retry
+        self.prefix = prefix
+        self.redis = None
+        self.in_use = [0] * len(engines)
+        self.reads = [0] * len(engines)
+        self.primary_reads = 0
+        self.redis_errors = 0
+        self._next = 0
+        self._writes: OrderedDict = OrderedDict()
+        self._redis_down_until = 0.0
+
+    def init(self, redis):
+        """
+                Подключает Redis как общее для всех воркеров хранилище записей.
+
+                Parameters:
+                - redis: Клиент redis.asyncio.
+                """
+        self.redis = redis
+        self._redis_down_until = 0.0
+
+    def _redis_failed(self, err: Exception):
+        self.redis_errors += 1
+        self._redis_down_until = time.monotonic() + self.redis_retry
+        logger.warning('read-your-writes: Redis unavailable, reading from primary for %ss: %s', self.redis_retry, err)
+
+    def _redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def mark_write(self, key):
+        """Запоминает запись пользователя key в памяти процесса и в Redis."""
+        if key is None or not self.engines or self.sticky_seconds <= 0:
+            return
+        self._writes[key] = time.monotonic() + self.sticky_seconds
+        self._writes.move_to_end(key)
+        while len(self._writes) > self.max_keys:
+            self._writes.popitem(last=False)
+        if self._redis_available():
+            try:
+                await_only(self.redis.set(f'{self.prefix}:{key}', 1, px=int(self.sticky_seconds * 1000)))
+            except (RedisError, OSError) as err:
+                self._redis_failed(err)
+
+    def is_sticky(self, key) -> bool:
+        """
+                Проверяет, должен ли пользователь key читать из основной базы.
+
+                Returns:
+                - bool: True, если пользователь недавно писал или Redis подключен, но недоступен.
+                """
+        deadline = self._writes.get(key)
+        if deadline is not None:
+            if deadline > time.monotonic():
+                return True
+            del self._writes[key]
+        if self.redis is None:
+            return False
+        if not self._redis_available():
+            return True
+        try:
+            return bool(await_only(self.redis.exists(f'{self.prefix}:{key}')))
+        except (RedisError, OSError) as err:
+            self._redis_failed(err)
+            return True
+
+    def acquire(self, key) -> int | None:
+        """
+                Выбирает реплику для новой сессии чтения.
+
+                Parameters:
+                - key: Ключ пользователя или None.
+
+                Returns:
+                - int | None: Индекс реплики или None, если читать нужно из основной базы.
+                """
+        if not self.engines:
+            return None
+        if key is not None and self.is_sticky(key):
+            self.primary_reads += 1
+            return None
+        if self.strategy == 'least_connections':
+            index = min(range(len(self.engines)), key=lambda i: (self.in_use[i], self.reads[i]))
+        else:
+            index = self._next % len(self.engines)
+            self._next += 1
+        self.in_use[index] += 1
+        self.reads[index] += 1
+        return index
+
+    def release(self, index: int):
+        """Отмечает закрытие сессии чтения на реплике index."""
+        self.in_use[index] -= 1
+
+    def stats(self) -> dict:
+        """
+                Возвращает распределение чтений.
+
+                Returns:
+                - dict: Количество реплик, стратегия, сессии по репликам, чтения из основной базы, число ключей
+                  с недавней записью в памяти процесса, хранилище записей и количество ошибок Redis.
+                """
+        return {'replicas': len(self.engines), 'strategy': self.strategy, 'replica_reads': sum(self.reads),
+                'reads': list(self.reads), 'in_use': list(self.in_use), 'primary_reads': self.primary_reads,
+                'sticky_keys': len(self._writes), 'sticky_store': 'memory' if self.redis is None else 'redis',
+                'redis_errors': self.redis_errors}
+
+
+class RoutingSession(Session):
+    """
+        Сессия ManageSession. В сессии чтения (info['router']) реплика выбирается при первом
+        запросе, а не при создании: зависимости FastAPI создают сессию раньше, чем становится известен
+        текущий пользователь, поэтому ключ для read-your-writes читается из current_user_key в момент
+        первого обращения к базе. В сессии основной базы (info['writes']) после commit запоминается
+        запись текущего пользователя.
+        """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router: ReplicaRouter | None = self.info.get('router')
+        if router is None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if 'replica' not in self.info:
+            key = self.info.get('key')
+            self.info['replica'] = router.acquire(current_user_key.get() if key is None else key)
+        index = self.info['replica']
+        if index is None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        return router.engines[index].sync_engine
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(session):
+    router: ReplicaRouter | None = session.info.get('writes')
+    if router is not None:
+        router.mark_write(current_user_key.get())
 
 
 class ManageSession:
     """
         Класс для управления сессиями базы данных.
+
+        Сессии session() работают с основной базой, сессии read_session() - с репликами
+        (см. ReplicaRouter), если они заданы.
         """
-    def __init__(self,url):
+    def __init__(self,url, replica_urls=(), replica_strategy: str = 'round_robin',
+                 sticky_seconds: float = 5.0):
         """
                 Инициализация объекта управления сессиями базы данных.
 
+                Параметры пула берутся из настроек (см. engine_options). Если включены METRICS_ENABLED
+                и DB_QUERY_METRICS, к движку подключаются обработчики, измеряющие SQL-запросы.
+
+                Объекты не сбрасываются после commit (expire_on_commit=False): обработчики сериализуют
+                текущего пользователя и контакты после фиксации транзакции, а ленивая загрузка
+                атрибутов в асинхронной сессии невозможна.
+
                 Parameters:
                 - url: URL для подключения к базе данных.
+                - replica_urls: URL реплик для чтения.
+                - replica_strategy: Выбор реплики: 'round_robin' или 'least_connections'.
+                - sticky_seconds: Сколько секунд после записи пользователя его чтения идут в основную базу.
+                """
+        self.url = url
+        self.replica_urls = list(replica_urls)
+        self.replica_strategy = replica_strategy
+        self.sticky_seconds = sticky_seconds
+        self.pool_metrics = PoolMetrics()
+        self._engine = None
+        self._router = None
+        self._session_maker = None
+        self._read_session_maker = None
+        self._redis = None
+
+    def init_redis(self, redis):
+        """
+                Подключает Redis для read-your-writes между воркерами (см. ReplicaRouter.init).
+
+                Parameters:
+                - redis: Клиент redis.asyncio.
+                """
+        self._redis = redis
+        if self._router is not None:
+            self._router.init(redis)
+
+    def _connect(self):
+        """
+                Создает движки и фабрики сессий при первом обращении, а не при импорте модуля.
+
+                Соединения с базой при этом не открываются: пул заполняется по мере запросов.
+                """
+        if self._engine is not None:
+            return
+        engine = create_async_engine(self.url, **engine_options(self.url))
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.metrics = self.pool_metrics
+        replicas = [create_async_engine(replica_url, **engine_options(replica_url)) for replica_url in self.replica_urls]
+        self._router = ReplicaRouter(replicas, self.replica_strategy, self.sticky_seconds,
+                                     redis_retry=config.DB_READ_YOUR_WRITES_REDIS_RETRY)
+        if self._redis is not None:
+            self._router.init(self._redis)
+        self._session_maker= async_sessionmaker(autoflush=False,autocommit=False,expire_on_commit=False,bind=engine,
+                                                sync_session_class=RoutingSession, info={'writes': self._router})
+        self._read_session_maker = async_sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False,
+                                                      bind=engine, sync_session_class=RoutingSession,
+                                                      info={'router': self._router})
+        if config.METRICS_ENABLED and config.DB_QUERY_METRICS:
+            for instrumented in [engine, *replicas]:
+                instrument_queries(instrumented)
+        self._engine = engine
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """Движок базы данных (создается при первом обращении)."""
+        self._connect()
+        return self._engine
+
+    @property
+    def router(self) -> ReplicaRouter:
+        """Маршрутизатор чтений по репликам (создается вместе с движком)."""
+        self._connect()
+        return self._router
+
+    async def dispose(self):
+        """
+                Закрывает соединения основной базы и реплик. Следующее обращение создаст движки заново.
                 """
-        self._engine=create_async_engine(url)
-        self._session_maker= async_sessionmaker(autoflush=False,autocommit=False,bind=self._engine)
+        if self._engine is None:
+            return
+        for engine in [self._engine, *self._router.engines]:
+            await engine.dispose()
+        self._engine = self._router = self._session_maker = self._read_session_maker = None
+
+    def pool_stats(self) -> dict:
+        """
+                Возвращает состояние пула соединений и накопленные метрики.
+
+                Returns:
+                - dict: Размер пула, количество выданных соединений, переполнение, гистограмма ожидания,
+                  таймауты и ошибки подключения.
+                """
+        pool = self.engine.pool
+        stats = {'pool': type(pool).__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(),
+                         overflow=pool.overflow(), max_overflow=pool._max_overflow)
+        metrics = self.pool_metrics
+        stats.update(checkouts=metrics.checkouts, wait_seconds_sum=metrics.wait_sum,
+                     wait_seconds_histogram=metrics.histogram(), timeouts=metrics.timeouts,
+                     connect_failures=metrics.connect_failures)
+        return stats
 
     @contextlib.asynccontextmanager
     async def session(self):
@@ -27,6 +437,7 @@ class ManageSession:
                 Yields:
                 - Сессия базы данных.
                 """
+        self._connect()
         if self._session_maker is None:
             raise Exception('No connect to DB')
         session=self._session_maker()
@@ -35,10 +446,51 @@ class ManageSession:
         except Exception as err:
             print(err)
             await session.rollback()
+            raise
         finally:
             await session.close()
 
-session_manage=ManageSession(config.DB_URL)
+    @contextlib.asynccontextmanager
+    async def read_session(self, key=None):
+        """
+                Менеджер контекста для получения сессии только для чтения.
+
+                Запросы идут на реплику, выбранную ReplicaRouter, или в основную базу, если реплик нет
+                либо пользователь недавно писал. Изменять данные в этой сессии нельзя.
+
+                Parameters:
+                - key: Ключ пользователя для read-your-writes (по умолчанию current_user_key текущего запроса).
+
+                Yields:
+                - Сессия базы данных.
+                """
+        self._connect()
+        router = self._router
+        session = self._read_session_maker()
+        if key is not None:
+            session.sync_session.info['key'] = key
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+            index = session.sync_session.info.get('replica')
+            if index is not None:
+                router.release(index)
+
+    def replica_stats(self) -> dict:
+        """
+                Возвращает распределение чтений между репликами и основной базой.
+
+                Returns:
+                - dict: См. ReplicaRouter.stats.
+                """
+        return self.router.stats()
+
+session_manage=ManageSession(config.DB_URL, config.DB_REPLICA_URLS, config.DB_REPLICA_STRATEGY,
+                             config.DB_READ_YOUR_WRITES_SECONDS)
 
 async def get_db():
     """
@@ -51,6 +503,18 @@ async def get_db():
         yield session
 
 
+async def get_read_db():
+    """
+        Функция для получения асинхронной сессии только для чтения (реплика, см. ManageSession.read_session).
+        Используется GET-маршрутами, которые не изменяют данные.
+
+        Yields:
+        - Асинхронная сессия базы данных.
+    """
+    async with session_manage.read_session() as session:
+        yield session
+
+
 
 
 
@@ -0,0 +1,138 @@
+"""
+    Идемпотентное обновление схемы существующей базы данных.
+
+    Base.metadata.create_all создает только отсутствующие таблицы: в уже существующие таблицы
+    столбцы и индексы не добавляются. upgrade_schema доводит базу, созданную предыдущей версией
+    приложения, до текущих моделей и заполняет новые столбцы; повторный запуск ничего не меняет.
+
+    Вызывается из create_tables (python -m src.contacts.models) после create_all.
+"""
+import logging
+
+from sqlalchemy import Connection, inspect, select, text, update
+
+from src.contacts.models import CONTACTS_FTS_DDL, CONTACTS_FTS_OWNER, Contact, birthday_day_of_year
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 10_000
+
+# Номер дня рождения в високосном 2000 году (см. birthday_day_of_year) средствами базы данных
+DAY_OF_YEAR_SQL = {
+    'postgresql': "EXTRACT(DOY FROM make_date(2000, EXTRACT(MONTH FROM birthday)::int, "
+                  "EXTRACT(DAY FROM birthday)::int))::smallint",
+    'sqlite': "CAST(strftime('%j', '2000-' || strftime('%m-%d', birthday)) AS INTEGER)",
+}
+
+CONTACTS_FTS_FILL = ('INSERT INTO contacts_fts(rowid, name, surname, email, owner) '
+                     f"SELECT id, name, surname, email, {CONTACTS_FTS_OWNER.format(row='contacts')} FROM contacts")
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+
+def _add_column(conn: Connection, table: str, name: str, ddl: str) -> bool:
+    """
+        Добавляет столбец в существующую таблицу, если его нет.
+
+        Parameters:
+        - conn: Соединение с базой данных.
+        - table: Имя таблицы.
+        - name: Имя столбца.
+        - ddl: Определение столбца (тип и ограничения).
+
+        Returns:
+        - bool: True, если столбец был добавлен.
+        """
+    if name in _columns(conn, table):
+        return False
+    if_not_exists = 'IF NOT EXISTS ' if conn.dialect.name == 'postgresql' else ''
+    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {if_not_exists}{name} {ddl}'))
+    logger.info('added column %s.%s', table, name)
+    return True
+
+
+def _create_index(conn: Connection, name: str):
+    index = next(index for index in Contact.__table__.indexes if index.name == name)
+    index.create(conn, checkfirst=True)
+
+
+def add_birthday_doy(conn: Connection):
+    """
+        Добавляет столбец contacts.birthday_doy, заполняет его для существующих контактов
+        и создает индекс (user_id, birthday_doy).
+
+        Parameters:
+        - conn: Соединение с базой данных.
+        """
+    _add_column(conn, 'contacts', 'birthday_doy', 'SMALLINT')
+    day_of_year = DAY_OF_YEAR_SQL.get(conn.dialect.name)
+    if day_of_year is not None:
+        result = conn.execute(text(f'UPDATE contacts SET birthday_doy = {day_of_year} '
+                                   'WHERE birthday_doy IS NULL AND birthday IS NOT NULL'))
+        filled = result.rowcount
+    else:
+        filled = 0
+        while rows := conn.execute(select(Contact.id, Contact.birthday)
+                                   .filter(Contact.birthday_doy.is_(None), Contact.birthday.is_not(None))
+                                   .limit(BACKFILL_BATCH_SIZE)).all():
+            conn.execute(update(Contact), [{'id': row.id, 'birthday_doy': birthday_day_of_year(row.birthday)}
+                                           for row in rows])
+            filled += len(rows)
+    if filled:
+        logger.info('filled contacts.birthday_doy for %d contacts', filled)
+    _create_index(conn, 'ix_contacts_user_id_birthday_doy')
+
+
+def add_contacts_version(conn: Connection):
+    """
+        Добавляет столбец users.contacts_version (версия адресной книги для ETag).
+
+        Parameters:
+        - conn: Соединение с базой данных.
+        """
+    _add_column(conn, 'users', 'contacts_version', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def add_search_indexes(conn: Connection):
+    """
+        Создает индексы поиска контактов: триграммные GIN-индексы в PostgreSQL, покрывающий индекс
+        ix_contacts_user_id_search и таблицу contacts_fts с триггерами в SQLite. Таблица contacts_fts
+        предыдущей версии (без столбца owner) пересоздается; новая таблица заполняется по существующим
+        контактам.
+
+        Parameters:
+        - conn: Соединение с базой данных.
+        """
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        for name in ('ix_contacts_name_trgm', 'ix_contacts_surname_trgm', 'ix_contacts_email_trgm'):
+            _create_index(conn, name)
+    elif conn.dialect.name == 'sqlite':
+        _create_index(conn, 'ix_contacts_user_id_search')
+        exists = inspect(conn).has_table('contacts_fts')
+        if exists and 'owner' not in _columns(conn, 'contacts_fts'):
+            for trigger in ('contacts_fts_ai', 'contacts_fts_ad', 'contacts_fts_au'):
+                conn.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+            conn.execute(text('DROP TABLE contacts_fts'))
+            exists = False
+        for statement in CONTACTS_FTS_DDL:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(CONTACTS_FTS_FILL))
+            logger.info('built contacts_fts for existing contacts')
+
+
+UPGRADES = (add_birthday_doy, add_contacts_version, add_search_indexes)
+
+
+def upgrade_schema(conn: Connection):
+    """
+        Выполняет все шаги обновления схемы по порядку.
+
+        Parameters:
+        - conn: Синхронное соединение (AsyncConnection.run_sync) внутри транзакции.
+        """
+    for step in UPGRADES:
+        step(conn)
@@ -1,12 +1,18 @@
+import base64
+import json
 import sys
 
-from sqlalchemy import select, cast, Date, or_, and_, extract
+from sqlalchemy import select, insert, update, delete, or_, case, literal_column, table, column
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.contacts.models import Contact, User
-from src.schemas.checkschemas import CreateContactSchema, CreateContact
-from datetime import datetime, timedelta
+from src.contacts.models import Contact, User, birthday_day_of_year
+from src.schemas.checkschemas import CreateContactSchema
+from datetime import date, timedelta
 from sqlalchemy import func
 
+CONTACT_COLUMNS = (Contact.id, Contact.name, Contact.surname, Contact.phone, Contact.email, Contact.birthday,
+                   Contact.information)
+
+
 async def get_contacts(limit: int, offset: int, db: AsyncSession,user: User):
     """
         Получает контакты из базы данных для указанного пользователя.
@@ -25,6 +31,167 @@ async def get_contacts(limit: int, offset: int, db: AsyncSession,user: User):
     return contacts.scalars().all()
 
 
+async def get_contacts_rows(limit: int, offset: int, db: AsyncSession, user: User):
+    """
+        Получает контакты пользователя в виде легковесных строк (только колонки контакта).
+
+        В отличие от get_contacts не создает ORM-объекты и не выполняет JOIN с таблицей users.
+
+        Parameters:
+        - limit (int): Максимальное количество контактов для извлечения.
+        - offset (int): Смещение для запроса.
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Пользователь, для которого нужно получить контакты.
+
+        Returns:
+        - Sequence[RowMapping]: Строки с полями контакта.
+        """
+    smt = select(*CONTACT_COLUMNS).filter(Contact.user_id == user.id).order_by(Contact.id).offset(offset).limit(limit)
+    result = await db.execute(smt)
+    return result.mappings().all()
+
+
+def encode_cursor(user_id: int, contact_id: int) -> str:
+    """
+        Кодирует позицию последнего контакта страницы в непрозрачный курсор.
+
+        Parameters:
+        - user_id (int): Идентификатор владельца контактов.
+        - contact_id (int): Идентификатор последнего контакта на странице.
+
+        Returns:
+        - str: Курсор в формате base64url.
+        """
+    raw = json.dumps([user_id, contact_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """
+        Декодирует курсор, созданный функцией encode_cursor.
+
+        Parameters:
+        - cursor (str): Курсор в формате base64url.
+
+        Returns:
+        - tuple[int, int]: Пара (user_id, contact_id).
+
+        Raises:
+        - ValueError: Если курсор поврежден.
+        """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        user_id, contact_id = json.loads(raw)
+    except (ValueError, TypeError) as err:
+        raise ValueError('invalid cursor') from err
+    if not isinstance(user_id, int) or not isinstance(contact_id, int):
+        raise ValueError('invalid cursor')
+    return user_id, contact_id
+
+
+async def get_contacts_after(after_id: int | None, limit: int, db: AsyncSession, user: User):
+    """
+        Получает страницу контактов пользователя с помощью keyset-пагинации.
+
+        В отличие от get_contacts не использует OFFSET: запрос идет по индексу (user_id, id),
+        поэтому стоимость страницы не зависит от ее глубины.
+
+        Parameters:
+        - after_id (int | None): Идентификатор последнего контакта предыдущей страницы или None для первой страницы.
+        - limit (int): Максимальное количество контактов на странице.
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Пользователь, для которого нужно получить контакты.
+
+        Returns:
+        - tuple[list[Contact], str | None]: Контакты страницы и курсор следующей страницы (None, если страница последняя).
+        """
+    return await _get_page_after(select(Contact), after_id, limit, db, user, rows=False)
+
+
+async def get_contacts_after_rows(after_id: int | None, limit: int, db: AsyncSession, user: User):
+    """
+        То же, что get_contacts_after, но возвращает легковесные строки без ORM-объектов и JOIN с users.
+
+        Parameters:
+        - after_id (int | None): Идентификатор последнего контакта предыдущей страницы или None для первой страницы.
+        - limit (int): Максимальное количество контактов на странице.
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Пользователь, для которого нужно получить контакты.
+
+        Returns:
+        - tuple[list[RowMapping], str | None]: Строки страницы и курсор следующей страницы.
+        """
+    return await _get_page_after(select(*CONTACT_COLUMNS), after_id, limit, db, user, rows=True)
+
+
+async def _get_page_after(smt, after_id: int | None, limit: int, db: AsyncSession, user: User, rows: bool):
+    smt = smt.filter(Contact.user_id == user.id)
+    if after_id is not None:
+        smt = smt.filter(Contact.id > after_id)
+    smt = smt.order_by(Contact.id).limit(limit + 1)
+    result = await db.execute(smt)
+    items = list(result.mappings().all() if rows else result.scalars().all())
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(user.id, items[-1]['id'] if rows else items[-1].id)
+    return items, next_cursor
+
+
+async def stream_contacts(db: AsyncSession, user_id: int, batch_size: int = 1000):
+    """
+        Потоково читает все контакты пользователя пачками через серверный курсор.
+
+        Выбираются только колонки контакта (без ORM-объектов и без JOIN с users),
+        а yield_per ограничивает количество строк, одновременно находящихся в памяти.
+
+        Parameters:
+        - db (AsyncSession): Сессия базы данных.
+        - user_id (int): Идентификатор пользователя.
+        - batch_size (int): Количество строк в одной пачке.
+
+        Yields:
+        - Sequence[RowMapping]: Очередная пачка строк с полями контакта.
+        """
+    smt = (select(*CONTACT_COLUMNS)
+           .filter(Contact.user_id == user_id)
+           .order_by(Contact.id)
+           .execution_options(yield_per=batch_size))
+    result = await db.stream(smt)
+    async for rows in result.mappings().partitions():
+        yield rows
+
+
+async def get_contacts_version(db: AsyncSession, user_id: int) -> int:
+    """
+        Возвращает версию адресной книги пользователя без обращения к таблице контактов.
+
+        Parameters:
+        - db (AsyncSession): Сессия базы данных.
+        - user_id (int): Идентификатор пользователя.
+
+        Returns:
+        - int: Текущая версия.
+        """
+    return await db.scalar(select(User.contacts_version).where(User.id == user_id)) or 0
+
+
+async def bump_contacts_version(db: AsyncSession, user_id: int):
+    """
+        Увеличивает версию адресной книги пользователя в текущей транзакции.
+
+        Вызывается перед commit каждой операции, изменяющей контакты, поэтому версия
+        меняется атомарно вместе с данными.
+
+        Parameters:
+        - db (AsyncSession): Сессия базы данных.
+        - user_id (int): Идентификатор пользователя.
+        """
+    await db.execute(update(User).where(User.id == user_id)
+                     .values(contacts_version=User.contacts_version + 1)
+                     .execution_options(synchronize_session=False))
+
+
 async def get_contact(contact_id: int, db: AsyncSession,user: User):
     """
         Получает контакт из базы данных по его идентификатору для указанного пользователя.
@@ -57,14 +224,38 @@ async def create_contact(body: CreateContactSchema, db: AsyncSession, user: User
         """
     contact = Contact(**body.model_dump(exclude_unset=True),user=user)
     db.add(contact)
+    await bump_contacts_version(db, user.id)
     await db.commit()
     await db.refresh(contact)
     return contact
 
 
+async def create_contacts_bulk(rows: list[dict], db: AsyncSession, user: User):
+    """
+        Создает пачку контактов одним многострочным INSERT.
+
+        Транзакция не фиксируется: вызывающий код делает commit после последней пачки
+        и увеличивает версию адресной книги (bump_contacts_version).
+
+        Parameters:
+        - rows (list[dict]): Проверенные данные контактов (результат CreateContactSchema.model_dump()).
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Пользователь, для которого создаются контакты.
+
+        Returns:
+        - int: Количество вставленных контактов.
+        """
+    if not rows:
+        return 0
+    user_id = user.id
+    await db.execute(insert(Contact), [{**row, 'information': row.get('information') or '', 'user_id': user_id,
+                                        'birthday_doy': birthday_day_of_year(row['birthday'])} for row in rows])
+    return len(rows)
+
+
 async def update_contact(contact_id: int, body: CreateContactSchema, db: AsyncSession,user: User):
     """
-        Обновляет информацию о контакте в базе данных.
+        Полностью заменяет данные контакта пользователя (PUT).
 
         Parameters:
         - contact_id (int): Идентификатор контакта, который требуется обновить.
@@ -73,91 +264,272 @@ async def update_contact(contact_id: int, body: CreateContactSchema, db: AsyncSe
         - user (User): Пользователь, чей контакт требуется обновить.
 
         Returns:
-        - Contact: Обновленный контакт. Если контакт не найден, возвращает None.
+        - RowMapping: Обновленный контакт (поля CONTACT_COLUMNS). Если контакт не найден, возвращает None.
         """
-    smt = select(Contact).filter_by(id=contact_id,user=user)
-    contacts = await db.execute(smt)
-    contact = contacts.scalar_one_or_none()
-    if contact:
-        contact.name = body.name
-        contact.surname = body.surname
-        contact.phone = body.phone
-        contact.email = body.email
-        contact.birthday = body.birthday
-        await db.commit()
-        await db.refresh(contact)
+    values = body.model_dump()
+    values['information'] = values['information'] or ''
+    return await patch_contact(contact_id, values, db, user)
+
+
+async def patch_contact(contact_id: int, values: dict, db: AsyncSession, user: User):
+    """
+        Изменяет переданные поля контакта одним UPDATE ... WHERE id = :id AND user_id = :uid RETURNING.
+
+        Parameters:
+        - contact_id (int): Идентификатор контакта.
+        - values (dict): Изменяемые колонки (ContactPatch.changes()); пустой словарь обновляет только update_at.
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Владелец контакта.
+
+        Returns:
+        - RowMapping: Контакт после изменения (поля CONTACT_COLUMNS) или None, если у пользователя нет такого контакта.
+        """
+    values = {**values, 'update_at': func.now()}
+    if values.get('birthday') is not None:
+        values['birthday_doy'] = birthday_day_of_year(values['birthday'])
+    smt = update(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id).values(**values) \
+        .returning(*CONTACT_COLUMNS)
+    result = await db.execute(smt, execution_options={'synchronize_session': False})
+    contact = result.mappings().one_or_none()
+    if contact is not None:
+        await bump_contacts_version(db, user.id)
+    await db.commit()
     return contact
 
 
-async def delete_contact(contact_id: int, db: AsyncSession):
+async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     """
-       Удаляет контакт из базы данных.
+       Удаляет контакт пользователя одним DELETE ... WHERE id = :id AND user_id = :uid RETURNING.
 
        Parameters:
        - contact_id (int): Идентификатор контакта, который требуется удалить.
        - db (AsyncSession): Сессия базы данных.
+       - user (User): Владелец контакта; чужие контакты не удаляются.
 
        Returns:
-       - Contact: Удаленный контакт. Если контакт не найден, возвращает None.
+       - RowMapping: Удаленный контакт (поля CONTACT_COLUMNS). Если контакт не найден, возвращает None.
        """
-    smt = select(Contact).filter_by(id=contact_id)
-    contacts = await db.execute(smt)
-    contact = contacts.scalar_one_or_none()
-    if contact:
-        await db.delete(contact)
-        await db.commit()
+    smt = delete(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id).returning(*CONTACT_COLUMNS)
+    result = await db.execute(smt, execution_options={'synchronize_session': False})
+    contact = result.mappings().one_or_none()
+    if contact is not None:
+        await bump_contacts_version(db, user.id)
+    await db.commit()
     return contact
 
 
-async def upcoming_birthday(db: AsyncSession):
+async def get_contacts_batch(ids: list[int], db: AsyncSession, user: User):
     """
-        Возвращает список контактов, у которых день рождения наступит в течение следующих 7 дней.
+        Получает контакты пользователя по списку идентификаторов одним запросом.
 
         Parameters:
+        - ids (list[int]): Идентификаторы контактов.
         - db (AsyncSession): Сессия базы данных.
+        - user (User): Владелец контактов; чужие идентификаторы не возвращаются.
 
         Returns:
-        - List[Contact]: Список контактов, у которых день рождения наступит в течение следующих 7 дней.
+        - Sequence[RowMapping]: Строки с полями контакта.
         """
-    today = datetime.today().date()
-    week_from_now = today + timedelta(days=3)
+    smt = select(*CONTACT_COLUMNS).filter(Contact.id.in_(ids), Contact.user_id == user.id).order_by(Contact.id)
+    result = await db.execute(smt)
+    return result.mappings().all()
 
-    # Запит до бази даних для отримання контактів з днями народження у межах наступних 7 днів
-    stmt = select(Contact).filter(
-        or_(
-            and_(
-                extract('month', Contact.birthday) == today.month,
-                extract('day', Contact.birthday) >= today.day
-            ),
-            and_(
-                extract('month', Contact.birthday) == week_from_now.month,
-                extract('day', Contact.birthday) <= week_from_now.day
-            ),
-            and_(
-                extract('month', Contact.birthday) == (today.month + 1) % 12,
-                extract('day', Contact.birthday) <= week_from_now.day
-            )
-        )
-    )
 
-    contacts = await db.execute(stmt)
+async def update_contacts_batch(patches: dict[int, dict], db: AsyncSession, user: User):
+    """
+        Применяет частичные изменения к контактам пользователя в одной транзакции.
+
+        Принадлежность проверяется одним SELECT ... WHERE id IN (...) AND user_id = :uid, затем
+        изменения записываются bulk UPDATE по первичному ключу, версия адресной книги
+        увеличивается один раз, и обновленные строки читаются одним запросом.
+
+        Parameters:
+        - patches (dict[int, dict]): Идентификатор контакта и изменяемые колонки (ContactPatch.changes()).
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Владелец контактов.
+
+        Returns:
+        - Sequence[RowMapping]: Обновленные контакты; чужие и несуществующие идентификаторы пропускаются.
+        """
+    owned = (await db.execute(select(Contact.id).filter(Contact.id.in_(patches), Contact.user_id == user.id)))
+    owned = owned.scalars().all()
+    rows = []
+    for contact_id in owned:
+        values = dict(patches[contact_id])
+        if values.get('birthday') is not None:
+            values['birthday_doy'] = birthday_day_of_year(values['birthday'])
+        if values:
+            rows.append({'id': contact_id, **values})
+    if rows:
+        await db.execute(update(Contact), rows)
+        await bump_contacts_version(db, user.id)
+    await db.commit()
+    return await get_contacts_batch(owned, db, user) if owned else []
+
+
+async def delete_contacts_batch(ids: list[int], db: AsyncSession, user: User) -> list[int]:
+    """
+        Удаляет контакты пользователя одним DELETE ... WHERE id IN (...) AND user_id = :uid RETURNING id.
+
+        Parameters:
+        - ids (list[int]): Идентификаторы контактов.
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Владелец контактов.
+
+        Returns:
+        - list[int]: Идентификаторы удаленных контактов.
+        """
+    smt = delete(Contact).filter(Contact.id.in_(ids), Contact.user_id == user.id).returning(Contact.id)
+    result = await db.execute(smt, execution_options={'synchronize_session': False})
+    deleted = list(result.scalars().all())
+    if deleted:
+        await bump_contacts_version(db, user.id)
+    await db.commit()
+    return deleted
+
+
+def birthday_window(today: date, days: int) -> tuple[int, int]:
+    """
+        Вычисляет диапазон номеров дней (birthday_doy) для окна из days дней начиная с today.
+
+        Parameters:
+        - today (date): Первый день окна.
+        - days (int): Длина окна в днях.
+
+        Returns:
+        - tuple[int, int]: Начало и конец диапазона включительно. Если конец меньше начала,
+          окно переходит через конец года.
+        """
+    start = birthday_day_of_year(today)
+    end = birthday_day_of_year(today + timedelta(days=days - 1))
+    return start, end
+
+
+async def upcoming_birthday(db: AsyncSession, user: User, days: int = 7):
+    """
+        Возвращает контакты пользователя, у которых день рождения наступит в течение следующих days дней.
+
+        Запрос использует индекс (user_id, birthday_doy): один диапазон или два, если окно
+        переходит через конец года.
+
+        Parameters:
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Пользователь, среди контактов которого выполняется поиск.
+        - days (int): Длина окна в днях, включая сегодняшний день (по умолчанию 7).
+
+        Returns:
+        - List[Contact]: Контакты в порядке приближения дня рождения.
+        """
+    contacts = await db.execute(_upcoming_birthday_stmt(select(Contact), user, days))
     return contacts.scalars().all()
 
 
-async def look_for_contact(db: AsyncSession, name_contact: str):
+async def upcoming_birthday_rows(db: AsyncSession, user: User, days: int = 7):
     """
-        Ищет контакт в базе данных по имени, фамилии или электронной почте.
+        То же, что upcoming_birthday, но возвращает легковесные строки без ORM-объектов и JOIN с users.
 
         Parameters:
         - db (AsyncSession): Сессия базы данных.
-        - name_contact (str): Имя, фамилия или адрес электронной почты контакта.
+        - user (User): Пользователь, среди контактов которого выполняется поиск.
+        - days (int): Длина окна в днях, включая сегодняшний день (по умолчанию 7).
 
         Returns:
-        - Optional[Contact]: Найденный контакт или None, если контакт не найден.
+        - Sequence[RowMapping]: Строки с полями контакта в порядке приближения дня рождения.
         """
-    query = select(Contact).filter(or_(Contact.name == name_contact,
-                                       Contact.surname == name_contact,
-                                       Contact.email == name_contact))
-    result = await db.execute(query)
-    contact = result.scalar_one_or_none()
-    return contact
+    result = await db.execute(_upcoming_birthday_stmt(select(*CONTACT_COLUMNS), user, days))
+    return result.mappings().all()
+
+
+def _upcoming_birthday_stmt(smt, user: User, days: int):
+    start, end = birthday_window(date.today(), days)
+    if days >= 366:
+        in_window = Contact.birthday_doy.is_not(None)
+    elif start <= end:
+        in_window = Contact.birthday_doy.between(start, end)
+    else:
+        in_window = or_(Contact.birthday_doy >= start, Contact.birthday_doy <= end)
+    return (smt.filter(Contact.user_id == user.id, in_window)
+            .order_by(case((Contact.birthday_doy >= start, 0), else_=1), Contact.birthday_doy, Contact.id))
+
+
+contacts_fts = table('contacts_fts', column('rowid'))
+# До скольких контактов пользователя поиск в SQLite просматривает их по индексу user_id без FTS5
+SEARCH_SCAN_LIMIT = 2000
+
+
+async def _count_contacts(db: AsyncSession, user: User, limit: int) -> int:
+    """Считает контакты пользователя, но не больше limit (читается не больше limit записей индекса)."""
+    ids = select(Contact.id).filter(Contact.user_id == user.id).limit(limit).subquery()
+    return await db.scalar(select(func.count()).select_from(ids))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+async def search_contacts(db: AsyncSession, user: User, query: str, limit: int = 10, offset: int = 0):
+    """
+        Ищет контакты пользователя по подстроке в имени, фамилии или электронной почте без учета регистра.
+
+        Результаты ранжируются: сначала совпадения по префиксу, затем по релевантности
+        (similarity из pg_trgm в PostgreSQL, в SQLite - более короткие записи), затем по идентификатору.
+        В PostgreSQL поиск использует триграммные GIN-индексы. В SQLite контакты пользователя, у которого
+        их не больше SEARCH_SCAN_LIMIT, просматриваются по покрывающему индексу ix_contacts_user_id_search;
+        для больших адресных книг
+        используется теневая таблица contacts_fts, в которой совпадения сразу ограничиваются контактами
+        пользователя (столбец owner).
+
+        Parameters:
+        - db (AsyncSession): Сессия базы данных.
+        - user (User): Пользователь, среди контактов которого выполняется поиск.
+        - query (str): Искомая строка.
+        - limit (int): Максимальное количество результатов.
+        - offset (int): Смещение для постраничного вывода.
+
+        Returns:
+        - List[Contact]: Найденные контакты в порядке убывания релевантности.
+        """
+    query = query.strip()
+    if not query:
+        return []
+    dialect = db.get_bind().dialect.name
+    columns = (Contact.name, Contact.surname, Contact.email)
+    escaped = _escape_like(query.lower())
+    prefix_rank = case((or_(*(func.lower(col).like(f'{escaped}%', escape='\\') for col in columns)), 0), else_=1)
+    shortest = func.length(Contact.name) + func.length(Contact.surname) + func.length(Contact.email)
+    use_fts = (dialect == 'sqlite' and len(query) >= 3
+               and await _count_contacts(db, user, SEARCH_SCAN_LIMIT + 1) > SEARCH_SCAN_LIMIT)
+    smt = select(Contact.id).filter(Contact.user_id == user.id)
+    if dialect == 'postgresql':
+        smt = smt.filter(or_(*(col.ilike(f'%{escaped}%', escape='\\') for col in columns)))
+        order = (prefix_rank, func.greatest(*(func.similarity(col, query) for col in columns)).desc())
+    elif use_fts:
+        # bm25 не используется: для IDF он перебирает совпадения фразы во всей таблице
+        phrase = '"' + query.replace('"', '""') + '"'
+        match = f'owner : "#{user.id}#" AND {{name surname email}} : {phrase}'
+        smt = (smt.join(contacts_fts, contacts_fts.c.rowid == Contact.id)
+               .filter(literal_column('contacts_fts').op('MATCH')(match)))
+        order = (prefix_rank, shortest)
+    else:
+        smt = smt.filter(or_(*(func.lower(col).like(f'%{escaped}%', escape='\\') for col in columns)))
+        order = (prefix_rank, shortest)
+    # Страница выбирается по индексу, строки контактов читаются только для нее
+    page = smt.order_by(*order, Contact.id).offset(offset).limit(limit)
+    result = await db.execute(select(Contact).filter(Contact.id.in_(page)).order_by(*order, Contact.id))
+    return result.scalars().all()
+
+
+async def look_for_contact(db: AsyncSession, name_contact: str, user: User):
+    """
+        Ищет контакт пользователя по имени, фамилии или электронной почте.
+
+        Parameters:
+        - db (AsyncSession): Сессия базы данных.
+        - name_contact (str): Имя, фамилия или адрес электронной почты контакта (или их часть).
+        - user (User): Пользователь, среди контактов которого выполняется поиск.
+
+        Returns:
+        - Optional[Contact]: Наиболее релевантный найденный контакт или None, если контакт не найден.
+        """
+    contacts = await search_contacts(db, user, name_contact, limit=1)
+    return contacts[0] if contacts else None
@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.contacts.models import EmailOutbox
+
+OUTBOX_COLUMNS = (EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject, EmailOutbox.template_name,
+                  EmailOutbox.template_body, EmailOutbox.attempts)
+
+
+async def enqueue_email(recipient: str, subject: str, template_name: str, template_body: dict, db: AsyncSession,
+                        commit: bool = True) -> EmailOutbox:
+    """
+        Добавляет письмо в outbox.
+
+        Parameters:
+        - recipient: Адрес получателя.
+        - subject: Тема письма.
+        - template_name: Имя шаблона письма.
+        - template_body: Переменные шаблона.
+        - db: Сессия базы данных (тип AsyncSession).
+        - commit: Зафиксировать транзакцию. False - письмо будет записано вместе с остальными изменениями сессии.
+
+        Returns:
+        - EmailOutbox: Добавленное письмо.
+        """
+    message = EmailOutbox(recipient=recipient, subject=subject, template_name=template_name,
+                          template_body=json.dumps(template_body, ensure_ascii=False), status='pending',
+                          attempts=0, next_attempt_at=datetime.utcnow())
+    db.add(message)
+    if commit:
+        await db.commit()
+    return message
+
+
+async def claim_batch(limit: int, lease: float, db: AsyncSession) -> list:
+    """
+        Забирает очередную пачку писем для отправки.
+
+        Письма переводятся в статус 'sending', а next_attempt_at сдвигается на lease секунд:
+        если воркер упадет, письма снова станут доступны по истечении аренды.
+        В PostgreSQL строки блокируются с SKIP LOCKED, поэтому несколько воркеров не забирают одно письмо.
+
+        Parameters:
+        - limit: Максимальное количество писем.
+        - lease: Время аренды в секундах.
+        - db: Сессия базы данных (тип AsyncSession).
+
+        Returns:
+        - list: Строки с полями id, recipient, subject, template_name, template_body и attempts.
+        """
+    now = datetime.utcnow()
+    smt = (select(*OUTBOX_COLUMNS)
+           .where(EmailOutbox.status.in_(('pending', 'sending')), EmailOutbox.next_attempt_at <= now)
+           .order_by(EmailOutbox.id).limit(limit).with_for_update(skip_locked=True))
+    rows = (await db.execute(smt)).mappings().all()
+    if rows:
+        await db.execute(update(EmailOutbox).where(EmailOutbox.id.in_([row['id'] for row in rows]))
+                         .values(status='sending', next_attempt_at=now + timedelta(seconds=lease)))
+    await db.commit()
+    return rows
+
+
+async def complete_batch(results: list[dict], db: AsyncSession):
+    """
+        Записывает результаты отправки одним UPDATE по первичному ключу.
+
+        У писем в статусах 'sent' и 'failed' очищается template_body: переменные шаблона
+        (токены, ссылки) больше не нужны и не должны храниться в базе.
+
+        Parameters:
+        - results: Словари с ключами id, status, attempts, next_attempt_at, last_error и sent_at.
+        - db: Сессия базы данных (тип AsyncSession).
+        """
+    if results:
+        await db.execute(update(EmailOutbox), results)
+        done = [result['id'] for result in results if result['status'] in ('sent', 'failed')]
+        if done:
+            await db.execute(update(EmailOutbox).where(EmailOutbox.id.in_(done)).values(template_body=None))
+    await db.commit()
+
+
+async def purge_outbox(retention: float, db: AsyncSession) -> int:
+    """
+        Удаляет отправленные и окончательно не доставленные письма старше retention секунд.
+
+        Parameters:
+        - retention: Срок хранения в секундах (от created_at).
+        - db: Сессия базы данных (тип AsyncSession).
+
+        Returns:
+        - int: Количество удаленных писем.
+        """
+    result = await db.execute(delete(EmailOutbox)
+                              .where(EmailOutbox.status.in_(('sent', 'failed')),
+                                     EmailOutbox.created_at < datetime.utcnow() - timedelta(seconds=retention)))
+    await db.commit()
+    return result.rowcount
+
+
+async def outbox_stats(db: AsyncSession) -> dict:
+    """
+        Возвращает размер очереди по статусам и возраст самого старого неотправленного письма.
+
+        Parameters:
+        - db: Сессия базы данных (тип AsyncSession).
+
+        Returns:
+        - dict: Количество писем по статусам и oldest_pending_seconds.
+        """
+    counts = dict((await db.execute(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status))).all())
+    oldest = await db.scalar(select(func.min(EmailOutbox.created_at))
+                             .where(EmailOutbox.status.in_(('pending', 'sending'))))
+    return {
+        'pending': counts.get('pending', 0),
+        'sending': counts.get('sending', 0),
+        'sent': counts.get('sent', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_pending_seconds': (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+    }
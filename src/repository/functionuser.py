@@ -6,7 +6,7 @@ from sqlalchemy import select
 from src.db.connectdb import get_db
 from src.contacts.models import User
 from src.schemas.user import UserSchema
-from src.contacts.models import User
+from src.services.cache_services import user_cache_sync
 
 
 async def create_user(body: UserSchema, db: AsyncSession):
@@ -56,8 +56,10 @@ async def update_token(user: User, token: str | None, db: AsyncSession):
         Returns:
         - None
         """
+    email = user.email
     user.refresh_token = token
     await db.commit()
+    await user_cache_sync.invalidate(email)
 
 
 async def confirmed_email(email: str, db: AsyncSession):
@@ -74,6 +76,7 @@ async def confirmed_email(email: str, db: AsyncSession):
     user = await get_user_by_email(email, db)
     user.confirmed = True
     await db.commit()
+    await user_cache_sync.invalidate(email)
 
 
 async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> User:
@@ -91,6 +94,7 @@ async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> Us
     user = await get_user_by_email(email, db)
     user.avatar = url
     await db.commit()
+    await user_cache_sync.invalidate(email)
     await db.refresh(user)
     return user
 
@@ -122,3 +126,4 @@ async def update_password(email: str, password: str, db: AsyncSession) -> None:
     user = await get_user_by_email(email, db)
     user.password = password
     await db.commit()
+    await user_cache_sync.invalidate(email)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, status, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, Query, Depends, status, Request
 import random
-from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.repository import functionuser
 from src.db.connectdb import get_db
-from src.schemas.user import UserSchema, UserResponse, TokenUpdate, RequestEmail
+from src.schemas.user import UserSchema, UserResponse, TokenUpdate, RequestEmail, SessionResponse
 from src.services.auth_services import auth_service
+from src.services.session_services import session_store, SessionStoreUnavailable, session_store_unavailable
+from src.conf.dburl import config
 from src.contacts.models import User
 from src.services.email_services import send_email
 
@@ -14,13 +16,14 @@ get_refresh_token = HTTPBearer()
 
 
 @routs.post('/signup', response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
+async def signup(body: UserSchema, request: Request, db: AsyncSession = Depends(get_db)):
     """
         Регистрирует нового пользователя.
 
+        Письмо для подтверждения email записывается в outbox в той же транзакции, что и пользователь.
+
         Parameters:
         - body: Данные нового пользователя (тип UserSchema).
-        - bt: Объект фоновых задач FastAPI (тип BackgroundTasks), используется для отправки email.
         - request: Объект запроса FastAPI (тип Request), используется для получения базового URL.
         - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
 
@@ -30,36 +33,144 @@ async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: As
     exist_user = await functionuser.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Account already exist')
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash_async(body.password)
+    await send_email(body.email, body.username, str(request.base_url), db, commit=False)
     new_user = await functionuser.create_user(body, db)
-    bt.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
-    # TODO send email
     return new_user
 
 
+async def issue_tokens(email: str, sid: str, jti: str) -> dict:
+    """Создает пару access/refresh токенов; refresh-токен привязан к сессии sid и имеет идентификатор jti."""
+    access_token = await auth_service.create_access_token(data={'sub': email})
+    refresh_token = await auth_service.create_refresh_token(data={'sub': email, 'sid': sid, 'jti': jti},
+                                                            expires_delta=config.REFRESH_TOKEN_TTL)
+    return {'access_token': access_token, 'refresh_token': refresh_token, 'token_type': 'bearer'}
+
+
 @routs.post('/login', response_model=TokenUpdate)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+async def login(request: Request, body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
         Аутентифицирует пользователя и генерирует токены доступа.
 
+        Сессия refresh-токена создается в Redis (session_store), поэтому вход только читает
+        пользователя из базы данных и не пишет в нее. У пользователя может быть несколько сессий
+        (по одной на устройство).
+
         Parameters:
+        - request: Объект запроса FastAPI, заголовок User-Agent сохраняется как описание устройства.
         - body: Форма запроса OAuth2PasswordRequestForm, содержащая имя пользователя (email) и пароль.
         - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
 
         Returns:
         - Объект TokenUpdate, содержащий токен доступа, токен обновления и тип токена.
+
+        Raises:
+        - HTTPException: 503, если хранилище сессий недоступно.
         """
     user = await functionuser.get_user_by_email(body.username, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='invalid email')
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='email not confirmed')
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password_async(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='invalid password')
-    access_token = await auth_service.create_access_token(data={'sub': user.email})
-    refresh_token = await auth_service.create_refresh_token(data={'sub': user.email})
-    await functionuser.update_token(user, refresh_token, db)
-    return {'access_token': access_token, 'refresh_token': refresh_token, 'token_type': 'bearer'}
+    try:
+        sid, jti = await session_store.create(user.email, request.headers.get('user-agent', ''))
+    except SessionStoreUnavailable:
+        raise session_store_unavailable()
+    return await issue_tokens(user.email, sid, jti)
+
+
+@routs.get('/refresh_token', response_model=TokenUpdate)
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Depends(get_refresh_token)):
+    """
+        Выдает новую пару токенов по refresh-токену (ротация).
+
+        Предъявленный refresh-токен становится недействительным. Повторное предъявление уже
+        использованного токена отзывает всю сессию.
+
+        Parameters:
+        - credentials: Refresh-токен из заголовка Authorization.
+
+        Returns:
+        - Объект TokenUpdate с новыми токенами.
+
+        Raises:
+        - HTTPException: 401, если токен недействителен, сессия отозвана или истекла; 503, если хранилище сессий недоступно.
+        """
+    payload = await auth_service.decode_session_token(credentials.credentials)
+    try:
+        new_jti = await session_store.rotate(payload['sid'], payload['jti'], payload['sub'])
+    except SessionStoreUnavailable:
+        raise session_store_unavailable()
+    if new_jti is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
+    return await issue_tokens(payload['sub'], payload['sid'], new_jti)
+
+
+@routs.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(get_refresh_token)):
+    """
+        Завершает сессию, к которой относится refresh-токен.
+
+        Выданные access-токены действуют до истечения своего срока.
+
+        Parameters:
+        - credentials: Refresh-токен из заголовка Authorization.
+
+        Raises:
+        - HTTPException: 401, если токен недействителен, уже заменен при ротации или сессия завершена;
+          503, если хранилище сессий недоступно.
+        """
+    payload = await auth_service.decode_session_token(credentials.credentials)
+    try:
+        revoked = await session_store.revoke(payload['sid'], payload['jti'], payload['sub'])
+    except SessionStoreUnavailable:
+        raise session_store_unavailable()
+    if not revoked:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
+
+
+@routs.post('/logout_all')
+async def logout_all(credentials: HTTPAuthorizationCredentials = Depends(get_refresh_token)):
+    """
+        Завершает все сессии пользователя, которому принадлежит refresh-токен.
+
+        Parameters:
+        - credentials: Refresh-токен из заголовка Authorization.
+
+        Returns:
+        - Словарь с количеством завершенных сессий.
+
+        Raises:
+        - HTTPException: 401, если токен недействителен, уже заменен при ротации или сессия завершена;
+          503, если хранилище сессий недоступно.
+        """
+    payload = await auth_service.decode_session_token(credentials.credentials)
+    try:
+        if not await session_store.is_current(payload['sid'], payload['jti']):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid refresh token')
+        revoked = await session_store.revoke_all(payload['sub'])
+    except SessionStoreUnavailable:
+        raise session_store_unavailable()
+    return {'revoked': revoked}
+
+
+@routs.get('/sessions', response_model=list[SessionResponse])
+async def sessions(user: User = Depends(auth_service.get_current_user)):
+    """
+        Возвращает активные сессии (устройства) текущего пользователя.
+
+        Parameters:
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - Список сессий (тип SessionResponse).
+        """
+    try:
+        return await session_store.list(user.email)
+    except SessionStoreUnavailable:
+        raise session_store_unavailable()
 
 
 @routs.get('/confirmed_email/{token}')
@@ -85,14 +196,12 @@ async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
 
 
 @routs.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: AsyncSession = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_db)):
     """
         Отправляет запрос на подтверждение электронной почты.
 
         Parameters:
         - body: Данные запроса (тип RequestEmail).
-        - background_tasks: Фоновые задачи для выполнения асинхронно.
         - request: Объект запроса FastAPI.
         - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
 
@@ -103,7 +212,7 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
     if user.confirmed:
         return {'message': 'Your email already confirmed'}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, str(request.base_url))
+        await send_email(user.email, user.username, str(request.base_url), db)
     return {'message': 'Check email '}
 
 # @routs.post('/reset_password')
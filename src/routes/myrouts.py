@@ -1,53 +1,95 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, status, Query
-from datetime import datetime, timedelta
-from fastapi_limiter.depends import RateLimiter
+from fastapi import APIRouter, HTTPException, Query, Depends, status, Query, Request
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime, timedelta
+from src.services.ratelimit_services import RateLimiter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.services.auth_services import auth_service
 from src.contacts.models import Contact, User
-from src.db.connectdb import get_db
+from src.db.connectdb import get_db, get_read_db
 from src.repository import functiondb
 from src.repository import functiondb
-from src.schemas.checkschemas import CreateContactSchema, CreateContact
+from src.schemas.checkschemas import CreateContactSchema, CreateContact, ContactPage, ImportReport, ContactIds, \
+    ContactBatchPatch, BatchResult, ContactPatch
+from src.services import import_services, export_services
+from src.services.etag_services import conditional_json
+from src.services.serializers import contact_rows_to_dicts, model_response, contact_list, contact_item, json_response
 
 routs = APIRouter(prefix='/contacts', tags=['contacts'])
 
 
-@routs.get('/', response_model=list[CreateContact])
-async def get_contacts(limit: int = Query(10, ge=10, le=100), offset: int = Query(0, ge=0),
-                       db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+@routs.get('/', response_model=list[CreateContact] | ContactPage)
+async def get_contacts(request: Request, limit: int = Query(10, ge=10, le=100), offset: int = Query(0, ge=0),
+                       after: str | None = Query(None),
+                       db: AsyncSession = Depends(get_read_db), user: User = Depends(auth_service.get_current_user)):
     """
         Получает список контактов.
 
+        Если передан параметр after, используется курсорная (keyset) пагинация и возвращается
+        страница с полем next_cursor. Пустое значение after запрашивает первую страницу.
+        Без after сохраняется прежнее поведение с limit/offset.
+
+        Контакты выбираются проекцией колонок и сериализуются напрямую, без ORM-объектов,
+        JOIN с users и повторной валидации через response_model.
+
+        Ответ содержит ETag; при совпадении If-None-Match возвращается 304 без запроса к контактам.
+
         Parameters:
+        - request: Объект запроса FastAPI (заголовок If-None-Match).
         - limit: Максимальное количество контактов для возврата (по умолчанию 10, минимум 10, максимум 100).
         - offset: Смещение для запроса списка контактов (по умолчанию 0, минимум 0).
-        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - after: Курсор из поля next_cursor предыдущей страницы.
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_read_db (реплика для чтения).
         - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
 
         Returns:
-        - Список контактов (тип list[CreateContact]).
+        - Список контактов (тип list[CreateContact]) или страница контактов (тип ContactPage).
         """
-    contacts = await functiondb.get_contacts(limit, offset, db, user)
-    return contacts
+    after_id = None
+    if after:
+        try:
+            cursor_user_id, after_id = functiondb.decode_cursor(after)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='invalid cursor')
+        if cursor_user_id != user.id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='invalid cursor')
+
+    async def build():
+        if after is None:
+            return contact_rows_to_dicts(await functiondb.get_contacts_rows(limit, offset, db, user), user)
+        rows, next_cursor = await functiondb.get_contacts_after_rows(after_id, limit, db, user)
+        return {'items': contact_rows_to_dicts(rows, user), 'next_cursor': next_cursor}
+
+    return await conditional_json(request, db, user, build)
 
 
 @routs.get('/{contact_id}', response_model=CreateContactSchema)
-async def get_contact(contact_id: int, db: AsyncSession = Depends(get_db),
+async def get_contact(contact_id: int, request: Request, db: AsyncSession = Depends(get_read_db),
                       user: User = Depends(auth_service.get_current_user)):
     """
         Получает информацию о контакте по его идентификатору.
 
+        Ответ содержит ETag; при совпадении If-None-Match возвращается 304 без запроса к контактам.
+
         Parameters:
         - contact_id: Идентификатор контакта.
-        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - request: Объект запроса FastAPI (заголовок If-None-Match).
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_read_db (реплика для чтения).
         - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
 
         Returns:
         - Информация о контакте (тип CreateContactSchema).
+
+        Raises:
+        - HTTPException 404: Если контакт не найден.
         """
-    contact = await functiondb.get_contact(contact_id, db, user)
-    return contact
+    async def build():
+        contact = await functiondb.get_contact(contact_id, db, user)
+        if contact is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return CreateContactSchema.model_validate(contact, from_attributes=True).model_dump(mode='json')
+
+    return await conditional_json(request, db, user, build)
 
 
 @routs.post('/', response_model=CreateContact, status_code=status.HTTP_201_CREATED,
@@ -66,14 +108,141 @@ async def create_contact(body: CreateContactSchema, db: AsyncSession = Depends(g
         - Созданный контакт (тип CreateContact).
         """
     contact = await functiondb.create_contact(body, db, user)
-    return contact
+    return model_response(contact_item, contact, status.HTTP_201_CREATED)
+
+
+@routs.post('/import/', response_model=ImportReport, dependencies=[Depends(RateLimiter(times=1, seconds=10))])
+async def import_contacts(request: Request, format: str | None = Query(None, pattern='^(csv|ndjson)$'),
+                          db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+    """
+        Массово импортирует контакты из CSV (с заголовком) или NDJSON.
+
+        Тело запроса читается потоком и записывается пачками, поэтому размер файла не ограничен памятью.
+
+        Parameters:
+        - request: Объект запроса FastAPI, из которого читается тело.
+        - format: Формат тела ('csv' или 'ndjson'); если не указан, определяется по Content-Type.
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - Отчет об импорте с ошибками по строкам (тип ImportReport).
+        """
+    fmt = format or import_services.detect_format(request.headers.get('content-type'))
+    if fmt is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail='Use text/csv or application/x-ndjson')
+    try:
+        return await import_services.import_contacts(request.stream(), fmt, db, user)
+    except import_services.ImportFormatError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err))
+
+
+@routs.get('/export/')
+async def export_contacts(format: str = Query('csv', pattern='^(csv|ndjson|vcard)$'),
+                          user: User = Depends(auth_service.get_current_user)):
+    """
+        Потоково выгружает всю адресную книгу пользователя.
+
+        Parameters:
+        - format: Формат выгрузки: 'csv', 'ndjson' или 'vcard' (по умолчанию 'csv').
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - StreamingResponse с контактами в выбранном формате.
+        """
+    filename = f'contacts.{export_services.EXTENSIONS[format]}'
+    return StreamingResponse(export_services.stream_export(format, user.id),
+                             media_type=export_services.MEDIA_TYPES[format],
+                             headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+def batch_results(ids: list[int], rows, user: User, found: str) -> dict:
+    """
+        Собирает результаты пакетной операции в порядке запроса.
+
+        Parameters:
+        - ids: Запрошенные идентификаторы без повторов.
+        - rows: Найденные строки контактов.
+        - user: Текущий пользователь.
+        - found: Статус для найденных контактов.
+
+        Returns:
+        - dict: Тело ответа со схемой BatchResult.
+        """
+    contacts = {contact['id']: contact for contact in contact_rows_to_dicts(rows, user)}
+    return {'results': [{'id': contact_id, 'status': found, 'contact': contacts[contact_id]}
+                        if contact_id in contacts else {'id': contact_id, 'status': 'not_found', 'contact': None}
+                        for contact_id in ids]}
+
+
+@routs.post('/batch/get', response_model=BatchResult)
+async def get_contacts_batch(body: ContactIds, db: AsyncSession = Depends(get_read_db),
+                             user: User = Depends(auth_service.get_current_user)):
+    """
+        Получает несколько контактов по идентификаторам одним запросом.
+
+        Parameters:
+        - body: Идентификаторы контактов (не больше BATCH_MAX_SIZE).
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_read_db (реплика для чтения).
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - Результат для каждого идентификатора: 'ok' с контактом или 'not_found' (тип BatchResult).
+        """
+    ids = list(dict.fromkeys(body.ids))
+    rows = await functiondb.get_contacts_batch(ids, db, user)
+    return json_response(batch_results(ids, rows, user, 'ok'))
+
+
+@routs.patch('/batch/', response_model=BatchResult)
+async def update_contacts_batch(body: ContactBatchPatch, db: AsyncSession = Depends(get_db),
+                                user: User = Depends(auth_service.get_current_user)):
+    """
+        Частично обновляет несколько контактов в одной транзакции.
 
+        Изменения с одинаковым id объединяются в порядке запроса.
 
-@routs.put('/{contact_id}')
+        Parameters:
+        - body: Изменения контактов (не больше BATCH_MAX_SIZE).
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - Результат для каждого идентификатора: 'updated' с контактом или 'not_found' (тип BatchResult).
+        """
+    patches = {}
+    for item in body.items:
+        patches.setdefault(item.id, {}).update(item.changes())
+    rows = await functiondb.update_contacts_batch(patches, db, user)
+    return json_response(batch_results(list(patches), rows, user, 'updated'))
+
+
+@routs.post('/batch/delete', response_model=BatchResult)
+async def delete_contacts_batch(body: ContactIds, db: AsyncSession = Depends(get_db),
+                                user: User = Depends(auth_service.get_current_user)):
+    """
+        Удаляет несколько контактов одним запросом.
+
+        Parameters:
+        - body: Идентификаторы контактов (не больше BATCH_MAX_SIZE).
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - Результат для каждого идентификатора: 'deleted' или 'not_found' (тип BatchResult).
+        """
+    ids = list(dict.fromkeys(body.ids))
+    deleted = set(await functiondb.delete_contacts_batch(ids, db, user))
+    return json_response({'results': [{'id': contact_id, 'status': 'deleted' if contact_id in deleted else 'not_found',
+                                       'contact': None} for contact_id in ids]})
+
+
+@routs.put('/{contact_id}', response_model=CreateContact)
 async def update_contact(contact_id: int, body: CreateContactSchema, db: AsyncSession = Depends(get_db),
                          user: User = Depends(auth_service.get_current_user)):
     """
-        Обновляет данные о контакте.
+        Полностью заменяет данные о контакте.
 
         Parameters:
         - contact_id: Идентификатор контакта, который нужно обновить.
@@ -83,18 +252,45 @@ async def update_contact(contact_id: int, body: CreateContactSchema, db: AsyncSe
 
         Returns:
         - Обновленные данные о контакте (тип CreateContact).
+
+        Raises:
+        - HTTPException 404: Если у пользователя нет такого контакта.
         """
-    contact = await functiondb.update_contact(contact_id, body, db, )
+    contact = await functiondb.update_contact(contact_id, body, db, user)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    return contact
+    return json_response(contact_rows_to_dicts([contact], user)[0])
+
+
+@routs.patch('/{contact_id}', response_model=CreateContact)
+async def patch_contact(contact_id: int, body: ContactPatch, db: AsyncSession = Depends(get_db),
+                        user: User = Depends(auth_service.get_current_user)):
+    """
+        Изменяет только переданные поля контакта одним запросом UPDATE ... RETURNING.
+
+        Parameters:
+        - contact_id: Идентификатор контакта, который нужно изменить.
+        - body: Изменяемые поля (тип ContactPatch).
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - Данные о контакте после изменения (тип CreateContact).
+
+        Raises:
+        - HTTPException 404: Если у пользователя нет такого контакта.
+        """
+    contact = await functiondb.patch_contact(contact_id, body.changes(), db, user)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return json_response(contact_rows_to_dicts([contact], user)[0])
 
 
-@routs.delete('/{contact_id}')
+@routs.delete('/{contact_id}', response_model=CreateContact)
 async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db),
                          user: User = Depends(auth_service.get_current_user)):
     """
-        Удаляет контакт по его идентификатору.
+        Удаляет контакт текущего пользователя по его идентификатору.
 
         Parameters:
         - contact_id: Идентификатор контакта, который нужно удалить.
@@ -102,40 +298,75 @@ async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db),
         - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
 
         Returns:
-        - Удаленный контакт, если успешно; в противном случае - None.
+        - Удаленный контакт (тип CreateContact).
+
+        Raises:
+        - HTTPException 404: Если у пользователя нет такого контакта.
         """
-    contact = await functiondb.delete_contact(contact_id, db)
-    return contact
+    contact = await functiondb.delete_contact(contact_id, db, user)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return json_response(contact_rows_to_dicts([contact], user)[0])
 
 
 @routs.get("/birthdays/", response_model=list[CreateContact])
-async def get_birthdays(db: AsyncSession = Depends(get_db), user: User = Depends(auth_service.get_current_user)):
+async def get_birthdays(request: Request, days: int = Query(7, ge=1, le=366),
+                        db: AsyncSession = Depends(get_read_db), user: User = Depends(auth_service.get_current_user)):
     """
-        Получает список контактов, у которых день рождения наступает в течение следующих 7 дней.
+        Получает список контактов, у которых день рождения наступает в течение следующих days дней.
+
+        Ответ содержит ETag, зависящий от версии адресной книги и текущей даты.
 
         Parameters:
-        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - request: Объект запроса FastAPI (заголовок If-None-Match).
+        - days: Длина окна в днях, включая сегодняшний день (по умолчанию 7, максимум 366).
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_read_db (реплика для чтения).
         - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
 
         Returns:
-        - Список контактов, у которых день рождения наступает в течение следующих 7 дней.
+        - Список контактов текущего пользователя в порядке приближения дня рождения.
         """
-    return await functiondb.upcoming_birthday(db)
+    async def build():
+        return contact_rows_to_dicts(await functiondb.upcoming_birthday_rows(db, user, days), user)
 
+    return await conditional_json(request, db, user, build, variant=date.today().isoformat())
 
-@routs.get('/search_contact/{name_contact_or_surname_or_email}', response_model=CreateContactSchema)
-async def look_for_contact(name_contact: str, db: AsyncSession = Depends(get_db),
+
+@routs.get('/search/', response_model=list[CreateContact])
+async def search_contacts(q: str = Query(min_length=1, max_length=150), limit: int = Query(10, ge=1, le=100),
+                          offset: int = Query(0, ge=0), db: AsyncSession = Depends(get_read_db),
+                          user: User = Depends(auth_service.get_current_user)):
+    """
+        Ищет контакты текущего пользователя по части имени, фамилии или электронной почты.
+
+        Parameters:
+        - q: Искомая строка (без учета регистра, совпадение по префиксу или подстроке).
+        - limit: Максимальное количество результатов (по умолчанию 10, максимум 100).
+        - offset: Смещение для постраничного вывода (по умолчанию 0).
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_read_db (реплика для чтения).
+        - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
+
+        Returns:
+        - Список найденных контактов, отсортированный по релевантности (тип list[CreateContact]).
+        """
+    return model_response(contact_list, await functiondb.search_contacts(db, user, q, limit, offset))
+
+
+@routs.get('/search_contact/{name_contact}', response_model=CreateContactSchema)
+async def look_for_contact(name_contact: str, db: AsyncSession = Depends(get_read_db),
                            user: User = Depends(auth_service.get_current_user)):
     """
         Ищет контакт по имени, фамилии или электронной почте.
 
         Parameters:
         - name_contact: Строка, содержащая имя, фамилию или электронную почту контакта.
-        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_read_db (реплика для чтения).
         - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
 
         Returns:
-        - Найденный контакт с указанным именем, фамилией или электронной почтой.
+        - Наиболее релевантный контакт с указанным именем, фамилией или электронной почтой.
         """
     contact = await functiondb.look_for_contact(db, name_contact, user)
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     return contact
@@ -0,0 +1,127 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.dburl import config
+from src.db.connectdb import session_manage, get_db
+from src.repository import functionoutbox
+from src.services.cache_services import user_cache, user_cache_sync, token_cache
+from src.services.etag_services import response_cache
+from src.services.hash_services import password_hasher
+from src.services.ratelimit_services import rate_limit_backend
+
+
+async def metrics_access(request: Request):
+    """
+        Проверяет доступ к эндпоинтам метрик (/metrics и /api/stats/*).
+
+        Parameters:
+        - request: Входящий запрос (тип Request).
+
+        Raises:
+        - HTTPException 404: Если метрики выключены (METRICS_ENABLED=false).
+        - HTTPException 401: Если задан METRICS_TOKEN, а заголовок Authorization не содержит его.
+        """
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Not Found')
+    if config.METRICS_TOKEN is None:
+        return
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not secrets.compare_digest(token.encode(), config.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid metrics token',
+                            headers={'WWW-Authenticate': 'Bearer'})
+
+
+router = APIRouter(prefix='/api/stats', tags=['stats'], dependencies=[Depends(metrics_access)])
+
+
+@router.get('/user-cache')
+async def user_cache_stats():
+    """
+        Возвращает статистику кэша аутентифицированных пользователей.
+
+        Returns:
+        - dict: Размер кэша, количество попаданий, промахов и вытеснений, состояние инвалидации между воркерами.
+        """
+    return {**user_cache.stats(), 'invalidation': user_cache_sync.stats()}
+
+
+@router.get('/token-cache')
+async def token_cache_stats():
+    """
+        Возвращает статистику кэша проверенных access-токенов.
+
+        Returns:
+        - dict: Размер кэша, количество попаданий, промахов и вытеснений.
+        """
+    return token_cache.stats()
+
+
+@router.get('/response-cache')
+async def response_cache_stats():
+    """
+        Возвращает статистику кэша ответов с ETag.
+
+        Returns:
+        - dict: Хранилище, количество попаданий и промахов, ошибки Redis.
+        """
+    return response_cache.stats()
+
+
+@router.get('/hashing')
+async def hashing_stats():
+    """
+        Возвращает метрики пула хэширования паролей.
+
+        Returns:
+        - dict: Глубина очереди, количество выполняемых и завершенных операций, среднее время ожидания.
+        """
+    return password_hasher.stats()
+
+
+@router.get('/rate-limit')
+async def rate_limit_stats():
+    """
+        Возвращает статистику лимитера запросов.
+
+        Returns:
+        - dict: Режим, доступность Redis, количество проверок в Redis и в памяти процесса, отказы из кэша.
+        """
+    return rate_limit_backend.stats()
+
+
+@router.get('/pool')
+async def pool_stats():
+    """
+        Возвращает состояние пула соединений с базой данных.
+
+        Returns:
+        - dict: Выданные соединения, переполнение, гистограмма ожидания соединения и ошибки подключения.
+        """
+    return session_manage.pool_stats()
+
+
+@router.get('/replicas')
+async def replica_stats():
+    """
+        Возвращает распределение чтений между репликами и основной базой.
+
+        Returns:
+        - dict: Стратегия, сессии чтения по репликам, открытые сессии и чтения из основной базы после записи.
+        """
+    return session_manage.replica_stats()
+
+
+@router.get('/outbox')
+async def outbox_stats(db: AsyncSession = Depends(get_db)):
+    """
+        Возвращает состояние очереди исходящих писем.
+
+        Parameters:
+        - db: Сессия базы данных (тип AsyncSession), получаемая из зависимости get_db.
+
+        Returns:
+        - dict: Количество писем по статусам и возраст самого старого неотправленного письма.
+        """
+    return await functionoutbox.outbox_stats(db)
@@ -1,21 +1,19 @@
-import cloudinary
-import cloudinary.uploader
 from sqlalchemy import select
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Depends, BackgroundTasks, Request
-from fastapi_limiter.depends import RateLimiter
+from src.services.ratelimit_services import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.db.connectdb import get_db
 from src.contacts.models import User
 from src.schemas.user import UserResponse
 from src.services.auth_services import auth_service
-from src.conf.dburl import config
 from fastapi import FastAPI, APIRouter, status
 from src.repository import functionuser
 from src.services.email_services import send_password_email
 from src.schemas.user import PasswordForm
+from src.services.storage_services import save_avatar, FileTooLarge
+from src.services.serializers import model_response, user_response
 
 router = APIRouter()
-cloudinary.config(cloud_name=config.CLD_NAME, api_key=config.CLD_API_KEY, api_secret=config.CLD_API_SECRET, secure=True)
 
 
 @router.get('/me', response_model=UserResponse, dependencies=[Depends(RateLimiter(times=1, seconds=20))])
@@ -31,7 +29,7 @@ async def get_current_user(user: User = Depends(auth_service.get_current_user),
         Returns:
         - Информация о текущем пользователе (тип UserResponse).
         """
-    return user
+    return model_response(user_response, user)
 
 
 @router.patch('/avatar', response_model=UserResponse, dependencies=[Depends(RateLimiter(times=1, seconds=20))])
@@ -40,6 +38,10 @@ async def get_current_user(file: UploadFile = File(), user: User = Depends(auth_
     """
         Обновляет аватар пользователя.
 
+        Запросы с телом больше AVATAR_MAX_BYTES отклоняются UploadLimitMiddleware до разбора multipart;
+        файл читается блоками с проверкой размера, а загрузка в хранилище (AVATAR_STORAGE)
+        выполняется вне цикла событий.
+
         Parameters:
         - file: Файл изображения аватара (тип UploadFile), передаваемый в теле запроса.
         - user: Текущий пользователь (тип User), получаемый из зависимости auth_service.get_current_user.
@@ -48,11 +50,10 @@ async def get_current_user(file: UploadFile = File(), user: User = Depends(auth_
         Returns:
         - Информация о пользователе с обновленным аватаром (тип UserResponse).
         """
-    public_id = f'Web16/{user.email}'
-    res = cloudinary.uploader.upload(file.file, public_id=public_id, owerite=True)
-    print(res)
-    res_url = cloudinary.CloudinaryImage(public_id).build_url(width=250, height=250, crop='fill',
-                                                              version=res.get('version'))
+    try:
+        res_url = await save_avatar(file, f'Web16/{user.email}')
+    except FileTooLarge:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail='File is too large')
     user = await functionuser.update_avatar_url(user.email, res_url, db)
     return user
 
@@ -71,14 +72,13 @@ async def new_password(token: str, db: AsyncSession = Depends(get_db)):
         - Сообщение об успешном обновлении пароля (словарь).
         """
     email = await auth_service.get_email_reset_token(token)
-    password = await auth_service.verify_password_reset_token(token)
+    password_hash = await auth_service.verify_password_reset_token(token)
     user = await functionuser.get_user_by_email(email, db)
 
     if user is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error")
-    if password:
-        password = auth_service.get_password_hash(password)
-        await functionuser.update_password(email, password, db)
+    if password_hash:
+        await functionuser.update_password(email, password_hash, db)
     return {"message": "New password updated!"}
 
 
@@ -104,11 +104,10 @@ async def reset_password(body: PasswordForm, request: Request, db: AsyncSession
             detail="Пользователь с таким email не найден"
         )
 
-    token = await auth_service.create_password_token(body.email, body.password)
+    password_hash = await auth_service.get_password_hash_async(body.password)
+    token = await auth_service.create_password_token(body.email, password_hash)
 
-    await send_password_email(body.email,  token, str(request.base_url), body.password,)
-    print(str(request.base_url))
-    print(body.password)
+    await send_password_email(body.email, token, str(request.base_url), db)
 
     return {'message': 'password send to email'}
 
@@ -1,8 +1,9 @@
 from typing import Optional
 from datetime import date
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from sqlalchemy import Column, String, Integer, Date
 
+from src.conf.dburl import config
 from src.schemas.user import UserResponse
 
 
@@ -52,3 +53,136 @@ class CreateContact(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ContactPage(BaseModel):
+    """
+        Страница контактов для курсорной (keyset) пагинации.
+
+        Attributes:
+        - items (list[CreateContact]): Контакты текущей страницы.
+        - next_cursor (Optional[str]): Курсор для запроса следующей страницы или None, если страница последняя.
+        """
+    items: list[CreateContact]
+    next_cursor: Optional[str] = None
+
+
+class ImportRowError(BaseModel):
+    """
+        Ошибка импорта одной записи.
+
+        Attributes:
+        - row (int): Номер записи во входном файле (без учета заголовка CSV).
+        - errors (list[str]): Описание ошибок.
+        """
+    row: int
+    errors: list[str]
+
+
+class ImportReport(BaseModel):
+    """
+        Отчет о массовом импорте контактов.
+
+        Attributes:
+        - imported (int): Количество импортированных контактов.
+        - failed (int): Количество записей с ошибками.
+        - errors (list[ImportRowError]): Ошибки по записям.
+        - errors_truncated (bool): True, если ошибок больше, чем помещено в отчет.
+        """
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
+    errors_truncated: bool = False
+
+
+class ContactPatch(BaseModel):
+    """
+        Схема частичного обновления контакта: изменяются только переданные поля.
+
+        Attributes:
+        - name (Optional[str]): Имя контакта, максимальная длина 30 символов.
+        - surname (Optional[str]): Фамилия контакта, максимальная длина 30 символов.
+        - phone (Optional[str]): Номер телефона контакта, максимальная длина 30 символов.
+        - email (Optional[str]): Адрес электронной почты контакта, максимальная длина 30 символов.
+        - birthday (Optional[date]): День рождения контакта.
+        - information (Optional[str]): Дополнительная информация о контакте, максимальная длина 250 символов.
+        """
+    name: Optional[str] = Field(None, max_length=30)
+    surname: Optional[str] = Field(None, max_length=30)
+    phone: Optional[str] = Field(None, max_length=30)
+    email: Optional[str] = Field(None, max_length=30)
+    birthday: Optional[date] = None
+    information: Optional[str] = Field(None, max_length=250)
+
+    @model_validator(mode='after')
+    def check_required_not_null(self):
+        for field in ('name', 'surname', 'phone', 'email', 'birthday'):
+            if field in self.model_fields_set and getattr(self, field) is None:
+                raise ValueError(f'{field} can not be null')
+        return self
+
+    def changes(self) -> dict:
+        """
+                Возвращает переданные поля для UPDATE.
+
+                Returns:
+                - dict: Имена колонок и новые значения (information=None заменяется пустой строкой).
+                """
+        values = self.model_dump(exclude_unset=True, exclude={'id'})
+        if 'information' in values and values['information'] is None:
+            values['information'] = ''
+        return values
+
+
+class ContactPatchItem(ContactPatch):
+    """
+        Элемент пакетного обновления.
+
+        Attributes:
+        - id (int): Идентификатор контакта.
+        """
+    id: int
+
+
+class ContactIds(BaseModel):
+    """
+        Список идентификаторов для пакетного чтения или удаления.
+
+        Attributes:
+        - ids (list[int]): Идентификаторы контактов (не больше BATCH_MAX_SIZE).
+        """
+    ids: list[int] = Field(min_length=1, max_length=config.BATCH_MAX_SIZE)
+
+
+class ContactBatchPatch(BaseModel):
+    """
+        Пакетное обновление контактов.
+
+        Attributes:
+        - items (list[ContactPatchItem]): Изменения контактов (не больше BATCH_MAX_SIZE).
+        """
+    items: list[ContactPatchItem] = Field(min_length=1, max_length=config.BATCH_MAX_SIZE)
+
+
+class BatchItemResult(BaseModel):
+    """
+        Результат пакетной операции для одного идентификатора.
+
+        Attributes:
+        - id (int): Идентификатор контакта.
+        - status (str): 'ok', 'updated', 'deleted' или 'not_found'.
+        - contact (Optional[CreateContact]): Контакт после операции (для чтения и обновления).
+        """
+    id: int
+    status: str
+    contact: Optional[CreateContact] = None
+
+
+class BatchResult(BaseModel):
+    """
+        Результат пакетной операции.
+
+        Attributes:
+        - results (list[BatchItemResult]): Результаты в порядке запроса (повторные идентификаторы объединяются).
+        """
+    results: list[BatchItemResult]
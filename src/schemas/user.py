@@ -21,6 +21,11 @@ class TokenUpdate(pydantic.BaseModel):
     refresh_token: str
     token_type: str = 'bearer'
 
+class SessionResponse(pydantic.BaseModel):
+    sid: str
+    device: str
+    created_at: int
+
 class RequestEmail(pydantic.BaseModel):
     email:EmailStr
 
@@ -1,14 +1,21 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
+from sqlalchemy.orm import make_transient_to_detached
 from src.contacts.models import User
-from src.db.connectdb import get_db
+from src.db.connectdb import get_db, current_user_key
 from src.repository import functionuser as repository_users
 from src.conf.dburl import config
+from src.services.cache_services import user_cache_sync, token_cache
+from src.services.hash_services import pwd_context, password_hasher, HasherBusy
+
+# Столбцы пользователя в кэше аутентификации: хэш пароля в памяти не хранится
+CACHED_USER_COLUMNS = tuple(attr.key for attr in User.__mapper__.column_attrs if attr.key != 'password')
 
 
 class Auth:
@@ -20,7 +27,7 @@ class Auth:
         - SECRET_KEY: Секретный ключ для создания токенов.
         - ALGORITHM: Алгоритм шифрования токенов.
         """
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated='auto')
+    pwd_context = pwd_context
     SECRET_KEY = config.SECRET_KEY_JWT
     ALGORITHM = config.ALGORITHM
 
@@ -32,6 +39,22 @@ class Auth:
         """Хэширует пароль."""
         return self.pwd_context.hash(password)
 
+    async def verify_password_async(self, plain_password, hashed_password):
+        """Проверяет пароль в пуле password_hasher, не блокируя цикл событий."""
+        try:
+            return await password_hasher.verify(plain_password, hashed_password)
+        except HasherBusy:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Server is busy',
+                                headers={'Retry-After': '1'})
+
+    async def get_password_hash_async(self, password: str):
+        """Хэширует пароль в пуле password_hasher, не блокируя цикл событий."""
+        try:
+            return await password_hasher.hash(password)
+        except HasherBusy:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Server is busy',
+                                headers={'Retry-After': '1'})
+
     auth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
@@ -67,14 +90,71 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
+    async def decode_session_token(self, refresh_token: str) -> dict:
+        """
+                Декодирует токен обновления, выданный для сессии в session_store.
+
+                Parameters:
+                - refresh_token: JWT токен обновления.
+
+                Returns:
+                - dict: Payload с полями sub (email), sid (сессия) и jti (идентификатор токена).
+
+                Raises:
+                - HTTPException: 401, если токен недействителен или выдан не для сессии.
+                """
+        try:
+            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
+        if payload.get('scope') != 'refresh_token':
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
+        if not all(payload.get(key) for key in ('sub', 'sid', 'jti')):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
+        return payload
+
+    def decode_access_token(self, token: str) -> dict:
+        """
+                Декодирует и проверяет токен, используя кэш token_cache.
+
+                Ключ кэша - sha256 токена, поэтому в кэше не хранятся сами токены. Запись живет
+                не дольше exp токена, а в кэш попадают только токены, прошедшие проверку подписи.
+
+                Parameters:
+                - token: JWT токен.
+
+                Returns:
+                - dict: Payload токена.
+
+                Raises:
+                - JWTError: Если токен недействителен.
+                """
+        digest = hashlib.sha256(token.encode()).digest()
+        payload = token_cache.get(digest)
+        if payload is None:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            if 'exp' in payload:
+                token_cache.set(digest, payload, ttl=payload['exp'] - time.time())
+        return payload
+
     async def get_current_user(self, token: str = Depends(auth2_scheme), db: AsyncSession = Depends(get_db)):
-        """Получает текущего пользователя из токена."""
+        """
+                Получает текущего пользователя из токена.
+
+                Проверенный токен берется из кэша token_cache (см. decode_access_token).
+                Пользователь берется из кэша user_cache по subject токена; при промахе
+                выполняется запрос к базе данных, а результат кэшируется без хэша пароля.
+                Изменения пользователя удаляют запись из кэшей всех воркеров (user_cache_sync).
+
+                Идентификатор пользователя записывается в current_user_key: по нему сессии
+                get_read_db направляют чтения после записи пользователя в основную базу.
+                """
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"}, )
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_access_token(token)
             if payload['scope'] == 'access_token':
                 email = payload["sub"]
                 if email is None:
@@ -83,9 +163,18 @@ class Auth:
                 raise credentials_exception
         except JWTError as e:
             raise credentials_exception
+        cached = user_cache_sync.get(email)
+        if cached is not None:
+            user = User(**cached)
+            make_transient_to_detached(user)
+            current_user_key.set(user.id)
+            return await db.merge(user, load=False)
+        generation = user_cache_sync.generation
         user = await repository_users.get_user_by_email(email, db)
         if user is None:
             raise credentials_exception
+        current_user_key.set(user.id)
+        user_cache_sync.set(email, {key: getattr(user, key) for key in CACHED_USER_COLUMNS}, generation)
         return user
 
     async def create_email_token(self, data: dict):
@@ -106,10 +195,10 @@ class Auth:
             print(e)
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='invalid token')
 
-    async def create_password_token(self, email, password):
-        """Создает токен для сброса пароля."""
+    async def create_password_token(self, email, password_hash):
+        """Создает токен для сброса пароля; в токене хранится только хэш нового пароля."""
         payload = {
-            'password':password,
+            'password_hash': password_hash,
             'email': email,
             'exp': datetime.utcnow() + timedelta(days=1)  # Токен будет действителен 1 день
         }
@@ -117,10 +206,10 @@ class Auth:
         return token
 
     async def verify_password_reset_token(self, token):
-        """Верифицирует токен сброса пароля."""
+        """Верифицирует токен сброса пароля и возвращает хэш нового пароля."""
         try:
             payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            return payload.get('password')
+            return payload.get('password_hash')
         except HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,detail='invalid token'):
             return None
 
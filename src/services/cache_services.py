@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from redis.exceptions import RedisError
+
+from src.conf.dburl import config
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+        Ограниченный по размеру in-process кэш с вытеснением LRU и временем жизни записей.
+
+        Attributes:
+        - maxsize (int): Максимальное количество записей в кэше.
+        - ttl (float): Время жизни записи в секундах.
+        - hits (int): Количество попаданий в кэш.
+        - misses (int): Количество промахов.
+        - evictions (int): Количество записей, вытесненных по LRU.
+        """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+                Инициализация кэша.
+
+                Parameters:
+                - maxsize: Максимальное количество записей.
+                - ttl: Время жизни записи в секундах.
+                """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """
+                Возвращает значение из кэша или None, если записи нет или она устарела.
+
+                Parameters:
+                - key: Ключ записи.
+
+                Returns:
+                - Закэшированное значение или None.
+                """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """
+                Сохраняет значение в кэше, вытесняя самую давно используемую запись при переполнении.
+
+                Parameters:
+                - key: Ключ записи.
+                - value: Сохраняемое значение.
+                - ttl: Время жизни этой записи в секундах, если оно меньше ttl кэша.
+                """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Удаляет запись из кэша, если она есть."""
+        self._data.pop(key, None)
+
+    def invalidate_all(self):
+        """Удаляет все записи, сохраняя счетчики."""
+        self._data.clear()
+
+    def clear(self):
+        """Очищает кэш и сбрасывает счетчики."""
+        self._data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+                Возвращает статистику кэша.
+
+                Returns:
+                - dict: Размер, лимит, попадания, промахи, вытеснения и доля попаданий.
+                """
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class CacheInvalidation:
+    """
+        Инвалидация записей LRUCache во всех воркерах через Redis pub/sub.
+
+        Каждый воркер serve.py держит собственный кэш. Измененная запись удаляется из кэша своего
+        воркера и публикуется в канал channel; фоновая задача (start) остальных воркеров удаляет
+        ее у себя. Пока подписка не установлена (Redis недоступен, переподключение), кэш не
+        используется: пропущенное сообщение оставило бы устаревшую запись. Если Redis не подключен
+        (init не вызывался, один процесс), кэш работает с локальной инвалидацией.
+
+        Счетчик generation увеличивается при каждой инвалидации: значение, прочитанное из базы до
+        инвалидации, не сохраняется в кэш (см. set).
+
+        Attributes:
+        - cache (LRUCache): Кэш воркера.
+        - channel (str): Канал Redis.
+        - retry (float): Пауза перед повторной подпиской после ошибки в секундах.
+        - subscribed (bool): Подписка на канал установлена.
+        - generation (int): Количество инвалидаций в этом воркере.
+        - published (int): Количество опубликованных инвалидаций.
+        - received (int): Количество инвалидаций, полученных от других воркеров.
+        - errors (int): Количество ошибок Redis.
+        """
+
+    def __init__(self, cache: LRUCache, channel: str, retry: float = 1.0):
+        """
+                Parameters:
+                - cache: Кэш воркера.
+                - channel: Канал Redis.
+                - retry: Пауза перед повторной подпиской после ошибки в секундах.
+                """
+        self.cache = cache
+        self.channel = channel
+        self.retry = retry
+        self.redis = None
+        self.subscribed = False
+        self.generation = self.published = self.received = self.errors = 0
+        self._task = None
+
+    def init(self, redis):
+        """
+                Подключает клиент Redis. До установки подписки (start) кэш не используется.
+
+                Parameters:
+                - redis: Клиент redis.asyncio (в тестах - fakeredis.FakeAsyncRedis).
+                """
+        self.redis = redis
+        self.subscribed = False
+
+    @property
+    def active(self) -> bool:
+        """Можно ли пользоваться кэшем: Redis не подключен или подписка установлена."""
+        return self.redis is None or self.subscribed
+
+    def get(self, key: Hashable):
+        """
+                Возвращает значение из кэша или None, если записи нет или кэш сейчас не используется.
+
+                Parameters:
+                - key: Ключ записи.
+                """
+        return self.cache.get(key) if self.active else None
+
+    def set(self, key: Hashable, value: Any, generation: int):
+        """
+                Сохраняет значение, если после его чтения не было инвалидаций.
+
+                Parameters:
+                - key: Ключ записи.
+                - value: Сохраняемое значение.
+                - generation: Значение generation до чтения value из базы данных.
+                """
+        if self.active and generation == self.generation:
+            self.cache.set(key, value)
+
+    async def invalidate(self, key: str):
+        """
+                Удаляет запись из кэша своего воркера и сообщает об этом остальным.
+
+                Вызывается после commit: иначе другой воркер мог бы снова закэшировать старое значение.
+                Ошибка публикации только учитывается - подписка остальных воркеров в этом случае,
+                скорее всего, тоже прервана, и они не используют кэш.
+
+                Parameters:
+                - key: Ключ записи.
+                """
+        self.cache.invalidate(key)
+        self.generation += 1
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(self.channel, key)
+            self.published += 1
+        except (RedisError, OSError) as err:
+            self.errors += 1
+            logger.warning('cache invalidation for %s was not published: %s', self.channel, err)
+
+    async def run(self):
+        """Слушает канал до отмены задачи; после обрыва подписки переподключается через retry секунд."""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message['type'] == 'subscribe':
+                        # Сообщения, пропущенные без подписки, не восстановить: кэш очищается
+                        self.cache.invalidate_all()
+                        self.generation += 1
+                        self.subscribed = True
+                    elif message['type'] == 'message':
+                        data = message['data']
+                        self.cache.invalidate(data.decode() if isinstance(data, bytes) else data)
+                        self.generation += 1
+                        self.received += 1
+            except (RedisError, OSError) as err:
+                self.errors += 1
+                logger.warning('cache invalidation channel %s is unavailable: %s', self.channel, err)
+            finally:
+                self.subscribed = False
+                try:
+                    await pubsub.aclose()
+                except (RedisError, OSError):
+                    pass
+            await asyncio.sleep(self.retry)
+
+    def start(self):
+        """Запускает подписку в текущем цикле событий, если Redis подключен."""
+        if self.redis is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Останавливает подписку."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """
+                Возвращает состояние инвалидации.
+
+                Returns:
+                - dict: Подписка, количество опубликованных и полученных инвалидаций, ошибки Redis.
+                """
+        return {'subscribed': self.subscribed, 'published': self.published, 'received': self.received,
+                'errors': self.errors}
+
+
+user_cache = LRUCache(maxsize=config.USER_CACHE_MAXSIZE, ttl=config.USER_CACHE_TTL)
+
+# Кэш пользователей общий для всех воркеров только через инвалидацию (см. CacheInvalidation)
+user_cache_sync = CacheInvalidation(user_cache, 'user_cache:invalidate')
+
+# Проверенные access-токены: sha256 токена -> payload, запись живет не дольше exp токена
+token_cache = LRUCache(maxsize=config.TOKEN_CACHE_MAXSIZE, ttl=config.TOKEN_CACHE_TTL)
@@ -1,79 +1,93 @@
+import json
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
 from pathlib import Path
 
-from fastapi import Depends
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from src.conf.dburl import config
+from src.repository import functionoutbox
 from src.services.auth_services import auth_service
-from src.conf.dburl import config
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=config.MAIL_USERNAME,
-    MAIL_PASSWORD=config.MAIL_PASSWORD,
-    MAIL_FROM=config.MAIL_FROM,
-    MAIL_PORT=config.MAIL_PORT,
-    MAIL_SERVER=config.MAIL_SERVER,
-    MAIL_FROM_NAME="TODO system",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
-
-
-async def send_email(email: EmailStr, username: str, host: str):
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+MAIL_FROM_NAME = "TODO system"
+
+
+
+@lru_cache
+def get_templates():
     """
-        Отправляет электронное сообщение для подтверждения адреса электронной почты пользователя.
+        Возвращает окружение Jinja2 для шаблонов писем.
 
-        Parameters:
-        - email: Адрес электронной почты пользователя.
-        - username: Имя пользователя.
-        - host: Хост, на котором запущено приложение.
+        jinja2 импортируется при первом письме: API только записывает письма в outbox,
+        а шаблоны рендерит воркер.
+        """
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-        Raises:
-        - ConnectionErrors: Возникает при ошибке подключения при отправке сообщения.
+    return Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), autoescape=select_autoescape(['html']))
+
+
+def build_message(recipient: str, subject: str, template_name: str, template_body: str | dict) -> EmailMessage:
+    """
+        Собирает HTML-письмо из шаблона.
+
+        Parameters:
+        - recipient: Адрес получателя.
+        - subject: Тема письма.
+        - template_name: Имя шаблона в каталоге templates.
+        - template_body: Переменные шаблона (словарь или JSON-строка из outbox).
 
         Returns:
-        Нет возвращаемого значения. Отправляет электронное сообщение для подтверждения адреса электронной почты.
+        - EmailMessage: Готовое к отправке письмо.
         """
-    try:
-        token_verification = await auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
+    if isinstance(template_body, str):
+        template_body = json.loads(template_body)
+    message = EmailMessage()
+    message['From'] = formataddr((MAIL_FROM_NAME, config.MAIL_FROM))
+    message['To'] = recipient
+    message['Subject'] = subject
+    message.set_content(get_templates().get_template(template_name).render(**template_body), subtype='html')
+    return message
+
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="verify_email.html")
-    except ConnectionErrors as err:
-        print(err)
+async def send_email(email: EmailStr, username: str, host: str, db: AsyncSession, commit: bool = True):
+    """
+        Ставит в очередь письмо для подтверждения адреса электронной почты пользователя.
+
+        Письмо записывается в outbox и отправляется воркером src.services.outbox_worker.
 
+        Parameters:
+        - email: Адрес электронной почты пользователя.
+        - username: Имя пользователя.
+        - host: Хост, на котором запущено приложение.
+        - db: Сессия базы данных (тип AsyncSession).
+        - commit: Зафиксировать транзакцию сразу. False - письмо запишется вместе с остальными изменениями сессии.
 
-fastmail = FastMail(conf)
+        Returns:
+        Нет возвращаемого значения.
+        """
+    token_verification = await auth_service.create_email_token({"sub": email})
+    await functionoutbox.enqueue_email(email, "Confirm your email ", "verify_email.html",
+                                       {"host": host, "username": username, "token": token_verification},
+                                       db, commit=commit)
 
 
-async def send_password_email(email: str, token: str, host: str, password: str):
+async def send_password_email(email: str, token: str, host: str, db: AsyncSession):
     """
-        Отправляет электронное сообщение с новым паролем пользователю.
+        Ставит в очередь письмо со ссылкой для подтверждения нового пароля.
+
+        Сам пароль в письмо и в outbox не попадает: токен содержит только его хэш.
 
         Parameters:
         - email: Адрес электронной почты пользователя.
         - token: Токен для подтверждения сброса пароля.
         - host: Хост, на котором запущено приложение.
-        - password: Новый сгенерированный пароль пользователя.
+        - db: Сессия базы данных (тип AsyncSession).
 
         Returns:
-        Нет возвращаемого значения. Отправляет электронное сообщение с новым паролем пользователю.
+        Нет возвращаемого значения.
         """
-    token_verification = auth_service.create_email_token({"sub": email, "password": password})
-    message = MessageSchema(
-        subject="Ваш новый пароль",
-        recipients=[email],
-        template_body={'email': email, 'token': token, 'host': host, 'password': password,},
-        subtype=MessageType.html
-    )
-    await fastmail.send_message(message, template_name="password.html")
+    await functionoutbox.enqueue_email(email, "Ваш новый пароль", "password.html",
+                                       {'email': email, 'token': token, 'host': host}, db)
@@ -0,0 +1,188 @@
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response, status
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.dburl import config
+from src.contacts.models import User
+from src.repository import functiondb
+from src.services.cache_services import LRUCache
+from src.services.serializers import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+        Кэш тел ответов по ETag: в памяти процесса ('memory'), в Redis ('redis') или выключен ('none').
+
+        Ключ содержит версию адресной книги, поэтому записи не нужно инвалидировать:
+        после изменения контактов старые записи просто перестают запрашиваться и вытесняются
+        по LRU (в памяти) или по TTL и maxmemory-policy (в Redis).
+
+        Attributes:
+        - backend (str): 'none', 'memory' или 'redis'.
+        - ttl (float): Время жизни записи в секундах.
+        - hits (int): Количество попаданий.
+        - misses (int): Количество промахов.
+        - errors (int): Количество ошибок Redis.
+        """
+
+    def __init__(self, backend: str, maxsize: int, ttl: float, prefix: str = 'etag'):
+        """
+                Parameters:
+                - backend: 'none', 'memory' или 'redis'.
+                - maxsize: Максимальное количество записей в памяти процесса.
+                - ttl: Время жизни записи в секундах.
+                - prefix: Префикс ключей в Redis.
+                """
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.redis = None
+        self.hits = self.misses = self.errors = 0
+
+    def init(self, redis):
+        """
+                Подключает клиент Redis.
+
+                Parameters:
+                - redis: Клиент redis.asyncio.
+                """
+        self.redis = redis
+
+    async def get(self, key: str) -> bytes | None:
+        """
+                Возвращает тело ответа или None, если записи нет. Ошибки Redis считаются промахом.
+
+                Parameters:
+                - key: ETag ответа.
+
+                Returns:
+                - bytes | None: Тело ответа.
+                """
+        body = None
+        if self.backend == 'memory':
+            body = self.memory.get(key)
+        elif self.backend == 'redis' and self.redis is not None:
+            try:
+                body = await self.redis.get(f'{self.prefix}:{key}')
+            except (RedisError, OSError) as err:
+                self.errors += 1
+                logger.warning('response cache: Redis get failed: %s', err)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    async def set(self, key: str, body: bytes):
+        """
+                Сохраняет тело ответа.
+
+                Parameters:
+                - key: ETag ответа.
+                - body: Тело ответа.
+                """
+        if self.backend == 'memory':
+            self.memory.set(key, body)
+        elif self.backend == 'redis' and self.redis is not None:
+            try:
+                await self.redis.set(f'{self.prefix}:{key}', body, ex=max(1, int(self.ttl)))
+            except (RedisError, OSError) as err:
+                self.errors += 1
+                logger.warning('response cache: Redis set failed: %s', err)
+
+    def clear(self):
+        """Очищает кэш в памяти процесса и сбрасывает счетчики."""
+        self.memory.clear()
+        self.hits = self.misses = self.errors = 0
+
+    def stats(self) -> dict:
+        """
+                Возвращает статистику кэша.
+
+                Returns:
+                - dict: Хранилище, попадания, промахи, доля попаданий и ошибки Redis.
+                """
+        total = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'errors': self.errors,
+            'memory_size': self.memory.stats()['size'],
+        }
+
+
+response_cache = ResponseCache(config.ETAG_CACHE_BACKEND, config.ETAG_CACHE_MAXSIZE, config.ETAG_CACHE_TTL)
+
+
+def make_etag(user_id: int, version: int, request: Request, variant: str = '') -> str:
+    """
+        Строит сильный ETag представления адресной книги.
+
+        Parameters:
+        - user_id: Идентификатор пользователя.
+        - version: Версия адресной книги пользователя.
+        - request: Объект запроса; учитываются путь и отсортированные параметры запроса.
+        - variant: Дополнительная часть ключа (например, текущая дата для дней рождения).
+
+        Returns:
+        - str: ETag в кавычках.
+        """
+    query = '&'.join(f'{key}={value}' for key, value in sorted(request.query_params.multi_items()))
+    raw = f'{user_id}:{version}:{request.url.path}?{query}:{variant}'
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """
+        Проверяет заголовок If-None-Match.
+
+        Parameters:
+        - etag: ETag текущего представления.
+        - if_none_match: Значение заголовка If-None-Match.
+
+        Returns:
+        - bool: True, если клиент уже имеет текущее представление.
+        """
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix('W/') for value in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+async def conditional_json(request: Request, db: AsyncSession, user: User,
+                           build: Callable[[], Awaitable[Any]], variant: str = '') -> Response:
+    """
+        Возвращает JSON-ответ с ETag, 304 при совпадении If-None-Match или тело из кэша.
+
+        Проверка If-None-Match требует только чтения версии из таблицы users; контакты
+        запрашиваются и сериализуются лишь при промахе кэша.
+
+        Parameters:
+        - request: Объект запроса.
+        - db: Сессия базы данных (тип AsyncSession).
+        - user: Текущий пользователь.
+        - build: Корутинная функция без аргументов, возвращающая JSON-совместимые данные.
+        - variant: Дополнительная часть ключа ETag.
+
+        Returns:
+        - Response: 304 без тела или 200 с JSON и заголовком ETag.
+        """
+    version = await functiondb.get_contacts_version(db, user.id)
+    etag = make_etag(user.id, version, request, variant)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(etag, request.headers.get('if-none-match')):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = await response_cache.get(etag)
+    if body is None:
+        body = dumps(await build())
+        await response_cache.set(etag, body)
+    return Response(body, media_type='application/json', headers=headers)
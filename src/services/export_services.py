@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.connectdb import session_manage
+from src.repository import functiondb
+
+EXPORT_FIELDS = ('id', 'name', 'surname', 'phone', 'email', 'birthday', 'information')
+
+MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'vcard': 'text/vcard; charset=utf-8',
+}
+
+EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson', 'vcard': 'vcf'}
+
+
+def _vcard_escape(value) -> str:
+    if value is None:
+        return ''
+    return (str(value).replace('\\', '\\\\').replace('\n', '\\n')
+            .replace(',', '\\,').replace(';', '\\;'))
+
+
+def to_csv(rows) -> str:
+    """
+        Форматирует строки контактов в CSV.
+
+        Parameters:
+        - rows: Строки результата запроса с полями EXPORT_FIELDS.
+
+        Returns:
+        - str: Фрагмент CSV без заголовка.
+        """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[field] is None else row[field] for field in EXPORT_FIELDS])
+    return buffer.getvalue()
+
+
+def to_ndjson(rows) -> str:
+    """
+        Форматирует строки контактов в NDJSON (один JSON-объект на строку).
+
+        Parameters:
+        - rows: Строки результата запроса с полями EXPORT_FIELDS.
+
+        Returns:
+        - str: Фрагмент NDJSON.
+        """
+    return ''.join(json.dumps({field: row[field] for field in EXPORT_FIELDS}, default=str, ensure_ascii=False) + '\n'
+                   for row in rows)
+
+
+def to_vcard(rows) -> str:
+    """
+        Форматирует строки контактов в vCard 3.0.
+
+        Parameters:
+        - rows: Строки результата запроса с полями EXPORT_FIELDS.
+
+        Returns:
+        - str: Последовательность карточек vCard.
+        """
+    cards = []
+    for row in rows:
+        lines = [
+            'BEGIN:VCARD',
+            'VERSION:3.0',
+            f"N:{_vcard_escape(row['surname'])};{_vcard_escape(row['name'])};;;",
+            f"FN:{_vcard_escape(' '.join(filter(None, (row['name'], row['surname']))))}",
+            f"TEL:{_vcard_escape(row['phone'])}",
+            f"EMAIL:{_vcard_escape(row['email'])}",
+        ]
+        if row['birthday'] is not None:
+            lines.append(f"BDAY:{row['birthday'].isoformat()}")
+        if row['information']:
+            lines.append(f"NOTE:{_vcard_escape(row['information'])}")
+        lines.append('END:VCARD')
+        cards.append('\r\n'.join(lines) + '\r\n')
+    return ''.join(cards)
+
+
+FORMATTERS = {'csv': to_csv, 'ndjson': to_ndjson, 'vcard': to_vcard}
+
+
+async def export_contacts(fmt: str, db: AsyncSession, user_id: int) -> AsyncIterator[bytes]:
+    """
+        Потоково выгружает все контакты пользователя в указанном формате.
+
+        Parameters:
+        - fmt: Формат выгрузки ('csv', 'ndjson' или 'vcard').
+        - db: Сессия базы данных (тип AsyncSession), которая живет до конца выгрузки.
+        - user_id: Идентификатор пользователя.
+
+        Yields:
+        - bytes: Очередной фрагмент выгрузки.
+        """
+    formatter = FORMATTERS[fmt]
+    if fmt == 'csv':
+        yield (','.join(EXPORT_FIELDS) + '\r\n').encode()
+    async for rows in functiondb.stream_contacts(db, user_id):
+        yield formatter(rows).encode()
+
+
+async def stream_export(fmt: str, user_id: int) -> AsyncIterator[bytes]:
+    """
+        Выгружает контакты в собственной сессии базы данных.
+
+        Сессия из зависимости get_db закрывается до отправки StreamingResponse,
+        поэтому выгрузка открывает отдельную сессию чтения (реплика, если пользователь
+        недавно не писал) на время передачи ответа.
+
+        Parameters:
+        - fmt: Формат выгрузки ('csv', 'ndjson' или 'vcard').
+        - user_id: Идентификатор пользователя.
+
+        Yields:
+        - bytes: Очередной фрагмент выгрузки.
+        """
+    async with session_manage.read_session(user_id) as session:
+        async for chunk in export_contacts(fmt, session, user_id):
+            yield chunk
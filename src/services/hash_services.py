@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from src.conf.dburl import config
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated='auto')
+
+
+def hash_password(password: str) -> str:
+    """Хэширует пароль (блокирующая операция, выполняется в пуле)."""
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Проверяет пароль по хэшу (блокирующая операция, выполняется в пуле)."""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class HasherBusy(Exception):
+    """Очередь на хэширование переполнена."""
+
+
+class PasswordHasher:
+    """
+        Выполняет bcrypt вне цикла событий в пуле потоков или процессов с ограничением параллелизма.
+
+        Attributes:
+        - executor_kind (str): Тип пула: 'thread' или 'process'.
+        - workers (int): Количество воркеров пула.
+        - max_concurrency (int): Максимальное количество одновременно выполняемых операций.
+        - max_queue (int): Максимальное количество ожидающих операций (0 - без ограничения).
+        """
+
+    def __init__(self, executor_kind: str, workers: int, max_concurrency: int, max_queue: int = 0):
+        """
+                Инициализация хэшера. Пул создается при первом использовании.
+
+                Parameters:
+                - executor_kind: Тип пула: 'thread' или 'process'.
+                - workers: Количество воркеров пула (0 - по количеству CPU).
+                - max_concurrency: Максимальное количество одновременно выполняемых операций.
+                - max_queue: Максимальное количество ожидающих операций (0 - без ограничения).
+                """
+        self.executor_kind = executor_kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HasherBusy()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self.wait_seconds += started - queued_at
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - started
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """
+                Хэширует пароль в пуле.
+
+                Parameters:
+                - password: Пароль в открытом виде.
+
+                Returns:
+                - str: Хэш пароля.
+
+                Raises:
+                - HasherBusy: Если очередь ожидания переполнена.
+                """
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+                Проверяет пароль по хэшу в пуле.
+
+                Parameters:
+                - plain_password: Пароль в открытом виде.
+                - hashed_password: Хэш из базы данных.
+
+                Returns:
+                - bool: True, если пароль совпадает.
+
+                Raises:
+                - HasherBusy: Если очередь ожидания переполнена.
+                """
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """
+                Возвращает метрики пула хэширования.
+
+                Returns:
+                - dict: Текущая и максимальная глубина очереди, количество выполняемых, завершенных
+                  и отклоненных операций, среднее время ожидания и выполнения в миллисекундах.
+                """
+        return {
+            'executor': self.executor_kind,
+            'workers': self.workers,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'queue_depth': self.waiting,
+            'max_queue_depth': self.max_waiting,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'avg_wait_ms': self.wait_seconds / self.completed * 1000 if self.completed else 0.0,
+            'avg_run_ms': self.run_seconds / self.completed * 1000 if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        """Останавливает пул, если он был создан."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(config.HASH_EXECUTOR, config.HASH_WORKERS, config.HASH_MAX_CONCURRENCY,
+                                 config.HASH_MAX_QUEUE)
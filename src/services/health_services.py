@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from sqlalchemy import text
+
+from src.conf.dburl import config
+
+logger = logging.getLogger(__name__)
+
+
+class HealthChecker:
+    """
+        Фоновая проверка зависимостей для readiness-пробы.
+
+        Проверки базы данных, Redis и заполненности пула соединений выполняются фоновой задачей
+        раз в interval секунд; проба только читает последний результат, поэтому не занимает
+        соединение из пула и не обращается к Redis.
+
+        Attributes:
+        - interval (float): Период проверок в секундах.
+        - timeout (float): Таймаут каждой проверки в секундах.
+        - max_pool_saturation (float): Доля занятых соединений пула, начиная с которой экземпляр не готов.
+        - redis_required (bool): Считать недоступный Redis причиной неготовности.
+        - status (dict): Результат последней проверки.
+        - checked_at (float | None): Время последней проверки (time.monotonic) или None до первой проверки.
+        - draining (bool): Экземпляр останавливается (см. drain) и больше не считается готовым.
+        """
+
+    def __init__(self, interval: float, timeout: float, max_pool_saturation: float, redis_required: bool = True):
+        """
+                Parameters:
+                - interval: Период проверок в секундах.
+                - timeout: Таймаут каждой проверки в секундах.
+                - max_pool_saturation: Доля занятых соединений пула, начиная с которой экземпляр не готов.
+                - redis_required: Считать недоступный Redis причиной неготовности.
+                """
+        self.interval = interval
+        self.timeout = timeout
+        self.max_pool_saturation = max_pool_saturation
+        self.redis_required = redis_required
+        self.status = {'ready': False, 'checks': {}}
+        self.checked_at = None
+        self.draining = False
+        self.checks = 0
+        self._engine = None
+        self._redis = None
+        self._pool_stats = None
+        self._task = None
+
+    def init(self, engine: Callable, redis=None, pool_stats: Callable[[], dict] | None = None):
+        """
+                Подключает проверяемые зависимости.
+
+                Parameters:
+                - engine: Функция, возвращающая AsyncEngine основной базы (движок создается лениво).
+                - redis: Клиент redis.asyncio или None, если Redis не используется.
+                - pool_stats: Функция, возвращающая состояние пула (см. ManageSession.pool_stats).
+                """
+        self._engine = engine
+        self._redis = redis
+        self._pool_stats = pool_stats
+
+    async def _timed(self, check) -> dict:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+        except Exception as err:
+            return {'ok': False, 'latency_ms': (time.perf_counter() - started) * 1000,
+                    'error': f'{type(err).__name__}: {err}'[:200]}
+        return {'ok': True, 'latency_ms': (time.perf_counter() - started) * 1000}
+
+    async def _ping_database(self):
+        async with self._engine().connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    def check_pool(self) -> dict:
+        """
+                Проверяет заполненность пула соединений основной базы.
+
+                Returns:
+                - dict: ok, занятые соединения, емкость пула (pool_size + max_overflow) и доля занятых.
+                """
+        stats = self._pool_stats() if self._pool_stats is not None else {}
+        if 'size' not in stats:
+            return {'ok': True}
+        capacity = stats['size'] + max(stats['max_overflow'], 0)
+        saturation = stats['checked_out'] / capacity if capacity else 0.0
+        return {'ok': saturation < self.max_pool_saturation, 'checked_out': stats['checked_out'],
+                'capacity': capacity, 'saturation': saturation}
+
+    async def check(self) -> dict:
+        """
+                Выполняет все проверки одновременно и сохраняет результат.
+
+                Returns:
+                - dict: ready и результаты проверок database, redis и pool.
+                """
+        probes = [self._timed(self._ping_database)]
+        if self._redis is not None:
+            probes.append(self._timed(self._redis.ping))
+        results = await asyncio.gather(*probes)
+        checks = {'database': results[0],
+                  'redis': results[1] if self._redis is not None else {'ok': True, 'skipped': True},
+                  'pool': self.check_pool()}
+        ready = checks['database']['ok'] and checks['pool']['ok'] \
+            and (checks['redis']['ok'] or not self.redis_required)
+        if ready != self.status['ready'] and self.checked_at is not None:
+            logger.warning('readiness changed to %s: %s', ready, checks)
+        self.status = {'ready': ready, 'checks': checks}
+        self.checked_at = time.monotonic()
+        self.checks += 1
+        return self.status
+
+    def readiness(self) -> tuple[bool, dict]:
+        """
+                Возвращает последний результат проверки без обращения к зависимостям.
+
+                Результат старше трех интервалов считается устаревшим (фоновая задача остановилась
+                или цикл событий перегружен), и экземпляр считается неготовым.
+
+                Returns:
+                - tuple[bool, dict]: Готовность и тело ответа пробы.
+                """
+        if self.draining:
+            return False, {'ready': False, 'reason': 'draining'}
+        if self.checked_at is None:
+            return False, {'ready': False, 'reason': 'starting'}
+        age = time.monotonic() - self.checked_at
+        if age > 3 * self.interval:
+            return False, {'ready': False, 'reason': 'stale', 'age_seconds': age, 'checks': self.status['checks']}
+        return self.status['ready'], {**self.status, 'age_seconds': age}
+
+    def drain(self):
+        """Переводит экземпляр в состояние остановки: readiness-проба отвечает 503, пока идут начатые запросы."""
+        if not self.draining:
+            logger.warning('draining: readiness is false until shutdown')
+        self.draining = True
+
+    async def run(self):
+        """Повторяет проверки каждые interval секунд до отмены задачи."""
+        while True:
+            try:
+                await self.check()
+            except Exception:
+                logger.exception('health check failed')
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Запускает фоновую задачу проверок в текущем цикле событий."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Останавливает фоновую задачу."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """
+                Возвращает состояние проверок для метрик.
+
+                Returns:
+                - dict: ready (1/0), draining (1/0), количество выполненных проверок и возраст последнего
+                  результата в секундах.
+                """
+        ready, _ = self.readiness()
+        age = time.monotonic() - self.checked_at if self.checked_at is not None else -1
+        return {'ready': int(ready), 'draining': int(self.draining), 'checks': self.checks, 'age_seconds': age}
+
+
+health_checker = HealthChecker(config.HEALTH_CHECK_INTERVAL, config.HEALTH_CHECK_TIMEOUT,
+                               config.HEALTH_POOL_SATURATION, config.HEALTH_REDIS_REQUIRED)
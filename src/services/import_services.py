@@ -0,0 +1,190 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.dburl import config
+from src.contacts.models import User
+from src.repository import functiondb
+from src.schemas.checkschemas import CreateContactSchema
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+
+class ImportFormatError(ValueError):
+    """Ошибка формата входного потока, после которой импорт продолжать нельзя."""
+
+
+def detect_format(content_type: str | None) -> str | None:
+    """
+        Определяет формат импорта по заголовку Content-Type.
+
+        Parameters:
+        - content_type: Значение заголовка Content-Type.
+
+        Returns:
+        - str | None: 'csv', 'ndjson' или None, если формат определить не удалось.
+        """
+    if not content_type:
+        return None
+    return CONTENT_TYPES.get(content_type.split(';')[0].strip().lower())
+
+
+async def iter_lines(stream: AsyncIterator[bytes], max_line_bytes: int = config.IMPORT_MAX_LINE_BYTES):
+    """
+        Разбивает поток байтов на строки, не загружая весь поток в память.
+
+        Parameters:
+        - stream: Асинхронный итератор блоков байтов (например, request.stream()).
+        - max_line_bytes: Максимальная длина одной строки.
+
+        Yields:
+        - str: Очередная строка вместе с символом перевода строки.
+
+        Raises:
+        - ImportFormatError: Если поток не в UTF-8 или строка длиннее max_line_bytes.
+        """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    try:
+        async for chunk in stream:
+            buffer += decoder.decode(chunk)
+            lines = buffer.split('\n')
+            buffer = lines.pop()
+            for line in lines:
+                yield line + '\n'
+            if len(buffer) > max_line_bytes:
+                raise ImportFormatError('line is too long')
+        buffer += decoder.decode(b'', final=True)
+    except UnicodeDecodeError as err:
+        raise ImportFormatError('body must be UTF-8 encoded') from err
+    if buffer:
+        yield buffer
+
+
+async def iter_csv_records(lines: AsyncIterator[str]):
+    """
+        Читает CSV с заголовком построчно, поддерживая многострочные значения в кавычках.
+
+        Parameters:
+        - lines: Асинхронный итератор строк.
+
+        Yields:
+        - tuple[int, dict | None, str | None]: Номер записи, словарь полей и текст ошибки разбора.
+        """
+    header = None
+    record = ''
+    row = 0
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            if len(record) > config.IMPORT_MAX_LINE_BYTES:
+                raise ImportFormatError('quoted field is too long')
+            continue
+        text, record = record, ''
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as err:
+            row += 1
+            yield row, None, str(err)
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f'expected {len(header)} columns, got {len(values)}'
+            continue
+        yield row, {key: value if value != '' else None for key, value in zip(header, values)}, None
+    if record.strip():
+        yield row + 1, None, 'unterminated quoted field'
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]):
+    """
+        Читает NDJSON: один JSON-объект на строку.
+
+        Parameters:
+        - lines: Асинхронный итератор строк.
+
+        Yields:
+        - tuple[int, dict | None, str | None]: Номер записи, словарь полей и текст ошибки разбора.
+        """
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except ValueError as err:
+            yield row, None, f'invalid JSON: {err}'
+            continue
+        if not isinstance(data, dict):
+            yield row, None, 'expected a JSON object'
+            continue
+        yield row, data, None
+
+
+async def import_contacts(stream: AsyncIterator[bytes], fmt: str, db: AsyncSession, user: User,
+                          chunk_size: int = config.IMPORT_CHUNK_SIZE, max_errors: int = config.IMPORT_MAX_ERRORS):
+    """
+        Потоково импортирует контакты пользователя из CSV или NDJSON.
+
+        Записи проверяются схемой CreateContactSchema и записываются пачками по chunk_size
+        многострочными INSERT в одной транзакции, поэтому потребление памяти не зависит от размера файла.
+
+        Parameters:
+        - stream: Асинхронный итератор блоков байтов тела запроса.
+        - fmt: Формат потока ('csv' или 'ndjson').
+        - db: Сессия базы данных (тип AsyncSession).
+        - user: Пользователь, которому принадлежат контакты.
+        - chunk_size: Количество записей в одном INSERT.
+        - max_errors: Максимальное количество ошибок в отчете.
+
+        Returns:
+        - dict: Отчет с количеством импортированных и ошибочных записей и списком ошибок по строкам.
+        """
+    records = iter_csv_records(iter_lines(stream)) if fmt == 'csv' else iter_ndjson_records(iter_lines(stream))
+    report = {'imported': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+
+    def add_error(row: int, messages: list[str]):
+        report['failed'] += 1
+        if len(report['errors']) < max_errors:
+            report['errors'].append({'row': row, 'errors': messages})
+        else:
+            report['errors_truncated'] = True
+
+    chunk = []
+    async for row, data, error in records:
+        if error is not None:
+            add_error(row, [error])
+            continue
+        try:
+            contact = CreateContactSchema.model_validate(data)
+        except ValidationError as err:
+            add_error(row, [f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in err.errors()])
+            continue
+        chunk.append(contact.model_dump())
+        if len(chunk) >= chunk_size:
+            report['imported'] += await functiondb.create_contacts_bulk(chunk, db, user)
+            chunk = []
+    if chunk:
+        report['imported'] += await functiondb.create_contacts_bulk(chunk, db, user)
+    if report['imported']:
+        await functiondb.bump_contacts_version(db, user.id)
+    await db.commit()
+    return report
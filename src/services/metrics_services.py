@@ -0,0 +1,268 @@
+"""
+    Метрики приложения в текстовом формате Prometheus: задержки маршрутов, запросы в обработке,
+    коды ответов и SQL-запросы на один HTTP-запрос.
+"""
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Callable, Iterable
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """
+        Базовый класс метрики с метками.
+
+        Attributes:
+        - name (str): Имя метрики.
+        - help (str): Описание.
+        - labelnames (tuple[str, ...]): Имена меток.
+        """
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, object] = {}
+
+    def header(self) -> list[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self) -> list[str]:
+        return self.header() + [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+                                for labels, value in self.values.items()]
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик."""
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels):
+        """Устанавливает значение из внешнего монотонного счетчика (например, статистики пула)."""
+        self.values[labels] = value
+
+
+class Gauge(Metric):
+    """Значение, которое может увеличиваться и уменьшаться."""
+    kind = 'gauge'
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+        Гистограмма с фиксированными корзинами.
+
+        Attributes:
+        - buckets (tuple[float, ...]): Верхние границы корзин.
+        """
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket in zip([*map(_number, self.buckets), '+Inf'], counts):
+                cumulative += bucket
+                le = 'le="' + bound + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Registry:
+    """
+        Набор метрик и функций, которые обновляют метрики перед выдачей (например, состояние пула).
+        """
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Добавляет функцию, вызываемую перед каждой выдачей метрик."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """
+                Возвращает все метрики в текстовом формате Prometheus 0.0.4.
+
+                Returns:
+                - str: Текст для ответа /metrics.
+                """
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    'http_requests_total', 'HTTP requests by route, method and status code.', ('method', 'route', 'status')))
+http_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route.', ('method', 'route')))
+http_in_flight = registry.register(Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being processed.'))
+http_db_queries = registry.register(Histogram(
+    'http_request_db_queries', 'SQL statements executed per HTTP request.', ('method', 'route'), COUNT_BUCKETS))
+http_db_duration = registry.register(Histogram(
+    'http_request_db_seconds', 'Time spent in SQL per HTTP request.', ('method', 'route')))
+db_queries = registry.register(Counter(
+    'db_queries_total', 'SQL statements executed.'))
+db_query_duration = registry.register(Histogram(
+    'db_query_duration_seconds', 'SQL statement latency.', (), QUERY_BUCKETS))
+
+
+
+def expose_stats(prefix: str, help: str, source: Callable[[], dict], gauges: Iterable[str] = (),
+                 counters: Iterable[str] = ()):
+    """
+        Публикует числовые поля словаря статистики (например, pool_stats) как метрики.
+        Словарь запрашивается при каждой выдаче метрик.
+
+        Текущие значения (размер, занятость) публикуются как gauge <prefix>_<key>, монотонно растущие
+        счетчики - как counter <prefix>_<key>_total, чтобы rate() и increase() учитывали сброс
+        счетчиков при перезапуске процесса.
+
+        Parameters:
+        - prefix: Префикс имен метрик.
+        - help: Описание источника.
+        - source: Функция, возвращающая словарь статистики.
+        - gauges: Поля словаря с текущими значениями.
+        - counters: Поля словаря с монотонно растущими счетчиками.
+        """
+    metrics = {key: registry.register(Gauge(f'{prefix}_{key}', f'{help}: {key}.')) for key in gauges}
+    metrics.update({key: registry.register(Counter(f'{prefix}_{key}_total', f'{help}: {key}.')) for key in counters})
+
+    def collect():
+        stats = source()
+        for key, metric in metrics.items():
+            value = stats.get(key)
+            if isinstance(value, (int, float)):
+                metric.set(value)
+
+    registry.add_collector(collect)
+
+
+# [количество запросов, суммарное время] SQL в текущем HTTP-запросе
+request_db_stats: ContextVar[list | None] = ContextVar('request_db_stats', default=None)
+
+
+def record_query(seconds: float):
+    """
+        Учитывает выполненный SQL-запрос в общих метриках и в метриках текущего HTTP-запроса.
+
+        Parameters:
+        - seconds: Длительность запроса.
+        """
+    db_queries.inc()
+    db_query_duration.observe(seconds)
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += seconds
+
+
+class MetricsMiddleware:
+    """
+        ASGI middleware, которое измеряет длительность запросов, считает коды ответов и SQL-запросы.
+
+        Метка route - шаблон пути маршрута (/contacts/{contact_id}), поэтому количество рядов
+        не зависит от идентификаторов в URL. В ответ добавляется заголовок Server-Timing
+        с временем в SQL и общим временем обработки.
+
+        Attributes:
+        - exclude (set[str]): Пути, для которых метрики не собираются.
+        - enabled (Callable[[], bool]): Проверяется на каждом запросе; False - запрос проходит без измерений.
+        """
+
+    def __init__(self, app, exclude: Iterable[str] = ('/metrics',), enabled: Callable[[], bool] = lambda: True):
+        self.app = app
+        self.exclude = set(exclude)
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude or not self.enabled():
+            await self.app(scope, receive, send)
+            return
+        db_stats = [0, 0.0]
+        token = request_db_stats.set(db_stats)
+        started = time.perf_counter()
+        status_code = 500
+        http_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                elapsed = time.perf_counter() - started
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing',
+                                f'db;dur={db_stats[1] * 1000:.2f}, app;dur={elapsed * 1000:.2f}'.encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            request_db_stats.reset(token)
+            route = scope.get('route')
+            path = getattr(route, 'path', UNMATCHED_ROUTE)
+            method = scope['method']
+            http_requests.inc(method, path, str(status_code))
+            http_duration.observe(elapsed, method, path)
+            http_db_queries.observe(db_stats[0], method, path)
+            http_db_duration.observe(db_stats[1], method, path)
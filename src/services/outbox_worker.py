@@ -0,0 +1,327 @@
+"""
+    Воркер отправки писем из outbox.
+
+    Запускается отдельным процессом, независимо от веб-воркеров:
+    python -m src.services.outbox_worker
+"""
+import asyncio
+import logging
+import random
+import signal
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import aiosmtplib
+
+from src.conf.dburl import config
+from src.repository import functionoutbox
+from src.services.email_services import build_message
+
+logger = logging.getLogger(__name__)
+
+# Ошибки соединения, после которых нет смысла отправлять остаток пачки по тому же соединению
+CONNECTION_ERRORS = (aiosmtplib.SMTPConnectError, aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError,
+                     OSError)
+
+NOT_ATTEMPTED = object()
+
+# Период удаления старых писем из outbox в секундах
+PURGE_INTERVAL = 3600.0
+
+
+class SMTPConnection:
+    """
+        Переиспользуемое SMTP-соединение: подключается при первой отправке и
+        переподключается, если сервер закрыл соединение.
+
+        Attributes:
+        - connects (int): Количество установленных подключений.
+        """
+
+    def __init__(self, hostname: str, port: int, username: str | None = None, password: str | None = None,
+                 use_tls: bool = False, start_tls: bool = False, timeout: float = 30.0):
+        """
+                Parameters:
+                - hostname: Адрес SMTP-сервера.
+                - port: Порт SMTP-сервера.
+                - username: Имя пользователя (None - без авторизации).
+                - password: Пароль.
+                - use_tls: Подключаться по TLS.
+                - start_tls: Переходить на TLS командой STARTTLS.
+                - timeout: Таймаут операций в секундах.
+                """
+        self._options = dict(hostname=hostname, port=port, username=username, password=password,
+                             use_tls=use_tls, start_tls=start_tls, timeout=timeout)
+        self._client: aiosmtplib.SMTP | None = None
+        self.connects = 0
+
+    async def _connect(self):
+        await self.close()
+        self._client = aiosmtplib.SMTP(**self._options)
+        await self._client.connect()
+        self.connects += 1
+
+    async def send(self, message: EmailMessage):
+        """
+                Отправляет письмо по открытому соединению.
+
+                Parameters:
+                - message: Письмо.
+
+                Raises:
+                - aiosmtplib.SMTPException: Если сервер отклонил письмо или недоступен.
+                """
+        if self._client is None or not self._client.is_connected:
+            await self._connect()
+        try:
+            await self._client.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # Сервер закрыл простаивающее соединение - одна повторная попытка по новому
+            await self._connect()
+            await self._client.send_message(message)
+
+    async def close(self):
+        """Закрывает соединение, если оно открыто."""
+        client, self._client = self._client, None
+        if client is not None and client.is_connected:
+            try:
+                await client.quit()
+            except aiosmtplib.SMTPException:
+                client.close()
+
+
+def is_permanent(err: Exception) -> bool:
+    """
+        Проверяет, является ли ошибка отправки окончательной (код 5xx), после которой повторять бессмысленно.
+
+        Parameters:
+        - err: Ошибка отправки.
+
+        Returns:
+        - bool: True для ответов 5xx, False для временных ошибок и ошибок соединения.
+        """
+    if isinstance(err, aiosmtplib.SMTPRecipientsRefused):
+        return all(recipient.code >= 500 for recipient in err.recipients)
+    return isinstance(err, aiosmtplib.SMTPResponseException) and err.code >= 500
+
+
+def backoff(attempts: int, base: float, maximum: float) -> float:
+    """
+        Возвращает задержку перед следующей попыткой: экспонента с половинным джиттером.
+
+        Parameters:
+        - attempts: Количество сделанных попыток.
+        - base: Задержка после первой попытки в секундах.
+        - maximum: Максимальная задержка в секундах.
+
+        Returns:
+        - float: Задержка в секундах.
+        """
+    delay = min(base * 2 ** (attempts - 1), maximum)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class OutboxWorker:
+    """
+        Отправляет письма из outbox пачками по нескольким переиспользуемым SMTP-соединениям.
+
+        Attributes:
+        - sent (int): Количество отправленных писем.
+        - retried (int): Количество писем, отложенных для повторной попытки.
+        - failed (int): Количество писем, отправка которых окончательно не удалась.
+        - batches (int): Количество обработанных пачек.
+        - busy_seconds (float): Суммарное время обработки пачек.
+        - purged (int): Количество писем, удаленных по сроку хранения.
+        """
+
+    def __init__(self, session_factory, connections: list[SMTPConnection], batch_size: int = config.OUTBOX_BATCH_SIZE,
+                 max_attempts: int = config.OUTBOX_MAX_ATTEMPTS, backoff_base: float = config.OUTBOX_BACKOFF_BASE,
+                 backoff_max: float = config.OUTBOX_BACKOFF_MAX, poll_interval: float = config.OUTBOX_POLL_INTERVAL,
+                 lease: float = config.OUTBOX_LEASE, retention: float = config.OUTBOX_RETENTION):
+        """
+                Parameters:
+                - session_factory: Функция без аргументов, возвращающая асинхронный контекстный менеджер сессии.
+                - connections: SMTP-соединения, по которым распределяются письма пачки.
+                - batch_size: Количество писем в пачке.
+                - max_attempts: Количество попыток до статуса 'failed'.
+                - backoff_base: Задержка перед первой повторной попыткой в секундах.
+                - backoff_max: Максимальная задержка между попытками в секундах.
+                - poll_interval: Пауза между опросами пустой очереди в секундах.
+                - lease: Время аренды пачки в секундах.
+                - retention: Срок хранения отправленных и недоставленных писем в секундах.
+                """
+        self.session_factory = session_factory
+        self.connections = connections
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.retention = retention
+        self.sent = self.retried = self.failed = self.batches = self.purged = 0
+        self.busy_seconds = 0.0
+
+    async def _deliver(self, connection: SMTPConnection, queue: list, results: dict):
+        while queue:
+            row = queue.pop()
+            try:
+                message = build_message(row['recipient'], row['subject'], row['template_name'], row['template_body'])
+                await connection.send(message)
+                results[row['id']] = None
+            except Exception as err:
+                results[row['id']] = err
+                if isinstance(err, CONNECTION_ERRORS):
+                    # Сервер недоступен: остаток пачки достанется другим соединениям
+                    await connection.close()
+                    return
+
+    def _result(self, row, err, now: datetime) -> dict:
+        if err is NOT_ATTEMPTED:
+            # Письмо не пытались отправить (все соединения недоступны): попытка не засчитывается,
+            # но письмо откладывается на backoff_base, чтобы не забирать его снова сразу же
+            return {'id': row['id'], 'status': 'pending', 'attempts': row['attempts'],
+                    'next_attempt_at': now + timedelta(seconds=self.backoff_base), 'last_error': None,
+                    'sent_at': None}
+        attempts = row['attempts'] + 1
+        if err is None:
+            self.sent += 1
+            return {'id': row['id'], 'status': 'sent', 'attempts': attempts, 'next_attempt_at': now,
+                    'last_error': None, 'sent_at': now}
+        error = f'{type(err).__name__}: {err}'[:500]
+        if is_permanent(err) or attempts >= self.max_attempts:
+            self.failed += 1
+            logger.warning('outbox: message %s failed after %s attempts: %s', row['id'], attempts, error)
+            return {'id': row['id'], 'status': 'failed', 'attempts': attempts, 'next_attempt_at': now,
+                    'last_error': error, 'sent_at': None}
+        self.retried += 1
+        delay = backoff(attempts, self.backoff_base, self.backoff_max)
+        return {'id': row['id'], 'status': 'pending', 'attempts': attempts,
+                'next_attempt_at': now + timedelta(seconds=delay), 'last_error': error, 'sent_at': None}
+
+    async def run_once(self) -> int:
+        """
+                Забирает и отправляет одну пачку писем.
+
+                Returns:
+                - int: Количество обработанных писем (0 - очередь пуста).
+                """
+        async with self.session_factory() as db:
+            rows = await functionoutbox.claim_batch(self.batch_size, self.lease, db)
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        queue, results = list(reversed(rows)), {}
+        await asyncio.gather(*(self._deliver(connection, queue, results) for connection in self.connections))
+        now = datetime.utcnow()
+        updates = [self._result(row, results.get(row['id'], NOT_ATTEMPTED), now) for row in rows]
+        async with self.session_factory() as db:
+            await functionoutbox.complete_batch(updates, db)
+        self.batches += 1
+        self.busy_seconds += time.perf_counter() - started
+        return len(rows)
+
+    async def purge(self) -> int:
+        """
+                Удаляет из outbox отправленные и недоставленные письма старше retention.
+
+                Returns:
+                - int: Количество удаленных писем.
+                """
+        async with self.session_factory() as db:
+            purged = await functionoutbox.purge_outbox(self.retention, db)
+        self.purged += purged
+        return purged
+
+    async def run(self, stop: asyncio.Event, report_interval: float = 60.0):
+        """
+                Обрабатывает очередь, пока не установлен stop.
+
+                Если в пачке не отправлено ни одного письма (очередь пуста или SMTP-сервер недоступен),
+                следующая пачка забирается через poll_interval.
+
+                Parameters:
+                - stop: Событие остановки.
+                - report_interval: Период записи статистики в лог в секундах.
+                """
+        last_report = time.monotonic()
+        last_purge = None
+        try:
+            while not stop.is_set():
+                if last_purge is None or time.monotonic() - last_purge >= PURGE_INTERVAL:
+                    last_purge = time.monotonic()
+                    try:
+                        await self.purge()
+                    except Exception:
+                        logger.exception('outbox: purge failed')
+                sent = self.sent
+                try:
+                    await self.run_once()
+                except Exception:
+                    logger.exception('outbox: batch failed')
+                if time.monotonic() - last_report >= report_interval:
+                    logger.info('outbox: %s', self.stats())
+                    last_report = time.monotonic()
+                if self.sent == sent:
+                    try:
+                        await asyncio.wait_for(stop.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Закрывает SMTP-соединения."""
+        for connection in self.connections:
+            await connection.close()
+
+    def stats(self) -> dict:
+        """
+                Возвращает статистику воркера.
+
+                Returns:
+                - dict: Отправленные, отложенные, неудачные и удаленные письма, количество пачек и подключений,
+                  пропускная способность в письмах в секунду.
+                """
+        return {
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'batches': self.batches,
+            'purged': self.purged,
+            'smtp_connects': sum(connection.connects for connection in self.connections),
+            'busy_seconds': self.busy_seconds,
+            'messages_per_second': self.sent / self.busy_seconds if self.busy_seconds else 0.0,
+        }
+
+
+def smtp_connections(count: int = config.OUTBOX_CONNECTIONS) -> list[SMTPConnection]:
+    """
+        Создает SMTP-соединения по настройкам MAIL_*.
+
+        Parameters:
+        - count: Количество соединений.
+
+        Returns:
+        - list[SMTPConnection]: Неподключенные соединения.
+        """
+    return [SMTPConnection(config.MAIL_SERVER, config.MAIL_PORT, config.MAIL_USERNAME, config.MAIL_PASSWORD,
+                           use_tls=config.MAIL_SSL_TLS, start_tls=config.MAIL_STARTTLS) for _ in range(count)]
+
+
+async def main():
+    from src.db.connectdb import session_manage
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    worker = OutboxWorker(session_manage.session, smtp_connections())
+    await worker.run(stop)
+    logger.info('outbox: stopped %s', worker.stats())
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,254 @@
+import logging
+import math
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+from jose import JWTError
+from redis.exceptions import RedisError
+
+from src.conf.dburl import config
+from src.services.auth_services import auth_service
+
+logger = logging.getLogger(__name__)
+
+# Скользящее окно в sorted set: одна команда EVALSHA на запрос, время берется из Redis,
+# поэтому расхождение часов между воркерами не влияет на лимит.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) < limit then
+    redis.call('ZADD', key, now, ARGV[3])
+    redis.call('PEXPIRE', key, window)
+    return 0
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+return math.max(1, tonumber(oldest[2]) + window - now)
+"""
+
+
+class TokenBuckets:
+    """
+        Token bucket в памяти процесса с ограничением количества ключей (LRU).
+
+        Attributes:
+        - max_keys (int): Максимальное количество хранимых корзин.
+        """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def acquire(self, key: str, capacity: int, period_ms: int) -> int:
+        """
+                Забирает токен из корзины.
+
+                Parameters:
+                - key: Ключ корзины.
+                - capacity: Емкость корзины (количество запросов за период).
+                - period_ms: Период полного пополнения корзины в миллисекундах.
+
+                Returns:
+                - int: 0, если запрос разрешен, иначе время до появления токена в миллисекундах.
+                """
+        now = time.monotonic() * 1000
+        rate = capacity / period_ms
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            retry_after = 0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = math.ceil((1 - tokens) / rate)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        """Удаляет все корзины."""
+        self._buckets.clear()
+
+
+class RateLimitBackend:
+    """
+        Проверка лимитов в Redis (скользящее окно, один round trip) или в памяти процесса.
+
+        В режиме 'redis' отказ кэшируется в процессе до истечения Retry-After, поэтому
+        повторные запросы превысившего лимит клиента не обращаются к Redis. Если Redis
+        недоступен, лимиты проверяются локальными token bucket, а Redis не опрашивается
+        в течение retry_after секунд.
+
+        Attributes:
+        - mode (str): 'redis' или 'local'.
+        - redis: Клиент redis.asyncio или None, пока не вызван init.
+        - local_checks (int): Количество проверок в памяти процесса.
+        - redis_checks (int): Количество обращений к Redis.
+        - cached_denials (int): Количество отказов из локального кэша без обращения к Redis.
+        - redis_errors (int): Количество ошибок Redis.
+        """
+
+    def __init__(self, mode: str, max_keys: int, retry_after: float, prefix: str = 'ratelimit'):
+        """
+                Parameters:
+                - mode: 'redis' или 'local'.
+                - max_keys: Максимальное количество ключей в памяти процесса.
+                - retry_after: Пауза перед повторным обращением к Redis после ошибки в секундах.
+                - prefix: Префикс ключей в Redis.
+                """
+        self.mode = mode
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self.redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self._denied: OrderedDict[str, float] = OrderedDict()
+        self.max_keys = max_keys
+        self.buckets = TokenBuckets(max_keys)
+        self.local_checks = self.redis_checks = self.cached_denials = self.redis_errors = 0
+
+    def init(self, redis):
+        """
+                Подключает клиент Redis.
+
+                Parameters:
+                - redis: Клиент redis.asyncio.
+                """
+        self.redis = redis
+        self._script = redis.register_script(SLIDING_WINDOW_LUA)
+        self._redis_down_until = 0.0
+
+    def reset(self):
+        """Сбрасывает локальное состояние и счетчики."""
+        self.buckets.clear()
+        self._denied.clear()
+        self._redis_down_until = 0.0
+        self.local_checks = self.redis_checks = self.cached_denials = self.redis_errors = 0
+
+    def _cached_denial(self, key: str, now: float) -> int:
+        until = self._denied.get(key)
+        if until is None:
+            return 0
+        if until <= now:
+            del self._denied[key]
+            return 0
+        return math.ceil((until - now) * 1000)
+
+    def _remember_denial(self, key: str, retry_after_ms: int, now: float):
+        self._denied[key] = now + retry_after_ms / 1000
+        self._denied.move_to_end(key)
+        while len(self._denied) > self.max_keys:
+            self._denied.popitem(last=False)
+
+    async def hit(self, key: str, times: int, period_ms: int) -> int:
+        """
+                Учитывает запрос и проверяет лимит.
+
+                Parameters:
+                - key: Ключ лимита.
+                - times: Количество запросов за период.
+                - period_ms: Период в миллисекундах.
+
+                Returns:
+                - int: 0, если запрос разрешен, иначе время до следующей попытки в миллисекундах.
+                """
+        now = time.monotonic()
+        if self.mode != 'redis' or self._script is None or now < self._redis_down_until:
+            self.local_checks += 1
+            return self.buckets.acquire(key, times, period_ms)
+        denied = self._cached_denial(key, now)
+        if denied:
+            self.cached_denials += 1
+            return denied
+        try:
+            self.redis_checks += 1
+            retry_after = int(await self._script(keys=[f'{self.prefix}:{key}'],
+                                                 args=[times, period_ms, uuid.uuid4().hex]))
+        except (RedisError, OSError) as err:
+            self.redis_errors += 1
+            self._redis_down_until = now + self.retry_after
+            logger.warning('rate limit: Redis unavailable, using local buckets for %ss: %s', self.retry_after, err)
+            self.local_checks += 1
+            return self.buckets.acquire(key, times, period_ms)
+        if retry_after:
+            self._remember_denial(key, retry_after, now)
+        return retry_after
+
+    def stats(self) -> dict:
+        """
+                Возвращает статистику лимитера.
+
+                Returns:
+                - dict: Режим, доступность Redis, количество проверок в Redis и в памяти, отказов из кэша и ошибок.
+                """
+        return {
+            'mode': self.mode,
+            'redis_available': self._script is not None and time.monotonic() >= self._redis_down_until,
+            'redis_checks': self.redis_checks,
+            'local_checks': self.local_checks,
+            'cached_denials': self.cached_denials,
+            'redis_errors': self.redis_errors,
+        }
+
+
+rate_limit_backend = RateLimitBackend(config.RATE_LIMIT_BACKEND, config.RATE_LIMIT_MAX_KEYS,
+                                      config.RATE_LIMIT_REDIS_RETRY)
+
+
+def client_identifier(request: Request) -> str:
+    """
+        Возвращает идентификатор клиента для лимита: subject access-токена или IP-адрес.
+
+        Токен проверяется через auth_service.decode_access_token, то есть обычно берется из кэша.
+
+        Parameters:
+        - request: Объект запроса.
+
+        Returns:
+        - str: 'user:<email>' для аутентифицированного запроса, иначе 'ip:<адрес>'.
+        """
+    authorization = request.headers.get('authorization', '')
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        try:
+            payload = auth_service.decode_access_token(token)
+            if payload.get('scope') == 'access_token' and payload.get('sub'):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    forwarded = request.headers.get('x-forwarded-for')
+    return f"ip:{forwarded.split(',')[0].strip() if forwarded else request.client.host}"
+
+
+class RateLimiter:
+    """
+        Зависимость FastAPI, ограничивающая количество запросов к маршруту для одного пользователя.
+        Ничего не проверяет, если выключен RATE_LIMIT_ENABLED.
+
+        Attributes:
+        - times (int): Количество запросов за период.
+        - milliseconds (int): Период в миллисекундах.
+        """
+
+    def __init__(self, times: int = 1, milliseconds: int = 0, seconds: int = 0, minutes: int = 0, hours: int = 0,
+                 backend: RateLimitBackend = rate_limit_backend):
+        self.times = times
+        self.milliseconds = milliseconds + 1000 * seconds + 60000 * minutes + 3600000 * hours
+        self.backend = backend
+
+    async def __call__(self, request: Request):
+        if not config.RATE_LIMIT_ENABLED:
+            return
+        route = request.scope.get('route')
+        path = route.path if route is not None else request.url.path
+        key = f'{client_identifier(request)}:{request.method}:{path}'
+        retry_after = await self.backend.hit(key, self.times, self.milliseconds)
+        if retry_after:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail='Too Many Requests',
+                                headers={'Retry-After': str(math.ceil(retry_after / 1000))})
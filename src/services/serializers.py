@@ -0,0 +1,143 @@
+import json
+from datetime import date
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+
+from src.conf.dburl import config
+from src.contacts.models import User
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class UserOut(BaseModel):
+    """
+        Схема ответа UserResponse для сериализации.
+
+        Email хранится в базе уже проверенным, поэтому здесь это обычная строка: проверка EmailStr
+        для каждого вложенного пользователя занимает большую часть времени сериализации страницы.
+        """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    email: str
+
+
+class ContactOut(BaseModel):
+    """Схема ответа CreateContact для сериализации (с UserOut вместо UserResponse)."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    surname: str
+    phone: str
+    email: str
+    birthday: date
+    information: str
+    user: UserOut | None
+
+
+contact_list = TypeAdapter(list[ContactOut])
+contact_item = TypeAdapter(ContactOut)
+user_response = TypeAdapter(UserOut)
+
+
+def user_to_dict(user: User) -> dict:
+    """
+        Сериализует пользователя в словарь с полями схемы UserResponse.
+
+        Parameters:
+        - user: Пользователь (тип User).
+
+        Returns:
+        - dict: Поля id, username и email.
+        """
+    return {'id': user.id, 'username': user.username, 'email': user.email}
+
+
+def contact_rows_to_dicts(rows, user: User) -> list[dict]:
+    """
+        Сериализует строки проекции контактов в JSON-совместимые словари схемы CreateContact.
+
+        Все строки принадлежат текущему пользователю, поэтому поле user заполняется
+        один раз из него, без JOIN с таблицей users и без повторной валидации pydantic.
+
+        Parameters:
+        - rows: Строки с полями контакта (RowMapping).
+        - user: Текущий пользователь (тип User).
+
+        Returns:
+        - list[dict]: Словари, готовые к передаче в JSONResponse.
+        """
+    owner = user_to_dict(user)
+    return [{'id': row['id'], 'name': row['name'], 'surname': row['surname'], 'phone': row['phone'],
+             'email': row['email'], 'birthday': row['birthday'].isoformat(), 'information': row['information'],
+             'user': owner} for row in rows]
+
+
+def dumps(data) -> bytes:
+    """
+        Сериализует JSON-совместимые данные в байты.
+
+        При JSON_FAST_PATH используется orjson, иначе json с теми же параметрами, что и у JSONResponse,
+        поэтому тело ответа (и ETag) не зависит от режима.
+
+        Parameters:
+        - data: JSON-совместимые данные.
+
+        Returns:
+        - bytes: JSON в UTF-8.
+        """
+    if config.JSON_FAST_PATH:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(data, status_code: int = 200) -> Response:
+    """
+        Создает JSON-ответ из готовых JSON-совместимых данных без повторной проверки через response_model.
+
+        Parameters:
+        - data: JSON-совместимые данные.
+        - status_code: Код ответа.
+
+        Returns:
+        - Response: Ответ с media type application/json.
+        """
+    return Response(dumps(data), status_code=status_code, media_type='application/json')
+
+
+def default_response_class() -> type[JSONResponse]:
+    """
+        Возвращает класс ответа по умолчанию для приложения.
+
+        Returns:
+        - type[JSONResponse]: ORJSONResponse при JSON_FAST_PATH, иначе JSONResponse.
+        """
+    return ORJSONResponse if config.JSON_FAST_PATH else JSONResponse
+
+
+def model_response(adapter: TypeAdapter, obj, status_code: int = 200):
+    """
+        Сериализует ORM-объекты через заранее построенный TypeAdapter прямо в байты.
+
+        При JSON_FAST_PATH проверка по схеме и сериализация выполняются pydantic-core за один проход,
+        без jsonable_encoder; иначе объект возвращается как есть и обрабатывается response_model маршрута.
+
+        Parameters:
+        - adapter: TypeAdapter схемы ответа (contact_list, contact_item, user_response).
+        - obj: ORM-объект или список объектов.
+        - status_code: Код ответа.
+
+        Returns:
+        - Response | Any: Готовый JSON-ответ или исходный объект.
+        """
+    if not config.JSON_FAST_PATH:
+        return obj
+    body = adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+    return Response(body, status_code=status_code, media_type='application/json')
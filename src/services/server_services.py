@@ -0,0 +1,112 @@
+import asyncio
+import importlib.util
+import logging
+import math
+import os
+import signal
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+CGROUP_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+
+
+def available_cpus(cpu_max: str = CGROUP_CPU_MAX) -> int:
+    """
+        Возвращает количество CPU, доступных процессу.
+
+        Учитываются привязка процесса к ядрам (sched_getaffinity) и квота cgroup v2: в контейнере,
+        запущенном с --cpus=2 на 32-ядерной машине, os.cpu_count() вернет 32, а доступно 2 ядра.
+
+        Parameters:
+        - cpu_max: Путь к файлу cpu.max cgroup v2 ('<квота> <период>' или 'max <период>').
+
+        Returns:
+        - int: Количество CPU (не меньше 1).
+        """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open(cpu_max) as file:
+            quota, period = file.read().split()[:2]
+        if quota != 'max':
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+def worker_count(configured: int) -> int:
+    """
+        Возвращает количество процессов-воркеров сервера.
+
+        Каждый воркер держит собственный пул соединений, поэтому к базе данных открывается до
+        workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) соединений.
+
+        Parameters:
+        - configured: Заданное количество воркеров (0 - по количеству доступных CPU).
+
+        Returns:
+        - int: Количество воркеров.
+        """
+    return configured if configured > 0 else available_cpus()
+
+
+def pick_implementation(configured: str, fast: str, fallback: str) -> str:
+    """
+        Выбирает реализацию цикла событий или парсера HTTP для uvicorn.
+
+        Parameters:
+        - configured: Значение из настроек ('auto' или имя реализации).
+        - fast: Быстрая реализация на C (uvloop, httptools), выбираемая при 'auto', если она установлена.
+        - fallback: Реализация на чистом Python (asyncio, h11).
+
+        Returns:
+        - str: Имя реализации.
+        """
+    if configured != 'auto':
+        return configured
+    return fast if importlib.util.find_spec(fast) is not None else fallback
+
+
+def install_drain_handler(seconds: float, on_drain: Callable[[], None]) -> bool:
+    """
+        Откладывает остановку сервера по SIGTERM на seconds секунд.
+
+        При первом SIGTERM вызывается on_drain (readiness-проба начинает отвечать 503), сервер
+        продолжает принимать запросы, пока балансировщик не исключит экземпляр, и через seconds
+        секунд вызывается прежний обработчик SIGTERM (uvicorn), который перестает принимать
+        соединения и ждет завершения начатых запросов. Повторный SIGTERM останавливает сервер сразу.
+
+        Вызывается из lifespan приложения: к этому моменту uvicorn уже установил свой обработчик.
+
+        Parameters:
+        - seconds: Длительность вывода из балансировки в секундах (0 - не откладывать остановку).
+        - on_drain: Функция, вызываемая при получении SIGTERM.
+
+        Returns:
+        - bool: True, если обработчик установлен (нужны главный поток и прежний обработчик-функция).
+        """
+    if seconds <= 0 or threading.current_thread() is not threading.main_thread():
+        return False
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return False
+    loop = asyncio.get_running_loop()
+    draining = False
+
+    def handler(sig, frame):
+        nonlocal draining
+        if draining:
+            previous(sig, frame)
+            return
+        draining = True
+        logger.warning('SIGTERM received, draining for %.1f seconds before shutdown', seconds)
+        on_drain()
+        loop.call_soon_threadsafe(loop.call_later, seconds, previous, sig, None)
+
+    signal.signal(signal.SIGTERM, handler)
+    return True
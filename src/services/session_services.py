@@ -0,0 +1,289 @@
+import logging
+import time
+import uuid
+
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+
+from src.conf.dburl import config
+
+logger = logging.getLogger(__name__)
+
+# Ротация refresh-токена: jti в сессии сравнивается и заменяется атомарно. Если предъявлен
+# уже использованный токен (jti не совпадает), сессия удаляется - токен, вероятно, украден.
+ROTATE_LUA = """
+local current = redis.call('HGET', KEYS[1], 'jti')
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return -1
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2], 'rotated_at', ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+# Отзыв сессии по действующему refresh-токену: уже замененный токен (jti не совпадает) сессию не отзывает.
+REVOKE_LUA = """
+local current = redis.call('HGET', KEYS[1], 'jti')
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    return -1
+end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[2])
+return 1
+"""
+
+
+class SessionStoreUnavailable(Exception):
+    """Хранилище сессий (Redis) недоступно."""
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class SessionStore:
+    """
+        Сессии refresh-токенов в Redis: несколько устройств на пользователя, TTL средствами Redis,
+        ротация токена при обновлении и отзыв сессии одной командой DEL.
+
+        Сессия - hash session:<sid> с полями email, jti (идентификатор действующего refresh-токена),
+        device и created_at. Идентификаторы сессий пользователя хранятся в set sessions:<email>,
+        чтобы показать список устройств и завершить все сессии.
+
+        Attributes:
+        - ttl (int): Время жизни сессии в секундах (продлевается при ротации).
+        - created (int): Количество созданных сессий.
+        - rotated (int): Количество ротаций refresh-токена.
+        - reuse_detected (int): Количество предъявлений уже использованного refresh-токена.
+        - revoked (int): Количество отозванных сессий.
+        """
+
+    def __init__(self, ttl: int, prefix: str = 'session'):
+        """
+                Parameters:
+                - ttl: Время жизни сессии в секундах.
+                - prefix: Префикс ключей в Redis.
+                """
+        self.ttl = ttl
+        self.prefix = prefix
+        self.redis = None
+        self._rotate = self._revoke = None
+        self.created = self.rotated = self.reuse_detected = self.revoked = 0
+
+    def init(self, redis):
+        """
+                Подключает клиент Redis.
+
+                Parameters:
+                - redis: Клиент redis.asyncio (в тестах - fakeredis.FakeAsyncRedis).
+                """
+        self.redis = redis
+        self._rotate = redis.register_script(ROTATE_LUA)
+        self._revoke = redis.register_script(REVOKE_LUA)
+
+    def _session_key(self, sid: str) -> str:
+        return f'{self.prefix}:{sid}'
+
+    def _user_key(self, email: str) -> str:
+        return f'{self.prefix}s:{email}'
+
+    def _client(self):
+        if self.redis is None:
+            raise SessionStoreUnavailable('session store is not initialized')
+        return self.redis
+
+    async def create(self, email: str, device: str = '') -> tuple[str, str]:
+        """
+                Создает сессию одной транзакцией MULTI/EXEC.
+
+                Parameters:
+                - email: Email пользователя.
+                - device: Описание устройства (например, User-Agent).
+
+                Returns:
+                - tuple[str, str]: Идентификатор сессии (sid) и идентификатор refresh-токена (jti).
+
+                Raises:
+                - SessionStoreUnavailable: Если Redis недоступен.
+                """
+        sid, jti = uuid.uuid4().hex, uuid.uuid4().hex
+        try:
+            async with self._client().pipeline(transaction=True) as pipe:
+                pipe.hset(self._session_key(sid), mapping={'email': email, 'jti': jti, 'device': device[:200],
+                                                           'created_at': int(time.time())})
+                pipe.expire(self._session_key(sid), self.ttl)
+                pipe.sadd(self._user_key(email), sid)
+                pipe.expire(self._user_key(email), self.ttl)
+                await pipe.execute()
+        except (RedisError, OSError) as err:
+            raise SessionStoreUnavailable(str(err)) from err
+        self.created += 1
+        return sid, jti
+
+    async def rotate(self, sid: str, jti: str, email: str) -> str | None:
+        """
+                Заменяет refresh-токен сессии.
+
+                Parameters:
+                - sid: Идентификатор сессии.
+                - jti: Идентификатор предъявленного refresh-токена.
+                - email: Email пользователя (продлевается срок жизни списка сессий).
+
+                Returns:
+                - str | None: Новый jti или None, если сессии нет или токен уже использовался
+                  (в этом случае сессия отзывается).
+
+                Raises:
+                - SessionStoreUnavailable: Если Redis недоступен.
+                """
+        new_jti = uuid.uuid4().hex
+        self._client()
+        try:
+            result = int(await self._rotate(keys=[self._session_key(sid)],
+                                            args=[jti, new_jti, self.ttl * 1000, int(time.time())]))
+            if result == 1:
+                await self.redis.expire(self._user_key(email), self.ttl)
+        except (RedisError, OSError) as err:
+            raise SessionStoreUnavailable(str(err)) from err
+        if result == -1:
+            self.reuse_detected += 1
+            logger.warning('refresh token reuse detected for session %s, session revoked', sid)
+        if result != 1:
+            return None
+        self.rotated += 1
+        return new_jti
+
+    async def revoke(self, sid: str, jti: str, email: str) -> bool:
+        """
+                Отзывает сессию, если предъявлен ее действующий refresh-токен.
+
+                Parameters:
+                - sid: Идентификатор сессии.
+                - jti: Идентификатор предъявленного refresh-токена.
+                - email: Email владельца сессии.
+
+                Returns:
+                - bool: True, если сессия отозвана; False, если ее нет или токен уже заменен при ротации.
+
+                Raises:
+                - SessionStoreUnavailable: Если Redis недоступен.
+                """
+        self._client()
+        try:
+            result = int(await self._revoke(keys=[self._session_key(sid), self._user_key(email)], args=[jti, sid]))
+        except (RedisError, OSError) as err:
+            raise SessionStoreUnavailable(str(err)) from err
+        if result == -1:
+            self.reuse_detected += 1
+            logger.warning('revoked refresh token presented for session %s', sid)
+        if result != 1:
+            return False
+        self.revoked += 1
+        return True
+
+    async def is_current(self, sid: str, jti: str) -> bool:
+        """
+                Проверяет, что refresh-токен является действующим токеном своей сессии.
+
+                Parameters:
+                - sid: Идентификатор сессии.
+                - jti: Идентификатор предъявленного refresh-токена.
+
+                Returns:
+                - bool: True, если сессия существует и jti совпадает с текущим.
+
+                Raises:
+                - SessionStoreUnavailable: Если Redis недоступен.
+                """
+        try:
+            current = await self._client().hget(self._session_key(sid), 'jti')
+        except (RedisError, OSError) as err:
+            raise SessionStoreUnavailable(str(err)) from err
+        if current is not None and _text(current) != jti:
+            self.reuse_detected += 1
+            logger.warning('revoked refresh token presented for session %s', sid)
+        return current is not None and _text(current) == jti
+
+    async def revoke_all(self, email: str) -> int:
+        """
+                Отзывает все сессии пользователя.
+
+                Parameters:
+                - email: Email пользователя.
+
+                Returns:
+                - int: Количество отозванных сессий.
+
+                Raises:
+                - SessionStoreUnavailable: Если Redis недоступен.
+                """
+        try:
+            sids = [_text(sid) for sid in await self._client().smembers(self._user_key(email))]
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for sid in sids:
+                    pipe.delete(self._session_key(sid))
+                pipe.delete(self._user_key(email))
+                results = await pipe.execute()
+        except (RedisError, OSError) as err:
+            raise SessionStoreUnavailable(str(err)) from err
+        deleted = sum(results[:-1])
+        self.revoked += deleted
+        return deleted
+
+    async def list(self, email: str) -> list[dict]:
+        """
+                Возвращает активные сессии пользователя; идентификаторы истекших сессий удаляются из списка.
+
+                Parameters:
+                - email: Email пользователя.
+
+                Returns:
+                - list[dict]: Идентификатор сессии, устройство и время создания (Unix time).
+
+                Raises:
+                - SessionStoreUnavailable: Если Redis недоступен.
+                """
+        try:
+            sids = sorted(_text(sid) for sid in await self._client().smembers(self._user_key(email)))
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for sid in sids:
+                    pipe.hgetall(self._session_key(sid))
+                sessions = await pipe.execute()
+            expired = [sid for sid, session in zip(sids, sessions) if not session]
+            if expired:
+                await self.redis.srem(self._user_key(email), *expired)
+        except (RedisError, OSError) as err:
+            raise SessionStoreUnavailable(str(err)) from err
+        result = []
+        for sid, session in zip(sids, sessions):
+            if session:
+                session = {_text(key): _text(value) for key, value in session.items()}
+                result.append({'sid': sid, 'device': session.get('device', ''),
+                               'created_at': int(session.get('created_at', 0))})
+        return result
+
+    def stats(self) -> dict:
+        """
+                Возвращает счетчики хранилища сессий.
+
+                Returns:
+                - dict: Количество созданных сессий, ротаций, повторных предъявлений токена и отзывов.
+                """
+        return {'ttl': self.ttl, 'created': self.created, 'rotated': self.rotated,
+                'reuse_detected': self.reuse_detected, 'revoked': self.revoked}
+
+
+session_store = SessionStore(config.REFRESH_TOKEN_TTL)
+
+
+def session_store_unavailable() -> HTTPException:
+    """Возвращает исключение 503 для недоступного хранилища сессий."""
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Session store unavailable',
+                         headers={'Retry-After': '1'})
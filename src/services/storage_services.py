@@ -0,0 +1,242 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.dburl import config
+
+CHUNK_SIZE = 64 * 1024
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class FileTooLarge(Exception):
+    """Загружаемый файл превышает допустимый размер."""
+
+
+class StorageBackend(ABC):
+    """
+        Базовый класс хранилища аватаров.
+
+        Methods:
+        - save(key, file): Сохраняет файл под ключом key и возвращает публичный URL.
+        """
+
+    @abstractmethod
+    async def save(self, key: str, file: BinaryIO) -> str:
+        """
+                Сохраняет файл в хранилище.
+
+                Parameters:
+                - key: Ключ файла в хранилище.
+                - file: Файловый объект, открытый на чтение.
+
+                Returns:
+                - str: Публичный URL файла.
+                """
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+        Хранилище аватаров в Cloudinary. Загрузка выполняется в пуле потоков.
+
+        SDK cloudinary импортируется и настраивается при создании хранилища (первая загрузка
+        аватара через get_storage), а не при импорте приложения.
+        """
+
+    def __init__(self, cloud_name: str, api_key: int, api_secret: str):
+        """
+                Настраивает клиент Cloudinary.
+
+                Parameters:
+                - cloud_name: Название облака.
+                - api_key: API ключ.
+                - api_secret: Секретный ключ API.
+                """
+        import cloudinary
+
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+
+    def _upload(self, key: str, file: BinaryIO) -> str:
+        import cloudinary
+        import cloudinary.uploader
+
+        res = cloudinary.uploader.upload(file, public_id=key, overwrite=True)
+        return cloudinary.CloudinaryImage(key).build_url(width=250, height=250, crop='fill',
+                                                         version=res.get('version'))
+
+    async def save(self, key: str, file: BinaryIO) -> str:
+        """
+                Загружает файл в Cloudinary вне цикла событий.
+
+                Parameters:
+                - key: Публичный идентификатор файла.
+                - file: Файловый объект, открытый на чтение.
+
+                Returns:
+                - str: URL изображения 250x250.
+                """
+        return await asyncio.to_thread(self._upload, key, file)
+
+
+class LocalStorage(StorageBackend):
+    """
+        Хранилище аватаров в локальной файловой системе (для тестов и изолированных окружений).
+
+        Attributes:
+        - root (Path): Каталог для файлов.
+        - base_url (str): Префикс URL, по которому раздаются файлы.
+        """
+
+    def __init__(self, root: str, base_url: str):
+        """
+                Parameters:
+                - root: Каталог для файлов.
+                - base_url: Префикс URL, по которому раздаются файлы.
+                """
+        self.root = Path(root)
+        self.base_url = base_url.rstrip('/')
+
+    def _write(self, key: str, file: BinaryIO) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise ValueError('invalid storage key')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as out:
+            shutil.copyfileobj(file, out, CHUNK_SIZE)
+        os.replace(tmp, path)
+        return path
+
+    async def save(self, key: str, file: BinaryIO) -> str:
+        """
+                Записывает файл на диск вне цикла событий.
+
+                Parameters:
+                - key: Относительный путь файла.
+                - file: Файловый объект, открытый на чтение.
+
+                Returns:
+                - str: URL файла.
+                """
+        path = await asyncio.to_thread(self._write, key, file)
+        return f'{self.base_url}/{key}?v={path.stat().st_mtime_ns}'
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """
+        Возвращает хранилище аватаров, выбранное настройкой AVATAR_STORAGE.
+
+        Returns:
+        - StorageBackend: CloudinaryStorage или LocalStorage.
+        """
+    if config.AVATAR_STORAGE == 'local':
+        return LocalStorage(config.AVATAR_LOCAL_DIR, config.AVATAR_BASE_URL)
+    return CloudinaryStorage(config.CLD_NAME, config.CLD_API_KEY, config.CLD_API_SECRET)
+
+
+async def spool_upload(file: UploadFile, max_bytes: int) -> BinaryIO:
+    """
+        Читает загружаемый файл блоками во временный файл, проверяя ограничение размера.
+
+        Parameters:
+        - file: Загружаемый файл.
+        - max_bytes: Максимальный размер файла в байтах.
+
+        Returns:
+        - BinaryIO: Временный файл, перемотанный в начало. Закрывать должен вызывающий код.
+
+        Raises:
+        - FileTooLarge: Если файл больше max_bytes.
+        """
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise FileTooLarge()
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+async def save_avatar(file: UploadFile, key: str) -> str:
+    """
+        Сохраняет аватар в настроенном хранилище.
+
+        Parameters:
+        - file: Загружаемый файл.
+        - key: Ключ файла в хранилище.
+
+        Returns:
+        - str: URL сохраненного аватара.
+
+        Raises:
+        - FileTooLarge: Если файл больше AVATAR_MAX_BYTES.
+        """
+    spooled = await spool_upload(file, config.AVATAR_MAX_BYTES)
+    try:
+        return await get_storage().save(key, spooled)
+    finally:
+        spooled.close()
+
+
+class UploadLimitMiddleware:
+    """
+        ASGI middleware, ограничивающее размер тела запроса для маршрутов загрузки файлов.
+
+        FastAPI разбирает multipart-тело целиком до вызова обработчика и зависимостей, поэтому
+        проверка в spool_upload срабатывает только после буферизации всего файла. Middleware отвечает
+        413 сразу по заголовку Content-Length, а для тела без Content-Length (chunked) прерывает
+        чтение, как только получено больше limit байт.
+
+        Attributes:
+        - app (ASGIApp): Оборачиваемое приложение.
+        - limits (dict[str, int]): Максимальный размер тела в байтах для каждого пути.
+        """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]):
+        """
+                Parameters:
+                - app: Оборачиваемое приложение.
+                - limits: Максимальный размер тела в байтах для каждого пути.
+                """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self.limits.get(scope['path']) if scope['type'] == 'http' else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope['headers']).get(b'content-length')
+        if length is not None and length.isdigit() and int(length) > limit:
+            response = JSONResponse({'detail': 'File is too large'},
+                                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, headers={'Connection': 'close'})
+            await response(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        detail='File is too large')
+            return message
+
+        await self.app(scope, limited_receive, send)
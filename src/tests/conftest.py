@@ -1,24 +1,46 @@
 import asyncio
+import socket
 
+import fakeredis
 import pytest
+import redis.asyncio as redis
 import pytest_asyncio
 from fastapi.testclient import TestClient
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.pool import StaticPool
 from src.services.auth_services import auth_service
 from main import app
 from src.contacts.models import Base, User
-from src.db.connectdb import get_db
+from src.db.connectdb import get_db, get_read_db, instrument_queries
+from src.services.session_services import session_store
+from src.conf.dburl import config
+
+config.METRICS_ENABLED = True
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+instrument_queries(engine)
 TestingSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 test_user = {"username": "deadpool", "email": "deadpool@example.com", "password": "12345678"}
 
 
+def free_port() -> int:
+    """Возвращает свободный TCP-порт на 127.0.0.1, на котором никто не слушает."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def unreachable_redis() -> redis.Redis:
+    """Клиент Redis на свободном порту без повторных попыток: каждая команда сразу завершается ошибкой."""
+    return redis.Redis(port=free_port(), socket_connect_timeout=0.1, retry=Retry(NoBackoff(), 0))
+
+
 @pytest.fixture(scope="module", autouse=True)
 def init_models_wraps():
     async def init_model():
@@ -46,9 +68,12 @@ def client():
         except Exception as err:
             print(err)
             await session.rollback()
+            raise
         finally:
             await session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    session_store.init(fakeredis.FakeAsyncRedis())
 
     yield TestClient(app)
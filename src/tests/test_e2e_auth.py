@@ -1,5 +1,7 @@
-from unittest.mock import Mock
+import json
+from unittest.mock import Mock, AsyncMock
 import pytest
+from jose import jwt
 from sqlalchemy import select
 
 from conftest import TestingSessionLocal
@@ -9,7 +11,7 @@ user_data = {"username": "agent007", "email": "agent0071@gmail.com", "password":
 
 
 def test_signup(client, monkeypatch):
-    mock_send_email = Mock()
+    mock_send_email = AsyncMock()
     monkeypatch.setattr('src.routes.auth.send_email', mock_send_email)
     response = client.post('auth/signup', json=user_data)
     assert response.status_code == 201, response.text
@@ -50,3 +52,93 @@ async def test_login(client):
 #     assert response.status_code == 401, response.text
 #     data = response.json()
 #     assert data["detail"] == 'invalid password'
+
+
+def test_refresh_token_sessions(client):
+    from src.services.session_services import session_store
+
+    login_data = {'username': user_data['email'], 'password': user_data['password']}
+    phone = client.post('auth/login', data=login_data, headers={'User-Agent': 'phone'}).json()
+    laptop = client.post('auth/login', data=login_data, headers={'User-Agent': 'laptop'}).json()
+    sessions = client.get('auth/sessions', headers={'Authorization': f"Bearer {phone['access_token']}"})
+    assert sessions.status_code == 200, sessions.text
+    assert {'laptop', 'phone'} <= {item['device'] for item in sessions.json()}
+
+    rotated = client.get('auth/refresh_token', headers={'Authorization': f"Bearer {phone['refresh_token']}"})
+    assert rotated.status_code == 200, rotated.text
+    assert rotated.json()['refresh_token'] != phone['refresh_token']
+    reuse_detected = session_store.reuse_detected
+    reused = client.get('auth/refresh_token', headers={'Authorization': f"Bearer {phone['refresh_token']}"})
+    assert reused.status_code == 401
+    assert session_store.reuse_detected == reuse_detected + 1
+    assert client.get('auth/refresh_token',
+                      headers={'Authorization': f"Bearer {rotated.json()['refresh_token']}"}).status_code == 401
+
+    headers = {'Authorization': f"Bearer {laptop['refresh_token']}"}
+    assert client.get('auth/refresh_token', headers={'Authorization': f"Bearer {laptop['access_token']}"}
+                      ).status_code == 401
+    assert client.post('auth/logout', headers=headers).status_code == 204
+    assert client.get('auth/refresh_token', headers=headers).status_code == 401
+
+    assert client.post('auth/logout', headers=headers).status_code == 401
+
+    tokens = [client.post('auth/login', data=login_data).json() for _ in range(2)]
+    active = client.get('auth/sessions', headers={'Authorization': f"Bearer {tokens[0]['access_token']}"}).json()
+    response = client.post('auth/logout_all', headers={'Authorization': f"Bearer {tokens[0]['refresh_token']}"})
+    assert response.json() == {'revoked': len(active)}
+    assert client.get('auth/sessions', headers={'Authorization': f"Bearer {tokens[0]['access_token']}"}).json() == []
+    assert client.get('auth/refresh_token',
+                      headers={'Authorization': f"Bearer {tokens[1]['refresh_token']}"}).status_code == 401
+
+
+def test_rotated_refresh_token_cannot_log_out(client):
+    login_data = {'username': user_data['email'], 'password': user_data['password']}
+    tokens = client.post('auth/login', data=login_data).json()
+    stale = {'Authorization': f"Bearer {tokens['refresh_token']}"}
+    rotated = client.get('auth/refresh_token', headers=stale).json()
+
+    assert client.post('auth/logout', headers=stale).status_code == 401
+    assert client.post('auth/logout_all', headers=stale).status_code == 401
+    assert client.get('auth/sessions', headers={'Authorization': f"Bearer {rotated['access_token']}"}).json()
+    response = client.post('auth/logout_all', headers={'Authorization': f"Bearer {rotated['refresh_token']}"})
+    assert response.status_code == 200, response.text
+    assert response.json()['revoked'] >= 1
+
+
+def test_login_does_not_write_to_database(client):
+    from sqlalchemy import event
+    from conftest import engine
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split()[0].upper())
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        response = client.post('auth/login', data={'username': user_data['email'], 'password': user_data['password']})
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
+    assert response.status_code == 200, response.text
+    assert statements and set(statements) == {'SELECT'}
+
+
+@pytest.mark.asyncio
+async def test_reset_password_keeps_plaintext_out_of_outbox(client):
+    from src.contacts.models import EmailOutbox
+
+    new_password = 'n3wpass'
+    response = client.post('api/reset_password', json={'email': user_data['email'], 'password': new_password,
+                                                         'password_confirm': new_password})
+    assert response.status_code == 200, response.text
+    async with TestingSessionLocal() as session:
+        message = (await session.execute(select(EmailOutbox).where(EmailOutbox.template_name == 'password.html')
+                                         .order_by(EmailOutbox.id.desc()))).scalars().first()
+    assert new_password not in message.template_body
+    token = json.loads(message.template_body)['token']
+    assert new_password not in json.dumps(jwt.get_unverified_claims(token))
+
+    response = client.get(f'api/reset-password/{token}')
+    assert response.status_code == 200, response.text
+    response = client.post('auth/login', data={'username': user_data['email'], 'password': new_password})
+    assert response.status_code == 200, response.text
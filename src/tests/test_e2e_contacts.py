@@ -0,0 +1,320 @@
+from datetime import date
+
+import pytest
+
+from conftest import TestingSessionLocal, test_user
+from src.contacts.models import Contact, User
+from sqlalchemy import select
+
+
+@pytest.fixture(scope='module')
+def token(client):
+    response = client.post('auth/login', data={'username': test_user['email'], 'password': test_user['password']})
+    assert response.status_code == 200, response.text
+    return response.json()['access_token']
+
+
+@pytest.fixture(scope='module')
+def contacts(token):
+    async def seed():
+        async with TestingSessionLocal() as session:
+            user = (await session.execute(select(User).filter_by(email=test_user['email']))).scalar_one()
+            session.add_all([Contact(name=f'name{i}', surname=f'surname{i}', phone=f'{i}', email=f'c{i}@mail.com',
+                                     birthday=date(1990, 1, 1), information='info', user_id=user.id)
+                             for i in range(25)])
+            await session.commit()
+
+    import asyncio
+    asyncio.run(seed())
+
+
+def test_cursor_pagination(client, token, contacts):
+    headers = {'Authorization': f'Bearer {token}'}
+    seen = []
+    after = ''
+    while after is not None:
+        response = client.get('/contacts/', params={'limit': 10, 'after': after}, headers=headers)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        seen.extend(item['id'] for item in data['items'])
+        after = data['next_cursor']
+    assert len(seen) == 25
+    assert seen == sorted(seen)
+
+
+def test_offset_pagination_still_works(client, token, contacts):
+    response = client.get('/contacts/', params={'limit': 10, 'offset': 20},
+                          headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert len(data) == 5
+    assert data[0]['user']['email'] == test_user['email']
+    assert data[0]['birthday'] == '1990-01-01'
+
+
+def test_invalid_cursor(client, token):
+    response = client.get('/contacts/', params={'after': 'garbage'}, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 400
+
+
+@pytest.fixture()
+def test_session_manage(monkeypatch):
+    class TestSessionManage:
+        def session(self):
+            return TestingSessionLocal()
+
+        def read_session(self, key=None):
+            return TestingSessionLocal()
+
+    monkeypatch.setattr('src.services.export_services.session_manage', TestSessionManage())
+
+
+@pytest.mark.parametrize('fmt, marker', [('csv', 'id,name,surname'), ('ndjson', '"name": "name0"'),
+                                         ('vcard', 'BEGIN:VCARD')])
+def test_export(client, token, contacts, test_session_manage, fmt, marker):
+    response = client.get('/contacts/export/', params={'format': fmt}, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.text
+    assert marker in response.text
+    assert 'attachment' in response.headers['content-disposition']
+    if fmt == 'ndjson':
+        assert len(response.text.splitlines()) == 25
+    if fmt == 'vcard':
+        assert response.text.count('END:VCARD') == 25
+
+
+@pytest.fixture(params=[0, 2000], ids=['fts', 'scan'])
+def scan_limit(request, monkeypatch):
+    monkeypatch.setattr('src.repository.functiondb.SEARCH_SCAN_LIMIT', request.param)
+
+
+@pytest.mark.parametrize('query, expected', [('NAME1', 11), ('surname2', 6), ('c24@', 1), ('me2', 6), ('zz', 0)])
+def test_search(client, token, contacts, scan_limit, query, expected):
+    response = client.get('/contacts/search/', params={'q': query, 'limit': 100},
+                          headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == expected
+
+
+def test_search_prefix_ranked_first(client, token, contacts, scan_limit):
+    response = client.get('/contacts/search/', params={'q': 'name2'}, headers={'Authorization': f'Bearer {token}'})
+    assert response.json()[0]['name'].startswith('name2')
+
+
+@pytest.fixture(scope='module')
+def other_user_contact(token):
+    async def seed():
+        async with TestingSessionLocal() as session:
+            other = User(username='other', email='other_search@mail.com', password='hash', confirmed=True)
+            session.add(Contact(name='name1other', surname='surname1', phone='1', email='c1@mail.com',
+                                birthday=date(1990, 1, 1), information='info', user=other))
+            await session.commit()
+
+    import asyncio
+    asyncio.run(seed())
+
+
+def test_search_ignores_other_users(client, token, contacts, other_user_contact, scan_limit):
+    response = client.get('/contacts/search/', params={'q': 'name1', 'limit': 100},
+                          headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 11
+    assert all(item['user']['email'] == test_user['email'] for item in response.json())
+
+
+def test_look_for_contact(client, token, contacts):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.get('/contacts/search_contact/surname7', headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()['surname'] == 'surname7'
+    assert client.get('/contacts/search_contact/nobody', headers=headers).status_code == 404
+
+
+def test_birthdays(client, token):
+    from datetime import timedelta
+
+    async def seed():
+        async with TestingSessionLocal() as session:
+            user = (await session.execute(select(User).filter_by(email=test_user['email']))).scalar_one()
+            today = date.today()
+            for offset in (0, 3, 10):
+                birthday = (today + timedelta(days=offset)).replace(year=1980) \
+                    if (today + timedelta(days=offset)).strftime('%m-%d') != '02-29' else date(1980, 2, 29)
+                session.add(Contact(name=f'bday{offset}', surname='s', phone='1', email='b@mail.com',
+                                    birthday=birthday, information='', user_id=user.id))
+            await session.commit()
+
+    import asyncio
+    asyncio.run(seed())
+    headers = {'Authorization': f'Bearer {token}'}
+    names = [c['name'] for c in client.get('/contacts/birthdays/', headers=headers).json() if c['name'].startswith('bday')]
+    assert names == ['bday0', 'bday3']
+    response = client.get('/contacts/birthdays/', params={'days': 30}, headers=headers)
+    names = [c['name'] for c in response.json() if c['name'].startswith('bday')]
+    assert names == ['bday0', 'bday3', 'bday10']
+
+
+def test_rate_limit_is_per_user(client, token):
+    from src.services.ratelimit_services import rate_limit_backend
+
+    rate_limit_backend.reset()
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/api/me', headers=headers).status_code == 200
+    response = client.get('/api/me', headers=headers)
+    assert response.status_code == 429, response.text
+    assert int(response.headers['Retry-After']) > 0
+
+
+def test_conditional_get_with_etag(client, token, contacts):
+    from src.services.ratelimit_services import rate_limit_backend
+
+    headers = {'Authorization': f'Bearer {token}'}
+    first = client.get('/contacts/', params={'limit': 10}, headers=headers)
+    etag = first.headers['ETag']
+    not_modified = client.get('/contacts/', params={'limit': 10}, headers={**headers, 'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers['ETag'] == etag
+    other_page = client.get('/contacts/', params={'limit': 10, 'offset': 10}, headers=headers)
+    assert other_page.headers['ETag'] != etag
+
+    rate_limit_backend.reset()
+    created = client.post('/contacts/', json={'name': 'New', 'surname': 'Contact', 'phone': '1', 'email': 'n@mail.com',
+                                              'birthday': '1990-05-05', 'information': ''}, headers=headers)
+    assert created.status_code == 201, created.text
+    changed = client.get('/contacts/', params={'limit': 10}, headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+    single = client.get(f"/contacts/{created.json()['id']}", headers=headers)
+    assert single.status_code == 200
+    assert single.json()['name'] == 'New'
+    assert client.get(f"/contacts/{created.json()['id']}",
+                      headers={**headers, 'If-None-Match': single.headers['ETag']}).status_code == 304
+    assert client.get('/contacts/999999', headers=headers).status_code == 404
+
+
+def test_metrics_endpoint(client, token):
+    response = client.get('/contacts/', params={'limit': 10}, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert 'db;dur=' in response.headers['server-timing']
+
+    metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    assert metrics.headers['content-type'].startswith('text/plain')
+    body = metrics.text
+    assert 'http_requests_total{method="GET",route="/contacts/",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/contacts/",le="+Inf"}' in body
+    assert 'http_request_db_queries_count{method="GET",route="/contacts/"}' in body
+    assert '/metrics' not in body
+    assert '# TYPE db_pool_checkouts_total counter' in body
+    assert '# TYPE db_pool_checked_out gauge' in body
+
+
+def test_metrics_access(client, monkeypatch):
+    from src.conf.dburl import config
+
+    monkeypatch.setattr(config, 'METRICS_TOKEN', 'metrics-secret')
+    for path in ('/metrics', '/api/stats/pool'):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+        assert client.get(path, headers={'Authorization': 'Bearer metrics-secret'}).status_code == 200
+
+    monkeypatch.setattr(config, 'METRICS_ENABLED', False)
+    assert client.get('/metrics', headers={'Authorization': 'Bearer metrics-secret'}).status_code == 404
+    assert client.get('/api/stats/pool', headers={'Authorization': 'Bearer metrics-secret'}).status_code == 404
+
+
+def test_batch_operations(client, token, contacts):
+    async def seed_foreign():
+        async with TestingSessionLocal() as session:
+            other = User(username='other', email='other@example.com', password='x', confirmed=True)
+            session.add(other)
+            await session.flush()
+            contact = Contact(name='foreign', surname='s', phone='1', email='f@mail.com', birthday=date(1990, 1, 1),
+                              information='', user_id=other.id)
+            session.add(contact)
+            await session.commit()
+            return contact.id
+
+    import asyncio
+    foreign_id = asyncio.run(seed_foreign())
+    headers = {'Authorization': f'Bearer {token}'}
+    own_ids = [item['id'] for item in client.get('/contacts/', params={'limit': 10}, headers=headers).json()][:3]
+
+    response = client.post('/contacts/batch/get', json={'ids': [*own_ids, foreign_id, own_ids[0]]}, headers=headers)
+    assert response.status_code == 200, response.text
+    results = response.json()['results']
+    assert [item['id'] for item in results] == [*own_ids, foreign_id]
+    assert [item['status'] for item in results] == ['ok', 'ok', 'ok', 'not_found']
+    assert results[0]['contact']['user']['email'] == test_user['email']
+
+    etag = client.get('/contacts/', params={'limit': 10}, headers=headers).headers['ETag']
+    response = client.patch('/contacts/batch/', headers=headers, json={'items': [
+        {'id': own_ids[0], 'name': 'patched'}, {'id': own_ids[1], 'birthday': '2000-12-31'},
+        {'id': foreign_id, 'name': 'stolen'}]})
+    assert response.status_code == 200, response.text
+    results = response.json()['results']
+    assert [item['status'] for item in results] == ['updated', 'updated', 'not_found']
+    assert results[0]['contact']['name'] == 'patched'
+    assert results[0]['contact']['surname'].startswith('surname')
+    assert results[1]['contact']['birthday'] == '2000-12-31'
+    assert client.get('/contacts/', params={'limit': 10}, headers={**headers, 'If-None-Match': etag}).status_code == 200
+    assert client.patch('/contacts/batch/', headers=headers,
+                        json={'items': [{'id': own_ids[0], 'name': None}]}).status_code == 422
+
+    response = client.post('/contacts/batch/delete', json={'ids': [own_ids[2], foreign_id]}, headers=headers)
+    assert [item['status'] for item in response.json()['results']] == ['deleted', 'not_found']
+    response = client.post('/contacts/batch/get', json={'ids': [own_ids[2], foreign_id]}, headers=headers)
+    assert [item['status'] for item in response.json()['results']] == ['not_found', 'not_found']
+
+    async def foreign_exists():
+        async with TestingSessionLocal() as session:
+            return await session.get(Contact, foreign_id) is not None
+
+    assert asyncio.run(foreign_exists())
+    assert client.post('/contacts/batch/get', json={'ids': list(range(1000))}, headers=headers).status_code == 422
+    assert client.post('/contacts/batch/delete', json={'ids': []}, headers=headers).status_code == 422
+
+
+def test_put_patch_delete_single_contact(client, token, contacts):
+    headers = {'Authorization': f'Bearer {token}'}
+    contact_id = client.get('/contacts/', params={'limit': 10}, headers=headers).json()[0]['id']
+    body = {'name': 'Put', 'surname': 'Contact', 'phone': '555', 'email': 'put@mail.com', 'birthday': '1985-05-05',
+            'information': 'kept'}
+    response = client.put(f'/contacts/{contact_id}', json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()['information'] == 'kept'
+    assert response.json()['user']['email'] == test_user['email']
+
+    response = client.patch(f'/contacts/{contact_id}', json={'phone': '777'}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert (response.json()['phone'], response.json()['name'], response.json()['information']) == ('777', 'Put', 'kept')
+    assert client.get(f'/contacts/{contact_id}', headers=headers).json()['phone'] == '777'
+    assert client.patch('/contacts/999999', json={'phone': '1'}, headers=headers).status_code == 404
+    assert client.put('/contacts/999999', json=body, headers=headers).status_code == 404
+
+    response = client.delete(f'/contacts/{contact_id}', headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()['id'] == contact_id
+    assert client.delete(f'/contacts/{contact_id}', headers=headers).status_code == 404
+
+
+def test_health_probes(client, monkeypatch):
+    import asyncio
+    import fakeredis
+    from conftest import engine
+    from src.services.health_services import health_checker
+
+    for name in ('_engine', '_redis', '_pool_stats', 'status', 'checked_at', 'checks'):
+        monkeypatch.setattr(health_checker, name, getattr(health_checker, name))
+    assert client.get('/api/health/live').json() == {'status': 'alive'}
+    health_checker.init(lambda: engine, fakeredis.FakeAsyncRedis())
+    asyncio.run(health_checker.check())
+    response = client.get('/api/health/ready')
+    assert response.status_code == 200, response.text
+    assert response.json()['checks']['database']['ok']
+    assert client.get('/api/healthchecker').json() == {'message': 'Welcome to fastAPI'}
+
+    health_checker.status = {'ready': False, 'checks': {'database': {'ok': False}}}
+    assert client.get('/api/health/ready').status_code == 503
+    assert client.get('/api/healthchecker').status_code == 500
+    health_checker.checked_at = None
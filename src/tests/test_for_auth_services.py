@@ -0,0 +1,51 @@
+import hashlib
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from jose import JWTError, jwt
+
+from src.contacts.models import User
+from src.services.auth_services import auth_service
+from src.services.cache_services import token_cache, user_cache
+
+
+class TestTokenCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        token_cache.clear()
+
+    async def test_verified_token_is_decoded_once(self):
+        token = await auth_service.create_access_token({'sub': 'user@mail.com'})
+        with patch('src.services.auth_services.jwt.decode', wraps=jwt.decode) as decode:
+            first = auth_service.decode_access_token(token)
+            second = auth_service.decode_access_token(token)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first['sub'], 'user@mail.com')
+        self.assertEqual(token_cache.stats()['hits'], 1)
+
+    async def test_cache_entry_respects_exp(self):
+        token = await auth_service.create_access_token({'sub': 'user@mail.com'}, expires_delta=10)
+        with patch('src.services.cache_services.time.monotonic', return_value=0):
+            auth_service.decode_access_token(token)
+        with patch('src.services.cache_services.time.monotonic', return_value=11):
+            self.assertIsNone(token_cache.get(hashlib.sha256(token.encode()).digest()))
+
+    async def test_invalid_token_is_not_cached(self):
+        token = await auth_service.create_access_token({'sub': 'user@mail.com'})
+        with self.assertRaises(JWTError):
+            auth_service.decode_access_token(token[:-2] + 'xx')
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        user_cache.clear()
+
+    async def test_password_hash_is_not_cached(self):
+        token = await auth_service.create_access_token({'sub': 'cached@mail.com'})
+        user = User(id=7, username='cached', email='cached@mail.com', password='$2b$hash', confirmed=True)
+        with patch('src.services.auth_services.repository_users.get_user_by_email', AsyncMock(return_value=user)):
+            self.assertIs(await auth_service.get_current_user(token, AsyncMock()), user)
+        cached = user_cache.get('cached@mail.com')
+        self.assertEqual(cached['email'], 'cached@mail.com')
+        self.assertNotIn('password', cached)
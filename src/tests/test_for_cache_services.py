@@ -0,0 +1,125 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+
+from conftest import unreachable_redis
+from src.services.cache_services import CacheInvalidation, LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LRUCache(maxsize=2, ttl=60)
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_lru_eviction(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        with patch('src.services.cache_services.time.monotonic', return_value=0):
+            self.cache.set('a', 1)
+        with patch('src.services.cache_services.time.monotonic', return_value=61):
+            self.assertIsNone(self.cache.get('a'))
+
+    def test_entry_ttl_is_capped(self):
+        with patch('src.services.cache_services.time.monotonic', return_value=0):
+            self.cache.set('a', 1, ttl=5)
+            self.cache.set('b', 2, ttl=600)
+            self.cache.set('c', 3, ttl=-1)
+        with patch('src.services.cache_services.time.monotonic', return_value=30):
+            self.assertIsNone(self.cache.get('a'))
+            self.assertEqual(self.cache.get('b'), 2)
+        with patch('src.services.cache_services.time.monotonic', return_value=61):
+            self.assertIsNone(self.cache.get('b'))
+        self.assertIsNone(self.cache.get('c'))
+
+    def test_invalidate(self):
+        self.cache.set('a', 1)
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a'))
+
+
+class TestCacheInvalidation(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        server = fakeredis.FakeServer()
+        self.workers = [CacheInvalidation(LRUCache(maxsize=10, ttl=60), 'test:invalidate', retry=0.05)
+                        for _ in range(2)]
+        for worker in self.workers:
+            worker.init(fakeredis.FakeAsyncRedis(server=server))
+
+    async def asyncTearDown(self):
+        for worker in self.workers:
+            await worker.stop()
+
+    async def wait_for(self, condition):
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        self.fail('condition was not met')
+
+    async def subscribe(self):
+        for worker in self.workers:
+            worker.start()
+        await self.wait_for(lambda: all(worker.subscribed for worker in self.workers))
+
+    async def test_cache_unused_until_subscribed(self):
+        first = self.workers[0]
+        first.set('a', 1, first.generation)
+        self.assertIsNone(first.get('a'))
+        await self.subscribe()
+        first.set('a', 1, first.generation)
+        self.assertEqual(first.get('a'), 1)
+
+    async def test_invalidation_reaches_other_workers(self):
+        await self.subscribe()
+        first, second = self.workers
+        for worker in self.workers:
+            worker.set('a', 1, worker.generation)
+            worker.set('b', 2, worker.generation)
+        await first.invalidate('a')
+        self.assertIsNone(first.get('a'))
+        await self.wait_for(lambda: second.received == 1)
+        self.assertIsNone(second.get('a'))
+        self.assertEqual(second.get('b'), 2)
+
+    async def test_value_read_before_invalidation_is_not_cached(self):
+        await self.subscribe()
+        first = self.workers[0]
+        generation = first.generation
+        await first.invalidate('a')
+        first.set('a', 'stale', generation)
+        self.assertIsNone(first.get('a'))
+
+    async def test_without_redis_cache_is_local(self):
+        worker = CacheInvalidation(LRUCache(maxsize=10, ttl=60), 'test:invalidate')
+        worker.set('a', 1, worker.generation)
+        self.assertEqual(worker.get('a'), 1)
+        await worker.invalidate('a')
+        self.assertIsNone(worker.get('a'))
+
+    async def test_redis_unavailable(self):
+        client = unreachable_redis()
+        worker = CacheInvalidation(LRUCache(maxsize=10, ttl=60), 'test:invalidate', retry=0.05)
+        worker.init(client)
+        worker.start()
+        await self.wait_for(lambda: worker.errors > 0)
+        worker.set('a', 1, worker.generation)
+        self.assertIsNone(worker.get('a'))
+        await worker.invalidate('a')
+        await worker.stop()
+        await client.aclose()
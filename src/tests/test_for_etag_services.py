@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+from redis.exceptions import ConnectionError
+
+from src.services.etag_services import ResponseCache, etag_matches, make_etag
+
+
+class TestETag(unittest.TestCase):
+    def request(self, path: str, query: list[tuple[str, str]]):
+        request = MagicMock()
+        request.url.path = path
+        request.query_params.multi_items.return_value = query
+        return request
+
+    def test_etag_depends_on_version_and_query_order_does_not(self):
+        etag = make_etag(1, 5, self.request('/contacts/', [('limit', '10'), ('offset', '0')]))
+        self.assertEqual(etag, make_etag(1, 5, self.request('/contacts/', [('offset', '0'), ('limit', '10')])))
+        self.assertNotEqual(etag, make_etag(1, 6, self.request('/contacts/', [('limit', '10'), ('offset', '0')])))
+        self.assertNotEqual(etag, make_etag(2, 5, self.request('/contacts/', [('limit', '10'), ('offset', '0')])))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_if_none_match(self):
+        self.assertTrue(etag_matches('"a"', '"b", "a"'))
+        self.assertTrue(etag_matches('"a"', 'W/"a"'))
+        self.assertTrue(etag_matches('"a"', '*'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches('"a"', None))
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+    async def test_memory_backend(self):
+        cache = ResponseCache('memory', maxsize=10, ttl=60)
+        self.assertIsNone(await cache.get('"a"'))
+        await cache.set('"a"', b'[]')
+        self.assertEqual(await cache.get('"a"'), b'[]')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    async def test_redis_backend_sets_ttl(self):
+        redis = fakeredis.FakeAsyncRedis()
+        cache = ResponseCache('redis', maxsize=10, ttl=60)
+        cache.init(redis)
+        await cache.set('"a"', b'[]')
+        self.assertEqual(await cache.get('"a"'), b'[]')
+        self.assertTrue(0 < await redis.ttl('etag:"a"') <= 60)
+
+    async def test_redis_errors_are_misses(self):
+        redis = AsyncMock()
+        redis.get.side_effect = ConnectionError('down')
+        redis.set.side_effect = ConnectionError('down')
+        cache = ResponseCache('redis', maxsize=10, ttl=60)
+        cache.init(redis)
+        await cache.set('"a"', b'[]')
+        self.assertIsNone(await cache.get('"a"'))
+        self.assertEqual(cache.errors, 2)
+
+    async def test_none_backend(self):
+        cache = ResponseCache('none', maxsize=10, ttl=60)
+        await cache.set('"a"', b'[]')
+        self.assertIsNone(await cache.get('"a"'))
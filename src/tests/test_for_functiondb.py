@@ -1,12 +1,12 @@
 import unittest
 from unittest.mock import MagicMock, AsyncMock
 from src.repository.functiondb import get_contacts, get_contact, create_contact, update_contact, delete_contact, \
-    upcoming_birthday, look_for_contact
+    patch_contact, upcoming_birthday, look_for_contact, get_contacts_after, encode_cursor, decode_cursor, birthday_window
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.schemas.checkschemas import CreateContactSchema, CreateContact
 from src.contacts.models import User, Contact
 import datetime
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 
 class TestAsyncForDB(unittest.IsolatedAsyncioTestCase):
@@ -27,6 +27,29 @@ class TestAsyncForDB(unittest.IsolatedAsyncioTestCase):
         result = await get_contacts(limit, offset, self.session, self.user)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_after(self):
+        contacts = [Contact(id=i, name='Jack', user=self.user) for i in range(1, 12)]
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
+        result, next_cursor = await get_contacts_after(None, 10, self.session, self.user)
+        self.assertEqual(result, contacts[:10])
+        self.assertEqual(decode_cursor(next_cursor), (self.user.id, 10))
+
+    async def test_get_contacts_after_last_page(self):
+        contacts = [Contact(id=i, name='Jack', user=self.user) for i in range(11, 14)]
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
+        result, next_cursor = await get_contacts_after(10, 10, self.session, self.user)
+        self.assertEqual(result, contacts)
+        self.assertIsNone(next_cursor)
+
+    def test_decode_invalid_cursor(self):
+        self.assertEqual(decode_cursor(encode_cursor(3, 42)), (3, 42))
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor')
+
     async def test_get_contact(self):
         contact_id = 1
         contacts = [
@@ -53,28 +76,51 @@ class TestAsyncForDB(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result.information, new_contact.information)
 
     async def test_update_contact(self):
-        updated_contact = Contact(name='Bob', surname='Bill', phone='300962223344', email='qwer@gmail.com',
-                                  birthday='1992-01-01', information='dsff')
-
+        row = {'id': 1, 'name': 'Bob', 'surname': 'Bill', 'phone': '300962223344', 'email': 'qwer@gmail.com',
+               'birthday': date(1992, 1, 1), 'information': 'dsff'}
         body = CreateContactSchema(name='Bob', surname='Bill', phone='300962223344', email='qwer@gmail.com',
                                    birthday='1992-01-01', information='dsff')
 
         mocked_contacts = MagicMock()
-        mocked_contacts.scalar_one_or_none.return_value = updated_contact
+        mocked_contacts.mappings.return_value.one_or_none.return_value = row
         self.session.execute.return_value = mocked_contacts
 
         result = await update_contact(1, body, self.session, self.user)
 
-        self.assertEqual(result, updated_contact)
+        self.assertEqual(result, row)
+        statement = self.session.execute.await_args_list[0].args[0]
+        sql = str(statement.compile()).upper()
+        self.assertTrue(sql.startswith('UPDATE CONTACTS SET'))
+        self.assertIn('INFORMATION=', sql.replace(' ', ''))
+        self.assertIn('RETURNING', sql)
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_called()
+
+    async def test_patch_contact_only_given_fields(self):
+        mocked_contacts = MagicMock()
+        mocked_contacts.mappings.return_value.one_or_none.return_value = None
+        self.session.execute.return_value = mocked_contacts
+
+        result = await patch_contact(1, {'phone': '123'}, self.session, self.user)
+
+        self.assertIsNone(result)
+        self.assertEqual(self.session.execute.await_count, 1)
+        sql = str(self.session.execute.await_args.args[0].compile()).replace(' ', '')
+        self.assertIn('SETphone=', sql)
+        self.assertNotIn('name=', sql)
+        self.assertIn('contacts.user_id=', sql)
 
     async def test_delete_contact(self):
+        row = {'id': 1, 'name': 'Bob', 'surname': 'Bill', 'phone': '300962223344', 'email': 'qwer@gmail.com',
+               'birthday': date(1992, 1, 1), 'information': 'dsff'}
         mocket_contacts = MagicMock()
-        mocket_contacts.scalar_one_or_none.return_value = Contact(name='Bob', surname='Bill', phone='300962223344',
-                                                                  email='qwer@gmail.com',
-                                                                  birthday='1992-01-01', information='dsff')
+        mocket_contacts.mappings.return_value.one_or_none.return_value = row
         self.session.execute.return_value = mocket_contacts
-        result = await delete_contact(1, self.session)
-        self.assertIsInstance(result, Contact)
+        result = await delete_contact(1, self.session, self.user)
+        self.assertEqual(result, row)
+        sql = str(self.session.execute.await_args_list[0].args[0].compile()).replace(' ', '')
+        self.assertIn('DELETEFROMcontacts', sql)
+        self.assertIn('contacts.user_id=', sql)
 
     async def test_upcoming_birthday(self):
         today = datetime.today().date()
@@ -88,10 +134,15 @@ class TestAsyncForDB(unittest.IsolatedAsyncioTestCase):
         mocket_contacts = MagicMock()
         mocket_contacts.scalars.return_value.all.return_value = contacts
         self.session.execute.return_value = mocket_contacts
-        result = await upcoming_birthday(self.session)
+        result = await upcoming_birthday(self.session, self.user)
         for contact in result:
             self.assertIsInstance(contact, Contact)
 
+    def test_birthday_window_wraps_year(self):
+        start, end = birthday_window(datetime(2023, 12, 29).date(), 7)
+        self.assertEqual(start, 364)
+        self.assertEqual(end, 4)
 
-
-
+    def test_birthday_day_of_year_ignores_leap_year(self):
+        contact = Contact(name='Leap', birthday='1991-03-01')
+        self.assertEqual(contact.birthday_doy, 61)
@@ -5,11 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.contacts.models import User, Contact
 from src.schemas.user import UserSchema
 from src.repository.functionuser import create_user, get_user_by_email, update_token, confirmed_email, update_password
+from src.services.cache_services import user_cache
 
 
 class TestForUserFunctions(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.user = User(id=1, username='test user', password='123123', confirmed=False)
+        self.user = User(id=1, username='test user', email='top@gmail.com', password='123123', confirmed=False)
         self.session = AsyncMock(spec=AsyncSession)
 
     async def test_create_user(self):
@@ -31,8 +32,11 @@ class TestForUserFunctions(unittest.IsolatedAsyncioTestCase):
         await update_token(self.user, new_token, self.session)
         assert self.user.refresh_token == new_token
 
-
-
-
-
-
+    async def test_update_password_invalidates_cache(self):
+        user_cache.set(self.user.email, {'id': 1})
+        mocket_user = MagicMock()
+        mocket_user.scalar_one_or_none.return_value = self.user
+        self.session.execute.return_value = mocket_user
+        await update_password(self.user.email, 'new', self.session)
+        self.assertEqual(self.user.password, 'new')
+        self.assertIsNone(user_cache.get(self.user.email))
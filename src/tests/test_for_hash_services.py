@@ -0,0 +1,39 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from src.services.hash_services import PasswordHasher, HasherBusy
+
+
+def slow_identity(value):
+    time.sleep(0.05)
+    return value
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        self.hasher.shutdown()
+
+    async def test_hash_and_verify(self):
+        self.hasher = PasswordHasher('thread', workers=2, max_concurrency=2)
+        hashed = await self.hasher.hash('secret')
+        self.assertTrue(await self.hasher.verify('secret', hashed))
+        self.assertFalse(await self.hasher.verify('wrong', hashed))
+        self.assertEqual(self.hasher.stats()['completed'], 3)
+
+    async def test_concurrency_is_capped(self):
+        self.hasher = PasswordHasher('thread', workers=4, max_concurrency=1)
+        with patch('src.services.hash_services.hash_password', slow_identity):
+            await asyncio.gather(*(self.hasher.hash(str(i)) for i in range(3)))
+        stats = self.hasher.stats()
+        self.assertEqual(stats['max_queue_depth'], 2)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreater(stats['avg_wait_ms'], 0)
+
+    async def test_queue_limit_rejects(self):
+        self.hasher = PasswordHasher('thread', workers=1, max_concurrency=1, max_queue=1)
+        with patch('src.services.hash_services.hash_password', slow_identity):
+            results = await asyncio.gather(*(self.hasher.hash(str(i)) for i in range(3)), return_exceptions=True)
+        self.assertTrue(any(isinstance(result, HasherBusy) for result in results))
+        self.assertGreaterEqual(self.hasher.stats()['rejected'], 1)
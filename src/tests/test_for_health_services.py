@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from conftest import unreachable_redis
+from src.services.health_services import HealthChecker
+
+
+class TestHealthChecker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine('sqlite+aiosqlite://')
+        self.checker = HealthChecker(interval=1, timeout=0.5, max_pool_saturation=0.9)
+        self.checker.init(lambda: self.engine, fakeredis.FakeAsyncRedis())
+
+    async def asyncTearDown(self):
+        await self.checker.stop()
+        await self.engine.dispose()
+
+    async def test_starting_until_first_check(self):
+        self.assertEqual(self.checker.readiness(), (False, {'ready': False, 'reason': 'starting'}))
+
+    async def test_ready(self):
+        await self.checker.check()
+        ready, body = self.checker.readiness()
+        self.assertTrue(ready)
+        self.assertTrue(body['checks']['database']['ok'])
+        self.assertTrue(body['checks']['redis']['ok'])
+
+    async def test_database_down(self):
+        self.checker.init(lambda: create_async_engine('sqlite+aiosqlite:////nonexistent/dir/db.sqlite'))
+        await self.checker.check()
+        ready, body = self.checker.readiness()
+        self.assertFalse(ready)
+        self.assertIn('error', body['checks']['database'])
+        self.assertTrue(body['checks']['redis']['skipped'])
+
+    async def test_redis_down(self):
+        client = unreachable_redis()
+        self.checker.init(lambda: self.engine, client)
+        self.assertFalse((await self.checker.check())['ready'])
+        self.checker.redis_required = False
+        self.assertTrue((await self.checker.check())['ready'])
+        await client.aclose()
+
+    async def test_pool_saturation(self):
+        stats = {'size': 5, 'max_overflow': 5, 'checked_out': 9}
+        self.checker.init(lambda: self.engine, None, lambda: stats)
+        status = await self.checker.check()
+        self.assertFalse(status['ready'])
+        self.assertEqual(status['checks']['pool']['saturation'], 0.9)
+        stats['checked_out'] = 3
+        self.assertTrue((await self.checker.check())['ready'])
+
+    async def test_stale_result(self):
+        await self.checker.check()
+        with patch('src.services.health_services.time.monotonic', return_value=self.checker.checked_at + 10):
+            ready, body = self.checker.readiness()
+        self.assertFalse(ready)
+        self.assertEqual(body['reason'], 'stale')
+
+    async def test_draining(self):
+        await self.checker.check()
+        self.checker.drain()
+        self.assertEqual(self.checker.readiness(), (False, {'ready': False, 'reason': 'draining'}))
+        self.assertEqual(self.checker.stats()['draining'], 1)
+
+    async def test_background_task(self):
+        self.checker.interval = 0.01
+        self.checker.start()
+        for _ in range(200):
+            if self.checker.checks > 1:
+                break
+            await asyncio.sleep(0.01)
+        self.assertGreater(self.checker.checks, 1)
+        await self.checker.stop()
+        checks = self.checker.checks
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.checker.checks, checks)
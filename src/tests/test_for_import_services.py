@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.contacts.models import User
+from src.services.import_services import import_contacts, iter_lines, ImportFormatError, detect_format
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestImportServices(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.user = User(id=1, username='test user', password='123123', confirmed=True)
+        self.session = AsyncMock(spec=AsyncSession)
+
+    async def test_iter_lines_across_chunks(self):
+        lines = [line async for line in iter_lines(stream(b'ab', b'c\nde', b'f\n', b'g'))]
+        self.assertEqual(lines, ['abc\n', 'def\n', 'g'])
+
+    async def test_iter_lines_too_long(self):
+        with self.assertRaises(ImportFormatError):
+            [line async for line in iter_lines(stream(b'x' * 20), max_line_bytes=10)]
+
+    async def test_import_csv(self):
+        body = (b'name,surname,phone,email,birthday,information\n'
+                b'Bob,Bill,123,bob@mail.com,1990-01-01,"multi\nline"\n'
+                b'Ann,,123,ann@mail.com,not-a-date,\n'
+                b'Tom,Tim,123,tom@mail.com,1991-02-03,\n')
+        report = await import_contacts(stream(body[:17], body[17:]), 'csv', self.session, self.user, chunk_size=1)
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['failed'], 1)
+        self.assertEqual(report['errors'][0]['row'], 2)
+        # Две пачки INSERT и увеличение версии адресной книги
+        self.assertEqual(self.session.execute.await_count, 3)
+        rows = self.session.execute.await_args_list[0].args[1]
+        self.assertEqual(rows[0]['information'], 'multi\nline')
+        self.assertEqual(rows[0]['user_id'], self.user.id)
+
+    async def test_import_ndjson(self):
+        body = (b'{"name": "Bob", "surname": "Bill", "phone": "1", "email": "b@m.com", "birthday": "1990-01-01"}\n'
+                b'not json\n'
+                b'[1, 2]\n')
+        report = await import_contacts(stream(body), 'ndjson', self.session, self.user)
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3])
+        self.assertEqual(self.session.execute.await_count, 2)
+
+    async def test_errors_truncated(self):
+        body = b'\n'.join([b'{}'] * 5)
+        report = await import_contacts(stream(body), 'ndjson', self.session, self.user, max_errors=2)
+        self.assertEqual(report['failed'], 5)
+        self.assertEqual(len(report['errors']), 2)
+        self.assertTrue(report['errors_truncated'])
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format('text/csv; charset=utf-8'), 'csv')
+        self.assertEqual(detect_format('application/x-ndjson'), 'ndjson')
+        self.assertIsNone(detect_format('application/json'))
@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.services import metrics_services
+from src.services.metrics_services import Counter, Histogram, Registry, MetricsMiddleware, record_query
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_render(self):
+        counter = Counter('requests_total', 'Requests.', ('method', 'status'))
+        counter.inc('GET', '200')
+        counter.inc('GET', '200')
+        counter.inc('POST', '201')
+        lines = counter.render()
+        self.assertIn('# TYPE requests_total counter', lines)
+        self.assertIn('requests_total{method="GET",status="200"} 2', lines)
+        self.assertIn('requests_total{method="POST",status="201"} 1', lines)
+
+    def test_histogram_is_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, '/a')
+        histogram.observe(0.5, '/a')
+        histogram.observe(5, '/a')
+        lines = histogram.render()
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_count{route="/a"} 3', lines)
+        self.assertIn('latency_seconds_sum{route="/a"} 5.55', lines)
+
+    def test_collectors_run_on_render(self):
+        registry = Registry()
+        counter = registry.register(Counter('calls_total', 'Calls.'))
+        registry.add_collector(counter.inc)
+        self.assertIn('calls_total 1', registry.render())
+        self.assertIn('calls_total 2', registry.render())
+
+    def test_expose_stats_types(self):
+        stats = {'size': 3, 'hits': 10, 'strategy': 'random'}
+        with patch.object(metrics_services, 'registry', Registry()) as registry:
+            metrics_services.expose_stats('cache', 'Cache', lambda: stats, gauges=('size', 'strategy'),
+                                          counters=('hits',))
+            body = registry.render()
+        self.assertIn('# TYPE cache_size gauge\ncache_size 3', body)
+        self.assertIn('# TYPE cache_hits_total counter\ncache_hits_total 10', body)
+        self.assertNotIn('\ncache_strategy ', body)
+
+
+class TestMetricsMiddleware(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = FastAPI()
+
+        @app.get('/items/{item_id}')
+        async def item(item_id: int):
+            record_query(0.002)
+            record_query(0.003)
+            return {'id': item_id}
+
+        self.app = app
+        self.client = AsyncClient(transport=ASGITransport(app=MetricsMiddleware(app)), base_url='http://test')
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_route_template_and_db_queries(self):
+        before = metrics_services.http_requests.values.get(('GET', '/items/{item_id}', '200'), 0)
+        response = await self.client.get('/items/1')
+        await self.client.get('/items/2')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['server-timing'].startswith('db;dur=5.00'))
+        self.assertEqual(metrics_services.http_requests.values[('GET', '/items/{item_id}', '200')], before + 2)
+        self.assertEqual(metrics_services.http_in_flight.values[()], 0)
+        counts, total, count = metrics_services.http_db_queries.values[('GET', '/items/{item_id}')]
+        self.assertEqual(total / count, 2)
+
+    async def test_disabled(self):
+        client = AsyncClient(transport=ASGITransport(app=MetricsMiddleware(self.app, enabled=lambda: False)),
+                             base_url='http://test')
+        before = metrics_services.http_requests.values.get(('GET', '/items/{item_id}', '200'), 0)
+        async with client:
+            response = await client.get('/items/1')
+        self.assertNotIn('server-timing', response.headers)
+        self.assertEqual(metrics_services.http_requests.values.get(('GET', '/items/{item_id}', '200'), 0), before)
+
+    async def test_unmatched_route(self):
+        response = await self.client.get('/missing/123')
+        self.assertEqual(response.status_code, 404)
+        self.assertGreaterEqual(metrics_services.http_requests.values[('GET', '<unmatched>', '404')], 1)
+
+    async def test_queries_outside_request_are_global_only(self):
+        before = metrics_services.db_queries.values.get((), 0)
+        record_query(0.001)
+        self.assertEqual(metrics_services.db_queries.values[()], before + 1)
+        self.assertIsNone(metrics_services.request_db_stats.get())
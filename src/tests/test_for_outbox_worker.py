@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from aiosmtpd.controller import Controller
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from conftest import free_port
+from src.contacts.models import Base, EmailOutbox
+from src.repository import functionoutbox
+from src.services.outbox_worker import OutboxWorker, SMTPConnection
+
+
+class RecordingHandler:
+    """Обработчик aiosmtpd, который сохраняет письма или отвечает заданным кодом на RCPT."""
+
+    def __init__(self):
+        self.messages = []
+        self.rcpt_reply = None
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if self.rcpt_reply:
+            return self.rcpt_reply
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return '250 Message accepted for delivery'
+
+
+class TestOutboxWorker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.handler = RecordingHandler()
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=free_port())
+        self.controller.start()
+        self.engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[EmailOutbox.__table__])
+        self.session_maker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.connection = SMTPConnection(self.controller.hostname, self.controller.port)
+        self.worker = OutboxWorker(self.session_maker, [self.connection], batch_size=10, max_attempts=2,
+                                   backoff_base=60, backoff_max=600, lease=300)
+
+    async def asyncTearDown(self):
+        await self.worker.close()
+        self.controller.stop()
+        await self.engine.dispose()
+
+    async def enqueue(self, count: int):
+        async with self.session_maker() as db:
+            for i in range(count):
+                await functionoutbox.enqueue_email(f'user{i}@example.com', 'Confirm your email ', 'verify_email.html',
+                                                   {'host': 'http://test/', 'username': f'user{i}', 'token': 't'},
+                                                   db, commit=False)
+            await db.commit()
+
+    async def outbox(self):
+        async with self.session_maker() as db:
+            return (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+    async def test_delivers_batch_over_one_connection(self):
+        await self.enqueue(15)
+        self.assertEqual(await self.worker.run_once(), 10)
+        self.assertEqual(await self.worker.run_once(), 5)
+        self.assertEqual(await self.worker.run_once(), 0)
+        self.assertEqual(len(self.handler.messages), 15)
+        self.assertEqual(self.connection.connects, 1)
+        self.assertTrue(all(message.status == 'sent' and message.attempts == 1 for message in await self.outbox()))
+        self.assertEqual(self.worker.stats()['sent'], 15)
+        self.assertIn(b'http://test/auth/confirmed_email/t', self.handler.messages[0].content)
+
+    async def test_transient_error_is_retried_with_backoff(self):
+        await self.enqueue(1)
+        self.handler.rcpt_reply = '451 4.3.0 Try again later'
+        self.assertEqual(await self.worker.run_once(), 1)
+        message, = await self.outbox()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, datetime.utcnow())
+        self.assertIn('451', message.last_error)
+        # Письмо ждет backoff и не забирается повторно
+        self.assertEqual(await self.worker.run_once(), 0)
+
+    async def test_permanent_error_fails_immediately(self):
+        await self.enqueue(1)
+        self.handler.rcpt_reply = '550 5.1.1 No such user'
+        await self.worker.run_once()
+        message, = await self.outbox()
+        self.assertEqual((message.status, message.attempts), ('failed', 1))
+        self.assertEqual(self.worker.stats()['failed'], 1)
+
+    async def test_unreachable_server_does_not_consume_attempts(self):
+        await self.enqueue(3)
+        self.worker.connections = [SMTPConnection('127.0.0.1', free_port(), timeout=1)]
+        await self.worker.run_once()
+        statuses = [(message.status, message.attempts) for message in await self.outbox()]
+        self.assertEqual(statuses[0], ('pending', 1))
+        self.assertEqual(statuses[1:], [('pending', 0), ('pending', 0)])
+        # Неотправленные письма откладываются и не забираются повторно сразу же
+        self.assertEqual(await self.worker.run_once(), 0)
+
+    async def test_run_waits_when_nothing_was_delivered(self):
+        await self.enqueue(3)
+        self.worker.connections = [SMTPConnection('127.0.0.1', free_port(), timeout=1)]
+        self.worker.backoff_base = 0
+        self.worker.poll_interval = 60
+        stop = asyncio.Event()
+        with patch.object(self.worker, 'run_once', wraps=self.worker.run_once) as run_once:
+            task = asyncio.create_task(self.worker.run(stop))
+            await asyncio.sleep(0.5)
+            stop.set()
+            await task
+        self.assertEqual(run_once.call_count, 1)
+
+    async def test_template_body_is_cleared_after_delivery(self):
+        await self.enqueue(2)
+        self.handler.rcpt_reply = '550 5.1.1 No such user'
+        await self.worker.run_once()
+        self.handler.rcpt_reply = None
+        await self.enqueue(1)
+        await self.worker.run_once()
+        self.assertEqual([(message.status, message.template_body) for message in await self.outbox()],
+                         [('failed', None), ('failed', None), ('sent', None)])
+
+    async def test_purge_removes_old_finished_messages(self):
+        await self.enqueue(3)
+        await self.worker.run_once()
+        await self.enqueue(1)
+        async with self.session_maker() as db:
+            await db.execute(update(EmailOutbox).values(created_at=datetime.utcnow() - timedelta(days=30)))
+            await db.commit()
+        self.worker.retention = 7 * 24 * 3600
+        self.assertEqual(await self.worker.purge(), 3)
+        self.assertEqual([message.status for message in await self.outbox()], ['pending'])
+        self.assertEqual(self.worker.stats()['purged'], 3)
@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+import fakeredis
+
+from conftest import unreachable_redis
+from src.services.auth_services import auth_service
+from src.services.ratelimit_services import TokenBuckets, RateLimitBackend, client_identifier
+
+
+class TestTokenBuckets(unittest.TestCase):
+    def test_capacity_and_refill(self):
+        buckets = TokenBuckets(max_keys=10)
+        with patch('src.services.ratelimit_services.time.monotonic', return_value=0):
+            self.assertEqual(buckets.acquire('a', 2, 10000), 0)
+            self.assertEqual(buckets.acquire('a', 2, 10000), 0)
+            self.assertEqual(buckets.acquire('a', 2, 10000), 5000)
+            self.assertEqual(buckets.acquire('b', 2, 10000), 0)
+        with patch('src.services.ratelimit_services.time.monotonic', return_value=5):
+            self.assertEqual(buckets.acquire('a', 2, 10000), 0)
+
+    def test_max_keys(self):
+        buckets = TokenBuckets(max_keys=2)
+        for key in 'abc':
+            buckets.acquire(key, 1, 1000)
+        self.assertEqual(list(buckets._buckets), ['b', 'c'])
+
+
+class TestRateLimitBackend(unittest.IsolatedAsyncioTestCase):
+    async def test_redis_sliding_window(self):
+        backend = RateLimitBackend('redis', max_keys=100, retry_after=5)
+        backend.init(fakeredis.FakeAsyncRedis())
+        self.assertEqual(await backend.hit('user:a', 2, 10000), 0)
+        self.assertEqual(await backend.hit('user:a', 2, 10000), 0)
+        retry_after = await backend.hit('user:a', 2, 10000)
+        self.assertTrue(0 < retry_after <= 10000)
+        self.assertEqual(await backend.hit('user:b', 2, 10000), 0)
+        self.assertEqual(backend.redis_checks, 4)
+
+    async def test_denial_is_cached_locally(self):
+        backend = RateLimitBackend('redis', max_keys=100, retry_after=5)
+        backend.init(fakeredis.FakeAsyncRedis())
+        await backend.hit('user:a', 1, 10000)
+        await backend.hit('user:a', 1, 10000)
+        self.assertGreater(await backend.hit('user:a', 1, 10000), 0)
+        stats = backend.stats()
+        self.assertEqual((stats['redis_checks'], stats['cached_denials']), (2, 1))
+
+    async def test_falls_back_to_local_buckets(self):
+        backend = RateLimitBackend('redis', max_keys=100, retry_after=60)
+        client = unreachable_redis()
+        backend.init(client)
+        self.assertEqual(await backend.hit('user:a', 1, 10000), 0)
+        self.assertGreater(await backend.hit('user:a', 1, 10000), 0)
+        stats = backend.stats()
+        self.assertEqual((stats['redis_errors'], stats['redis_checks'], stats['local_checks']), (1, 1, 2))
+        self.assertFalse(stats['redis_available'])
+        await client.aclose()
+
+
+class TestClientIdentifier(unittest.IsolatedAsyncioTestCase):
+    def request(self, headers: dict):
+        request = MagicMock()
+        request.headers = headers
+        request.client.host = '10.0.0.1'
+        return request
+
+    async def test_user_key(self):
+        token = await auth_service.create_access_token({'sub': 'user@mail.com'})
+        self.assertEqual(client_identifier(self.request({'authorization': f'Bearer {token}'})), 'user:user@mail.com')
+
+    async def test_ip_key_for_invalid_token(self):
+        self.assertEqual(client_identifier(self.request({'authorization': 'Bearer bad'})), 'ip:10.0.0.1')
+        self.assertEqual(client_identifier(self.request({'x-forwarded-for': '1.2.3.4, 10.0.0.1'})), 'ip:1.2.3.4')
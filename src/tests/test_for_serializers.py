@@ -0,0 +1,43 @@
+import json
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.contacts.models import Contact, User
+from src.schemas.checkschemas import CreateContact
+from src.services.serializers import dumps, model_response, contact_list, default_response_class
+
+
+def make_contacts(count: int) -> list[Contact]:
+    owner = User(id=1, username='deadpool', email='deadpool@example.com')
+    return [Contact(id=i, name=f'Імя{i}', surname='Surname', phone='123', email=f'c{i}@mail.com',
+                    birthday=date(1990, 1, i % 28 + 1), information='', user=owner) for i in range(1, count + 1)]
+
+
+class TestSerializers(unittest.TestCase):
+    def test_dumps_matches_json_response(self):
+        data = [{'id': 1, 'name': 'Імя', 'birthday': '1990-01-01', 'user': {'id': 1}}]
+        expected = JSONResponse(data).body
+        with patch('src.services.serializers.config.JSON_FAST_PATH', False):
+            self.assertEqual(dumps(data), expected)
+        with patch('src.services.serializers.config.JSON_FAST_PATH', True):
+            self.assertEqual(dumps(data), expected)
+
+    def test_model_response_disabled_returns_object(self):
+        contacts = make_contacts(2)
+        with patch('src.services.serializers.config.JSON_FAST_PATH', False):
+            self.assertIs(model_response(contact_list, contacts), contacts)
+            self.assertIs(default_response_class(), JSONResponse)
+
+    def test_model_response_matches_response_model(self):
+        contacts = make_contacts(3)
+        expected = jsonable_encoder(TypeAdapter(list[CreateContact]).validate_python(contacts, from_attributes=True))
+        with patch('src.services.serializers.config.JSON_FAST_PATH', True):
+            response = model_response(contact_list, contacts, status_code=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.media_type, 'application/json')
+        self.assertEqual(json.loads(response.body), expected)
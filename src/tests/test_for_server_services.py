@@ -0,0 +1,67 @@
+import asyncio
+import os
+import signal
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.services.server_services import available_cpus, install_drain_handler, pick_implementation, worker_count
+
+
+class TestWorkerSizing(unittest.TestCase):
+    def cpu_max(self, content: str) -> str:
+        file = tempfile.NamedTemporaryFile('w', suffix='cpu.max', delete=False)
+        file.write(content)
+        file.close()
+        self.addCleanup(os.unlink, file.name)
+        return file.name
+
+    def test_cgroup_quota_limits_cpus(self):
+        with patch('os.sched_getaffinity', return_value=set(range(32))):
+            self.assertEqual(available_cpus(self.cpu_max('200000 100000\n')), 2)
+            self.assertEqual(available_cpus(self.cpu_max('150000 100000\n')), 2)
+            self.assertEqual(available_cpus(self.cpu_max('50000 100000\n')), 1)
+
+    def test_no_quota(self):
+        with patch('os.sched_getaffinity', return_value={0, 1, 2, 3}):
+            self.assertEqual(available_cpus(self.cpu_max('max 100000\n')), 4)
+            self.assertEqual(available_cpus('/nonexistent/cpu.max'), 4)
+
+    def test_worker_count(self):
+        self.assertEqual(worker_count(3), 3)
+        with patch('src.services.server_services.available_cpus', return_value=6):
+            self.assertEqual(worker_count(0), 6)
+
+    def test_pick_implementation(self):
+        self.assertEqual(pick_implementation('asyncio', 'uvloop', 'asyncio'), 'asyncio')
+        with patch('importlib.util.find_spec', return_value=object()):
+            self.assertEqual(pick_implementation('auto', 'uvloop', 'asyncio'), 'uvloop')
+        with patch('importlib.util.find_spec', return_value=None):
+            self.assertEqual(pick_implementation('auto', 'httptools', 'h11'), 'h11')
+
+
+class TestDrainHandler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.exits = []
+        self.drained = []
+        original = signal.signal(signal.SIGTERM, lambda sig, frame: self.exits.append(sig))
+        self.addCleanup(signal.signal, signal.SIGTERM, original)
+
+    async def test_disabled(self):
+        self.assertFalse(install_drain_handler(0, lambda: self.drained.append(True)))
+
+    async def test_shutdown_is_delayed(self):
+        self.assertTrue(install_drain_handler(0.05, lambda: self.drained.append(True)))
+        signal.raise_signal(signal.SIGTERM)
+        await asyncio.sleep(0)
+        self.assertEqual(self.drained, [True])
+        self.assertEqual(self.exits, [])
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.exits, [signal.SIGTERM])
+
+    async def test_second_signal_exits_immediately(self):
+        install_drain_handler(10, lambda: self.drained.append(True))
+        signal.raise_signal(signal.SIGTERM)
+        signal.raise_signal(signal.SIGTERM)
+        self.assertEqual(self.drained, [True])
+        self.assertEqual(self.exits, [signal.SIGTERM])
@@ -0,0 +1,82 @@
+import unittest
+
+import fakeredis
+
+from conftest import unreachable_redis
+from src.services.session_services import SessionStore, SessionStoreUnavailable
+
+
+class TestSessionStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.store = SessionStore(ttl=60)
+        self.store.init(self.redis)
+
+    async def test_create_sets_ttl_and_indexes_session(self):
+        sid, jti = await self.store.create('a@mail.com', 'phone')
+        self.assertEqual(await self.redis.hget(f'session:{sid}', 'jti'), jti.encode())
+        self.assertTrue(0 < await self.redis.ttl(f'session:{sid}') <= 60)
+        self.assertEqual(await self.redis.smembers('sessions:a@mail.com'), {sid.encode()})
+
+    async def test_multiple_devices(self):
+        await self.store.create('a@mail.com', 'phone')
+        await self.store.create('a@mail.com', 'laptop')
+        await self.store.create('b@mail.com', 'tablet')
+        sessions = await self.store.list('a@mail.com')
+        self.assertEqual(sorted(item['device'] for item in sessions), ['laptop', 'phone'])
+
+    async def test_rotate(self):
+        sid, jti = await self.store.create('a@mail.com')
+        new_jti = await self.store.rotate(sid, jti, 'a@mail.com')
+        self.assertIsNotNone(new_jti)
+        self.assertNotEqual(new_jti, jti)
+        self.assertIsNotNone(await self.store.rotate(sid, new_jti, 'a@mail.com'))
+
+    async def test_reuse_revokes_session(self):
+        sid, jti = await self.store.create('a@mail.com')
+        new_jti = await self.store.rotate(sid, jti, 'a@mail.com')
+        self.assertIsNone(await self.store.rotate(sid, jti, 'a@mail.com'))
+        self.assertEqual(self.store.reuse_detected, 1)
+        self.assertIsNone(await self.store.rotate(sid, new_jti, 'a@mail.com'))
+
+    async def test_revoke(self):
+        sid, jti = await self.store.create('a@mail.com')
+        other, _ = await self.store.create('a@mail.com')
+        self.assertTrue(await self.store.revoke(sid, jti, 'a@mail.com'))
+        self.assertFalse(await self.store.revoke(sid, jti, 'a@mail.com'))
+        self.assertIsNone(await self.store.rotate(sid, jti, 'a@mail.com'))
+        self.assertEqual([item['sid'] for item in await self.store.list('a@mail.com')], [other])
+
+    async def test_rotated_token_cannot_revoke(self):
+        sid, jti = await self.store.create('a@mail.com')
+        new_jti = await self.store.rotate(sid, jti, 'a@mail.com')
+        self.assertFalse(await self.store.is_current(sid, jti))
+        self.assertFalse(await self.store.revoke(sid, jti, 'a@mail.com'))
+        self.assertTrue(await self.store.is_current(sid, new_jti))
+        self.assertEqual(len(await self.store.list('a@mail.com')), 1)
+
+    async def test_revoke_all(self):
+        for _ in range(3):
+            await self.store.create('a@mail.com')
+        kept, jti = await self.store.create('b@mail.com')
+        self.assertEqual(await self.store.revoke_all('a@mail.com'), 3)
+        self.assertEqual(await self.store.list('a@mail.com'), [])
+        self.assertIsNotNone(await self.store.rotate(kept, jti, 'b@mail.com'))
+
+    async def test_list_drops_expired_sessions(self):
+        sid, _ = await self.store.create('a@mail.com')
+        await self.redis.delete(f'session:{sid}')
+        self.assertEqual(await self.store.list('a@mail.com'), [])
+        self.assertEqual(await self.redis.smembers('sessions:a@mail.com'), set())
+
+    async def test_unavailable(self):
+        store = SessionStore(ttl=60)
+        with self.assertRaises(SessionStoreUnavailable):
+            await store.create('a@mail.com')
+        client = unreachable_redis()
+        store.init(client)
+        with self.assertRaises(SessionStoreUnavailable):
+            await store.create('a@mail.com')
+        with self.assertRaises(SessionStoreUnavailable):
+            await store.rotate('sid', 'jti', 'a@mail.com')
+        await client.aclose()
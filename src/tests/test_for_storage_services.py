@@ -0,0 +1,75 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from src.services.storage_services import LocalStorage, spool_upload, FileTooLarge, StorageBackend, \
+    UploadLimitMiddleware
+
+
+class TestStorageServices(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(self.tmp.name, '/static/avatars/')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def test_local_storage_save(self):
+        spooled = await spool_upload(UploadFile(io.BytesIO(b'image-bytes' * 10000)), max_bytes=1024 * 1024)
+        url = await self.storage.save('Web16/user@mail.com', spooled)
+        self.assertTrue(url.startswith('/static/avatars/Web16/user@mail.com?v='))
+        self.assertEqual((Path(self.tmp.name) / 'Web16/user@mail.com').read_bytes(), b'image-bytes' * 10000)
+
+    async def test_spool_upload_size_limit(self):
+        with self.assertRaises(FileTooLarge):
+            await spool_upload(UploadFile(io.BytesIO(b'x' * 100)), max_bytes=10)
+
+    async def test_local_storage_rejects_traversal(self):
+        with self.assertRaises(ValueError):
+            await self.storage.save('../outside', io.BytesIO(b'x'))
+
+    def test_storage_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            StorageBackend()
+
+
+class TestUploadLimitMiddleware(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.handled = []
+        app = FastAPI()
+
+        @app.post('/upload')
+        async def upload(file: UploadFile = File()):
+            self.handled.append(file.filename)
+            return {'size': len(await file.read())}
+
+        app.add_middleware(UploadLimitMiddleware, limits={'/upload': 1024})
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_small_upload_passes(self):
+        response = await self.client.post('/upload', files={'file': ('a.png', b'x' * 100)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'size': 100})
+
+    async def test_content_length_rejected_before_parsing(self):
+        response = await self.client.post('/upload', files={'file': ('a.png', b'x' * 4096)})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.handled, [])
+
+    async def test_chunked_body_is_cut_off(self):
+        async def body():
+            yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+            for _ in range(8):
+                yield b'x' * 512
+
+        response = await self.client.post('/upload', content=body(),
+                                          headers={'Content-Type': 'multipart/form-data; boundary=b'})
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.handled, [])
@@ -0,0 +1,88 @@
+import unittest
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.contacts.models import Base, User
+from src.db.upgrade import upgrade_schema
+from src.repository import functiondb
+
+
+class TestUpgradeSchema(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        self.session_maker = async_sessionmaker(self.engine, expire_on_commit=False)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            # База предыдущей версии: столбцов и индексов нового кода еще нет
+            await conn.execute(text('DROP INDEX ix_contacts_user_id_birthday_doy'))
+            await conn.execute(text('DROP INDEX ix_contacts_user_id_search'))
+            await conn.execute(text('ALTER TABLE contacts DROP COLUMN birthday_doy'))
+            await conn.execute(text('ALTER TABLE users DROP COLUMN contacts_version'))
+            for trigger in ('contacts_fts_ai', 'contacts_fts_ad', 'contacts_fts_au'):
+                await conn.execute(text(f'DROP TRIGGER {trigger}'))
+            await conn.execute(text('DROP TABLE contacts_fts'))
+            await conn.execute(text("INSERT INTO users (id, username, email, password, confirmed, created_at, "
+                                    "updated_at) VALUES (1, 'old', 'old@mail.com', 'hash', 1, "
+                                    "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"))
+            self.soon = date.today() + timedelta(days=2)
+            await conn.execute(text("INSERT INTO contacts (name, surname, phone, email, birthday, information, "
+                                    "created_at, update_at, user_id) VALUES ('Old', 'Contact', '1', 'o@mail.com', "
+                                    ":birthday, '', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 1)"),
+                               {'birthday': self.soon.replace(year=1992).isoformat()})
+            await conn.execute(text("INSERT INTO users (id, username, email, password, confirmed, created_at, "
+                                    "updated_at) VALUES (2, 'other', 'other@mail.com', 'hash', 1, "
+                                    "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"))
+            await conn.execute(text("INSERT INTO contacts (name, surname, phone, email, birthday, information, "
+                                    "created_at, update_at, user_id) VALUES ('Other', 'Contact', '2', 'o@mail.com', "
+                                    "'1990-01-01', '', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 2)"))
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def upgrade(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+
+    async def test_birthday_doy_backfilled(self):
+        await self.upgrade()
+        await self.upgrade()
+        async with self.engine.connect() as conn:
+            indexes = await conn.run_sync(lambda sync: inspect(sync).get_indexes('contacts'))
+        self.assertIn('ix_contacts_user_id_birthday_doy', {index['name'] for index in indexes})
+        self.assertIn('ix_contacts_user_id_search', {index['name'] for index in indexes})
+        async with self.session_maker() as session:
+            user = (await session.execute(select(User).filter_by(id=1))).scalar_one()
+            contacts = await functiondb.upcoming_birthday(session, user, days=7)
+        self.assertEqual([contact.name for contact in contacts], ['Old'])
+        self.assertEqual(contacts[0].birthday_doy, date(2000, self.soon.month, self.soon.day).timetuple().tm_yday)
+
+    @patch.object(functiondb, 'SEARCH_SCAN_LIMIT', 0)
+    async def test_contacts_version_and_search_index(self):
+        await self.upgrade()
+        await self.upgrade()
+        async with self.session_maker() as session:
+            user = (await session.execute(select(User).filter_by(id=1))).scalar_one()
+            self.assertEqual(await functiondb.get_contacts_version(session, user.id), 0)
+            await functiondb.bump_contacts_version(session, user.id)
+            self.assertEqual(await functiondb.get_contacts_version(session, user.id), 1)
+            found = await functiondb.search_contacts(session, user, 'o@mail')
+        self.assertEqual([contact.name for contact in found], ['Old'])
+
+    @patch.object(functiondb, 'SEARCH_SCAN_LIMIT', 0)
+    async def test_search_index_without_owner_rebuilt(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(text("CREATE VIRTUAL TABLE contacts_fts USING fts5(name, surname, email, "
+                                    "content='contacts', content_rowid='id', tokenize='trigram')"))
+            await conn.execute(text("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')"))
+        await self.upgrade()
+        async with self.engine.connect() as conn:
+            columns = await conn.run_sync(lambda sync: inspect(sync).get_columns('contacts_fts'))
+        self.assertIn('owner', {column['name'] for column in columns})
+        async with self.session_maker() as session:
+            user = (await session.execute(select(User).filter_by(id=2))).scalar_one()
+            found = await functiondb.search_contacts(session, user, 'o@mail')
+        self.assertEqual([contact.name for contact in found], ['Other'])